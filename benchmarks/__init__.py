@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks"""
+
+__updated__ = "2026-10-18 11:02:40"
+__all__ = []
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - batched API key metadata lookups"""
+
+__updated__ = "2026-10-19 01:02:40"
+
+"""
+Per-key cost of `get_apikey_metadata` in a loop versus the pipelined
+`get_apikey_metadata_many` (full HGETALL and an HMGET projection) for
+several batch sizes.
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_apikey_batch [--redis-url redis://localhost:6379/0]
+
+Without --redis-url, fakeredis is used, which has no network round trip and
+so mostly measures decoding.
+"""
+
+import argparse
+import time
+
+import redis
+
+from db.redis_apikeys import get_apikey_metadata, get_apikey_metadata_many
+
+from benchmarks.common import add_output_argument, percentile, report
+
+KEY_PREFIX = "bench-batch-"
+
+
+def _redis_client(url: str | None) -> redis.Redis:
+    if url:
+        return redis.Redis.from_url(url)
+    import fakeredis  # pylint: disable=import-outside-toplevel
+
+    return fakeredis.FakeRedis()
+
+
+def _seed(r: redis.Redis, count: int) -> list:
+    keys = [f"{KEY_PREFIX}{i}" for i in range(count)]
+    pipe = r.pipeline(transaction=False)
+    for i, key in enumerate(keys):
+        pipe.hset(
+            f"apikey:{key}",
+            mapping={
+                "customer_id": f"c{i:05d}",
+                "tier": "pro",
+                "rate_limit": "800",
+                "quota_daily": "10000",
+                "disabled": "0",
+                "allowed_endpoints": '["/hello", "/calc"]',
+                "metadata": '{"country": "ES"}',
+            },
+        )
+    pipe.execute()
+    return keys
+
+
+def _scenario(name: str, func, keys: list, batch_size: int, rounds: int) -> dict:
+    """
+    Time `rounds` lookups of `batch_size` keys; latencies are per key.
+    """
+    func(keys[:batch_size])
+    samples = []
+    started = time.perf_counter()
+    for i in range(rounds):
+        offset = (i * batch_size) % max(1, len(keys) - batch_size + 1)
+        batch = keys[offset : offset + batch_size]
+        t0 = time.perf_counter_ns()
+        func(batch)
+        samples.append((time.perf_counter_ns() - t0) / 1000.0 / batch_size)
+    elapsed = time.perf_counter() - started
+
+    samples.sort()
+    return {
+        "name": f"{name} batch={batch_size}",
+        "iterations": rounds * batch_size,
+        "ops_per_sec": rounds * batch_size / elapsed if elapsed else 0.0,
+        "mean_us": sum(samples) / len(samples),
+        "p50_us": percentile(samples, 50),
+        "p95_us": percentile(samples, 95),
+        "p99_us": percentile(samples, 99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--batch-sizes", default="1,10,100,1000")
+    parser.add_argument("--keys-per-size", type=int, default=20000, help="keys looked up per batch size")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    r = _redis_client(args.redis_url)
+    sizes = [int(b) for b in args.batch_sizes.split(",")]
+    keys = _seed(r, max(sizes) * 2)
+
+    scenarios = {
+        "loop": lambda batch: [get_apikey_metadata(r, k) for k in batch],
+        "hgetall": lambda batch: get_apikey_metadata_many(r, batch),
+        "hmget": lambda batch: get_apikey_metadata_many(r, batch, fields=("customer_id", "tier")),
+    }
+    results = []
+    try:
+        for size in sizes:
+            rounds = max(1, args.keys_per_size // size)
+            for name, func in scenarios.items():
+                results.append(_scenario(name, func, keys, size, rounds))
+    finally:
+        pipe = r.pipeline(transaction=False)
+        for key in keys:
+            pipe.delete(f"apikey:{key}")
+        pipe.execute()
+    report("apikey_batch", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - sync WSGI vs ASGI serving of an API-key-protected route"""
+
+__updated__ = "2026-10-19 03:24:50"
+
+"""
+Requests/sec and latency percentiles for a route behind the API key check,
+where every request misses the cache and waits on Redis:
+
+- wsgi xN:  the Flask view with `require_apikey`, N client threads (as N
+            gunicorn threads would serve it)
+- asgi xN:  the async route with `require_apikey_async`, N concurrent tasks
+            on one event loop (one uvicorn worker)
+
+Both run in-process, without sockets, so the numbers compare the serving
+models rather than the HTTP servers. Each lookup adds --io-ms of simulated
+network latency (time.sleep / asyncio.sleep) in front of fakeredis; with
+--redis-url and --io-ms 0 the lookups hit a real Redis instead.
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_asgi [--concurrency 64] [--io-ms 2] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from typing import List
+
+from flask import Flask
+
+from api.asgi import AsgiApp, JsonResponse, require_apikey_async
+from db.apikey_cache import ApiKeyCache
+from db.redis_apikeys import get_apikey_metadata, get_apikey_metadata_async
+from util.decorators import require_apikey
+
+from benchmarks.bench_load import run_load
+from benchmarks.common import add_output_argument, report, summarize
+
+APIKEY = "bench-asgi-key"
+PATH = "/secure"
+
+
+def _clients(url: str | None):
+    if url:
+        import redis  # pylint: disable=import-outside-toplevel
+        import redis.asyncio as aioredis  # pylint: disable=import-outside-toplevel
+
+        return redis.Redis.from_url(url), aioredis.Redis.from_url(url)
+    import fakeredis  # pylint: disable=import-outside-toplevel
+
+    server = fakeredis.FakeServer()
+    return fakeredis.FakeRedis(server=server), fakeredis.FakeAsyncRedis(server=server)
+
+
+def _wsgi(sync_client, io_seconds: float, concurrency: int, duration: float) -> dict:
+    def loader(r, apikey):
+        if io_seconds:
+            time.sleep(io_seconds)
+        return get_apikey_metadata(r, apikey)
+
+    # ttl=0: nothing is cached, every request waits on Redis
+    cache = ApiKeyCache(sync_client, ttl=0, negative_ttl=0, loader=loader)
+    app = Flask(__name__)
+
+    @app.route(PATH)
+    @require_apikey({"redis": sync_client, "apikey_cache": cache})
+    def secure():
+        return {"ok": True}
+
+    def factory():
+        client = app.test_client()
+        return lambda path: client.get(path, headers={"X-API-Key": APIKEY}).status_code
+
+    result = run_load(factory, [PATH], concurrency=concurrency, duration=duration, warmup=0.5)[-1]
+    result["name"] = f"wsgi x{concurrency}"
+    return result
+
+
+async def _asgi_run(app: AsgiApp, concurrency: int, duration: float) -> dict:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": PATH,
+        "query_string": b"",
+        "headers": [(b"x-api-key", APIKEY.encode())],
+        "client": ("127.0.0.1", 5000),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    latencies: List[int] = []
+    errors = [0]
+    recording = [False]
+    stop = [False]
+
+    async def client() -> None:
+        status = [0]
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+
+        while not stop[0]:
+            t0 = time.perf_counter_ns()
+            await app(scope, receive, send)
+            if recording[0]:
+                latencies.append(time.perf_counter_ns() - t0)
+                errors[0] += status[0] != 200
+
+    tasks = [asyncio.create_task(client()) for _ in range(concurrency)]
+    await asyncio.sleep(0.5)
+    recording[0] = True
+    started = time.perf_counter()
+    await asyncio.sleep(duration)
+    stop[0] = True
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*tasks)
+    return summarize(f"asgi x{concurrency}", latencies, elapsed, errors=errors[0])
+
+
+def _asgi(sync_client, async_client, io_seconds: float, concurrency: int, duration: float) -> dict:
+    async def loader(r, apikey):
+        if io_seconds:
+            await asyncio.sleep(io_seconds)
+        return await get_apikey_metadata_async(r, apikey)
+
+    cache = ApiKeyCache(sync_client, ttl=0, negative_ttl=0, async_loader=loader)
+    app = AsgiApp(lambda environ, start_response: [], metrics=False)
+
+    @app.route(PATH)
+    @require_apikey_async({"redis": async_client, "apikey_cache": cache})
+    async def secure(_request):
+        return JsonResponse({"ok": True})
+
+    return asyncio.run(_asgi_run(app, concurrency, duration))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--io-ms", type=float, default=2.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--redis-url", default=None)
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    sync_client, async_client = _clients(args.redis_url)
+    sync_client.hset(f"apikey:{APIKEY}", mapping={"customer_id": "bench", "disabled": "0"})
+    io_seconds = args.io_ms / 1000.0
+    results = [
+        _wsgi(sync_client, io_seconds, args.concurrency, args.duration),
+        _asgi(sync_client, async_client, io_seconds, args.concurrency, args.duration),
+    ]
+    report("asgi", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - password verification throughput per pool size"""
+
+__updated__ = "2026-10-19 06:40:26"
+
+"""
+Logins/sec and latency percentiles of bcrypt verification, every login a
+cache miss (AUTH_CACHE_TTL=0) unless noted:
+
+- inline xT:         `bcrypt.checkpw` on the T client threads themselves (no
+                     pool, what a view calling bcrypt directly does)
+- pool Nw xT:        `PasswordVerifier.verify` with an N-process pool, T
+                     client threads (2 per process so the pool stays busy)
+- cache_hit:         a repeated login served from the verification cache
+
+Throughput should grow with N up to the number of cores; past that, extra
+processes only add latency. Rejected logins (429) are counted, not timed.
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_auth [--rounds 10] [--workers 1,2,4] [--duration 3]
+"""
+
+import argparse
+import os
+import threading
+import time
+from typing import Callable, List
+
+import bcrypt
+
+from util.passwords import PasswordVerifier, VerifierBusy
+
+from benchmarks.common import add_output_argument, measure, report, summarize
+
+PASSWORD = b"correct horse battery staple"
+
+
+def run_logins(name: str, login: Callable[[], bool], threads: int, duration: float) -> dict:
+    """
+    `threads` client threads calling `login` back to back for `duration` seconds.
+    """
+    latencies: List[List[int]] = [[] for _ in range(threads)]
+    rejected = [0] * threads
+    stop = threading.Event()
+
+    def client(index: int) -> None:
+        samples = latencies[index]
+        clock = time.perf_counter_ns
+        while not stop.is_set():
+            started = clock()
+            try:
+                login()
+            except VerifierBusy:
+                rejected[index] += 1
+                continue
+            samples.append(clock() - started)
+
+    workers = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return summarize(name, [ns for samples in latencies for ns in samples], elapsed, rejected=sum(rejected))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost of the stored hash")
+    parser.add_argument(
+        "--workers",
+        default=None,
+        help="comma-separated pool sizes (default: powers of two up to the CPU count)",
+    )
+    parser.add_argument("--duration", type=float, default=3.0)
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.workers:
+        sizes = [int(n) for n in args.workers.split(",")]
+    else:
+        sizes = sorted({min(1 << i, cpus) for i in range(cpus.bit_length() + 1)})
+    stored_hash = bcrypt.hashpw(PASSWORD, bcrypt.gensalt(args.rounds))
+
+    results = [
+        run_logins(f"inline x{max(sizes) * 2}", lambda: bcrypt.checkpw(PASSWORD, stored_hash), max(sizes) * 2, args.duration)
+    ]
+    for size in sizes:
+        verifier = PasswordVerifier(workers=size, rounds=args.rounds, cache_ttl=0, timeout=60)
+        verifier.verify("warmup", PASSWORD, stored_hash)  # start the pool processes
+        try:
+            results.append(
+                run_logins(
+                    f"pool {size}w x{size * 2}",
+                    lambda v=verifier: v.verify("bench", PASSWORD, stored_hash),
+                    size * 2,
+                    args.duration,
+                )
+            )
+        finally:
+            verifier.close()
+
+    cached = PasswordVerifier(workers=1, rounds=args.rounds, cache_ttl=3600)
+    cached.verify("bench", PASSWORD, stored_hash)
+    results.append(measure("cache_hit", lambda: cached.verify("bench", PASSWORD, stored_hash), iterations=20000))
+    cached.close()
+    report("auth", results, args)
+
+
+if __name__ == "__main__":
+    main()
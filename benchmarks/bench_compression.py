@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - response compression cost and ratio"""
+
+__updated__ = "2026-10-19 07:51:34"
+
+"""
+A JSON list of --rows rows served through a Flask app with api.compression,
+per encoding and level (Flask test client, so the view and hook are timed):
+
+- identity:              no Accept-Encoding (the baseline)
+- gzip-N / zstd-N:       compressed on every request at level N (zstd only
+                         when available)
+- static.gzip:           the same body as a strong-ETag StaticResponse, its
+                         compressed form served from the cache
+
+`ratio` is compressed / identity size: the CPU a level costs against the
+bytes it saves.
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_compression [--rows 200] [--iterations N] [--json out.json]
+"""
+
+import argparse
+
+from flask import Flask, jsonify
+
+from api.compression import GZIP, ZSTD, ResponseCompressor, available_encodings
+from util.static_response import StaticResponse
+
+from benchmarks.common import add_output_argument, measure, report
+
+
+def build_app(rows: int, encoding: str, level: int) -> Flask:
+    app = Flask(__name__)
+    app.after_request(ResponseCompressor(gzip_level=level, zstd_level=level, encodings=[encoding]))
+    data = [{"id": i, "name": f"item-{i}", "email": f"user{i}@example.com", "active": i % 3 == 0} for i in range(rows)]
+    static = StaticResponse.json(data)
+    app.add_url_rule("/rows", "rows", lambda: jsonify(data))
+    app.add_url_rule("/static-rows", "static_rows", lambda: static.flask_response(None))
+    return app
+
+
+def run(name: str, app: Flask, path: str, headers: dict, iterations: int, identity_size: int) -> dict:
+    client = app.test_client()
+    size = len(client.get(path, headers=headers).get_data())
+    result = measure(name, lambda: client.get(path, headers=headers), iterations=iterations, warmup=50)
+    result["bytes"] = size
+    result["ratio"] = round(size / identity_size, 3)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=2000)
+    add_output_argument(parser)
+    args = parser.parse_args()
+    n = args.iterations
+
+    plain = build_app(args.rows, GZIP, 6)
+    identity_size = len(plain.test_client().get("/rows").get_data())
+    results = [run("identity", plain, "/rows", {}, n, identity_size)]
+    cases = [(GZIP, level) for level in (1, 6, 9)]
+    if ZSTD in available_encodings():
+        cases += [(ZSTD, level) for level in (1, 3, 9)]
+    for encoding, level in cases:
+        app = build_app(args.rows, encoding, level)
+        results.append(run(f"{encoding}-{level}", app, "/rows", {"Accept-Encoding": encoding}, n, identity_size))
+    results.append(run("static.gzip", plain, "/static-rows", {"Accept-Encoding": GZIP}, n, identity_size))
+    report("compression", results, args)
+
+
+if __name__ == "__main__":
+    main()
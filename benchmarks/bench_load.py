@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - HTTP load generator for the API"""
+
+__updated__ = "2026-10-19 01:36:05"
+
+"""
+Closed-loop load: --concurrency client threads each send the next request as
+soon as the previous one is answered, cycling over --paths, for --duration
+seconds after --warmup seconds. Reports throughput and p50/p95/p99 per path
+and overall; non-2xx/3xx answers and connection errors are counted as errors.
+
+Targets:
+
+- inprocess:  the Flask app via its test client, one per thread (no sockets;
+              measures the app and the GIL)
+- gunicorn:   starts `gunicorn` on a free local port with --workers and
+              --threads, waits for /health, runs, then stops it
+- url:        any running server at --url
+
+`/_bench/apikey` is added to the app for the load run: `require_apikey` with
+the API key cache in front of fakeredis (or --redis-url), so the auth path
+is exercised without a Redis server. Postgres and Redis are disabled in the
+app itself unless --with-datastores (then the usual PG_*/REDIS_* settings
+apply).
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_load --target inprocess --concurrency 8 --duration 5
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_load --target gunicorn --workers 4 --threads 4 --json load.json
+"""
+
+import argparse
+import http.client
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.common import add_output_argument, report, summarize
+
+APIKEY = "bench-load-key"
+BENCH_ROUTE = "/_bench/apikey"
+DEFAULT_PATHS = f"/health,/example,{BENCH_ROUTE}"
+
+# (status or 0 for a connection error) for one request
+Sender = Callable[[str], int]
+
+
+def _redis_client(url: Optional[str]):
+    if url:
+        import redis  # pylint: disable=import-outside-toplevel
+
+        return redis.Redis.from_url(url)
+    import fakeredis  # pylint: disable=import-outside-toplevel
+
+    return fakeredis.FakeRedis()
+
+
+def build_app(*, with_datastores: bool = False, redis_url: Optional[str] = None):
+    """
+    The API app as served in production, plus the `/_bench/apikey` route.
+    """
+    from config import get_config  # pylint: disable=import-outside-toplevel
+    from app import create_api_app  # pylint: disable=import-outside-toplevel
+    from db.apikey_cache import ApiKeyCache  # pylint: disable=import-outside-toplevel
+    from util.decorators import require_apikey  # pylint: disable=import-outside-toplevel
+
+    config = get_config()
+    config["LOG_LEVEL"] = os.getenv("LOG_LEVEL", "WARNING")
+    if not with_datastores:
+        config.update(PG_ENABLED=False, REDIS_ENABLED=False)
+    app = create_api_app(config)
+
+    r = _redis_client(redis_url)
+    r.hset(f"apikey:{APIKEY}", mapping={"customer_id": "bench", "disabled": "0"})
+    stores = {"redis": r, "apikey_cache": ApiKeyCache(r)}
+
+    @app.route(BENCH_ROUTE, methods=["GET"])
+    @require_apikey(stores)
+    def bench_apikey():
+        return {"ok": True}
+
+    return app
+
+
+def gunicorn_app():
+    """
+    Application factory for `gunicorn "benchmarks.bench_load:gunicorn_app()"`.
+    """
+    return build_app(
+        with_datastores=os.getenv("BENCH_WITH_DATASTORES") == "1",
+        redis_url=os.getenv("BENCH_REDIS_URL") or None,
+    )
+
+
+def _inprocess_sender(app) -> Callable[[], Sender]:
+    def factory() -> Sender:
+        client = app.test_client()
+
+        def send(path: str) -> int:
+            return client.get(path, headers={"X-API-Key": APIKEY}).status_code
+
+        return send
+
+    return factory
+
+
+def _http_sender(base_url: str) -> Callable[[], Sender]:
+    parts = urlsplit(base_url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    prefix = parts.path.rstrip("/")
+
+    def factory() -> Sender:
+        conn: List[Optional[http.client.HTTPConnection]] = [None]
+
+        def send(path: str) -> int:
+            if conn[0] is None:
+                conn[0] = http.client.HTTPConnection(host, port, timeout=10)
+            try:
+                conn[0].request("GET", prefix + path, headers={"X-API-Key": APIKEY})
+                resp = conn[0].getresponse()
+                resp.read()
+                if resp.will_close:
+                    conn[0].close()
+                    conn[0] = None
+                return resp.status
+            except (OSError, http.client.HTTPException):
+                conn[0].close()
+                conn[0] = None
+                return 0
+
+        return send
+
+    return factory
+
+
+def run_load(
+    sender_factory: Callable[[], Sender],
+    paths: List[str],
+    *,
+    concurrency: int = 8,
+    duration: float = 5.0,
+    warmup: float = 1.0,
+) -> List[dict]:
+    """
+    Drive the closed loop and summarize per path plus an overall `all` row.
+    """
+    recording = threading.Event()
+    stop = threading.Event()
+    # per thread: (path index, latency ns, ok)
+    samples: List[List[Tuple[int, int, bool]]] = [[] for _ in range(concurrency)]
+    ready = threading.Barrier(concurrency + 1)
+
+    def client(slot: int) -> None:
+        send = sender_factory()
+        out = samples[slot]
+        clock = time.perf_counter_ns
+        index = slot % len(paths)
+        ready.wait()
+        while not stop.is_set():
+            t0 = clock()
+            status = send(paths[index])
+            if recording.is_set():
+                out.append((index, clock() - t0, 200 <= status < 400))
+            index = (index + 1) % len(paths)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    time.sleep(warmup)
+    recording.set()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    elapsed = time.perf_counter() - started
+    for thread in threads:
+        thread.join(30)
+
+    merged = [sample for per_thread in samples for sample in per_thread]
+    results = []
+    for index, path in enumerate(paths):
+        rows = [s for s in merged if s[0] == index]
+        results.append(
+            summarize(f"GET {path}", [s[1] for s in rows], elapsed, errors=sum(1 for s in rows if not s[2]))
+        )
+    results.append(
+        summarize(
+            f"all x{concurrency}",
+            [s[1] for s in merged],
+            elapsed,
+            errors=sum(1 for s in merged if not s[2]),
+        )
+    )
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(base_url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    send = _http_sender(base_url)()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {process.returncode}")
+        if send("/health") == 200:
+            return
+        time.sleep(0.2)
+    raise SystemExit(f"gunicorn did not answer /health within {timeout:.0f}s")
+
+
+def _start_gunicorn(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    if importlib.util.find_spec("gunicorn") is None:
+        raise SystemExit("gunicorn is not installed (poetry add --group dev gunicorn)")
+    port = _free_port()
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath("src/skel_v3"), os.getcwd(), env.get("PYTHONPATH")]))
+    env["BENCH_WITH_DATASTORES"] = "1" if args.with_datastores else "0"
+    env["BENCH_REDIS_URL"] = args.redis_url or ""
+    command = [
+        sys.executable,
+        "-m",
+        "gunicorn",
+        "--bind",
+        f"127.0.0.1:{port}",
+        "--workers",
+        str(args.workers),
+        "--threads",
+        str(args.threads),
+        "--log-level",
+        "warning",
+        "benchmarks.bench_load:gunicorn_app()",
+    ]
+    process = subprocess.Popen(command, env=env)  # pylint: disable=consider-using-with
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(base_url, process)
+    except BaseException:
+        process.terminate()
+        process.wait(10)
+        raise
+    return process, base_url
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("inprocess", "gunicorn", "url"), default="inprocess")
+    parser.add_argument("--url", default="http://127.0.0.1:9000")
+    parser.add_argument("--paths", default=DEFAULT_PATHS)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--with-datastores", action="store_true")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+    process = None
+    if args.target == "inprocess":
+        factory = _inprocess_sender(build_app(with_datastores=args.with_datastores, redis_url=args.redis_url))
+    elif args.target == "gunicorn":
+        process, base_url = _start_gunicorn(args)
+        factory = _http_sender(base_url)
+    else:
+        factory = _http_sender(args.url)
+
+    try:
+        results = run_load(
+            factory, paths, concurrency=args.concurrency, duration=args.duration, warmup=args.warmup
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(30)
+
+    report(f"load-{args.target}", results, args)
+    errors = sum(r["errors"] for r in results[:-1])
+    if errors:
+        print(f"{errors} requests failed")
+
+
+if __name__ == "__main__":
+    main()
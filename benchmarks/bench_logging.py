@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - per-record logging cost"""
+
+__updated__ = "2026-10-19 01:02:40"
+
+"""
+Per-record cost on the calling thread for the sync JsonStdoutHandler and the
+queued AsyncJsonHandler, both writing to /dev/null. For the async handler the
+time to drain the queue afterwards is reported too. The encoder alone is
+measured with the stdlib and the orjson backends.
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_logging [--iterations N]
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from logs.async_handler import AsyncJsonHandler
+from logs.encoder import JsonLogEncoder, orjson
+from logs.formatter import JsonStdoutHandler
+
+from benchmarks.common import add_output_argument, measure, report
+
+EXTRA = {
+    "request_id": "0f8e8a3c-3c1b-4f57-9d0e-1f2a3b4c5d6e",
+    "http_method": "GET",
+    "http_path": "/example",
+    "remote_ip": "127.0.0.1",
+    "redis_status": "ok",
+}
+
+
+def _bench(name: str, handler: logging.Handler, iterations: int) -> dict:
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+
+    def log_one():
+        logger.info("API key validated", extra=EXTRA)
+
+    result = measure(name, log_one, iterations=iterations)
+    started = time.perf_counter()
+    handler.flush()
+    result["drain_ms"] = (time.perf_counter() - started) * 1000.0
+    handler.close()
+    return result
+
+
+def _bench_encoder(name: str, encoder: JsonLogEncoder, iterations: int) -> dict:
+    record = logging.LogRecord("bench", logging.INFO, __file__, 1, "API key validated", None, None, "view")
+    record.__dict__.update(EXTRA)
+    return measure(name, lambda: encoder.encode(record), iterations=iterations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        results = [
+            _bench("sync", JsonStdoutHandler("bench", "bench", stream=devnull), args.iterations),
+            _bench(
+                "async",
+                AsyncJsonHandler("bench", "bench", stream=devnull, queue_size=args.iterations * 2),
+                args.iterations,
+            ),
+        ]
+    encoders = [_bench_encoder("encode-json", JsonLogEncoder("bench", "bench", use_orjson=False), args.iterations)]
+    if orjson is not None:
+        encoders.append(
+            _bench_encoder("encode-orjson", JsonLogEncoder("bench", "bench", use_orjson=True), args.iterations)
+        )
+    report("logging", results + encoders, args)
+    for r in results:
+        print(f"{r['name']}: drain after run {r['drain_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
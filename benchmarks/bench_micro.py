@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - hot-path microbenchmarks"""
+
+__updated__ = "2026-10-19 01:14:26"
+
+"""
+One quick run over the per-request and per-job hot paths, to catch
+regressions between two commits (save with --json, diff with
+benchmarks.compare):
+
+- apikey.decode:          `decode_apikey_hash` of a raw HGETALL reply
+- apikey.cache_hit:       `ApiKeyCache.get` for a cached key
+- require_apikey.cache:   the decorator around a trivial view, cached key
+- require_apikey.lookup:  the same with an HGETALL per request
+- log.emit:               `JsonStdoutHandler.emit` of a request log line
+- measure_time:           the timing decorator around a no-op
+- trace.span_noop:        `span()` with tracing off
+- worker.stream_job:      XADD + XREADGROUP + handler + XACK for one job
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_micro [--iterations N] [--redis-url URL] [--json out.json]
+
+Without --redis-url, fakeredis is used, which measures the Python side only.
+"""
+
+import argparse
+import logging
+import os
+
+import redis
+from flask import Flask
+
+from db.apikey_cache import ApiKeyCache
+from db.redis_apikeys import decode_apikey_hash
+from logs.formatter import JsonStdoutHandler
+from util.decorators import measure_time, require_apikey
+from util.tracing import span
+from worker.runtime import _handle_message
+from worker.streams import StreamConsumer
+
+from benchmarks.common import add_output_argument, measure, report
+
+APIKEY = "bench-micro-key"
+STREAM = "bench:micro:jobs"
+HASH = {
+    b"customer_id": b"bench",
+    b"tier": b"pro",
+    b"rate_limit": b"1000",
+    b"quota_daily": b"100000",
+    b"allowed_endpoints": b"/example,/users",
+    b"disabled": b"0",
+}
+LOG_EXTRA = {
+    "request_id": "0f8e8a3c-3c1b-4f57-9d0e-1f2a3b4c5d6e",
+    "http_method": "GET",
+    "http_path": "/example",
+    "http_status": 200,
+    "duration_ms": 1.25,
+}
+
+
+def _redis_client(url: str | None) -> redis.Redis:
+    if url:
+        return redis.Redis.from_url(url)
+    import fakeredis  # pylint: disable=import-outside-toplevel
+
+    return fakeredis.FakeRedis()
+
+
+def _require_apikey(app: Flask, stores: dict, name: str, iterations: int) -> dict:
+    @require_apikey(stores)
+    def view():
+        return "ok"
+
+    with app.test_request_context("/bench", headers={"X-API-Key": APIKEY}):
+        return measure(name, view, iterations=iterations)
+
+
+def _log_emit(iterations: int) -> dict:
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        handler = JsonStdoutHandler("bench", "bench", stream=devnull)
+        record = logging.LogRecord("bench", logging.INFO, __file__, 1, "Request complete", None, None, "view")
+        record.__dict__.update(LOG_EXTRA)
+        return measure("log.emit", lambda: handler.emit(record), iterations=iterations)
+
+
+def _worker_job(r: redis.Redis, iterations: int) -> dict:
+    r.delete(STREAM)
+    consumer = StreamConsumer(r, stream=STREAM, group="bench", consumer="bench-1", batch_size=1)
+    consumer.ensure_group()
+
+    def handler(message_id, fields):
+        _handle_message({}, {}, message_id, fields)
+
+    def one_job():
+        r.xadd(STREAM, {"n": "1"})
+        consumer.process(consumer.read_batch(block_ms=0), handler)
+
+    try:
+        return measure("worker.stream_job", one_job, iterations=iterations, warmup=100)
+    finally:
+        r.delete(STREAM)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--redis-url", default=None)
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    r = _redis_client(args.redis_url)
+    r.hset(f"apikey:{APIKEY}", mapping=HASH)
+    cache = ApiKeyCache(r)
+    cache.get(APIKEY)
+
+    @measure_time
+    def noop():
+        return None
+
+    def span_noop():
+        with span("redis"):
+            pass
+
+    app = Flask(__name__)
+    io_iterations = max(100, args.iterations // 10)
+    results = [
+        measure("apikey.decode", lambda: decode_apikey_hash(HASH), iterations=args.iterations),
+        measure("apikey.cache_hit", lambda: cache.get(APIKEY), iterations=args.iterations),
+        _require_apikey(app, {"redis": r, "apikey_cache": cache}, "require_apikey.cache", args.iterations),
+        _require_apikey(app, {"redis": r}, "require_apikey.lookup", io_iterations),
+        _log_emit(args.iterations),
+        measure("measure_time", noop, iterations=args.iterations),
+        measure("trace.span_noop", span_noop, iterations=args.iterations),
+        _worker_job(r, io_iterations),
+    ]
+    report("micro", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - require_apikey with and without rate limiting"""
+
+__updated__ = "2026-10-19 01:02:40"
+
+"""
+Requests/sec through `util.decorators.require_apikey` (view body is trivial):
+
+- lookup:           plain HGETALL per request
+- cache:            per-worker metadata cache
+- ratelimit:        Lua rate limit + quota, one round trip
+- ratelimit+local:  same, with the local token-bucket pre-check
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_require_apikey [--redis-url redis://localhost:6379/0]
+
+Without --redis-url, fakeredis (with lupa for Lua) is used, which measures
+the Python side only.
+"""
+
+import argparse
+import logging
+
+import redis
+from flask import Flask
+
+from db.apikey_cache import ApiKeyCache
+from db.redis_ratelimit import RateLimiter
+from util.decorators import require_apikey
+
+from benchmarks.common import add_output_argument, measure, report
+
+APIKEY = "bench-key"
+
+
+def _redis_client(url: str | None) -> redis.Redis:
+    if url:
+        return redis.Redis.from_url(url)
+    import fakeredis  # pylint: disable=import-outside-toplevel
+
+    return fakeredis.FakeRedis()
+
+
+def _scenario(app: Flask, stores: dict, iterations: int, name: str) -> dict:
+    @require_apikey(stores)
+    def view():
+        return "ok"
+
+    with app.test_request_context("/bench", headers={"X-API-Key": APIKEY}):
+        return measure(name, view, iterations=iterations)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--iterations", type=int, default=5000)
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    r = _redis_client(args.redis_url)
+    r.hset(
+        f"apikey:{APIKEY}",
+        mapping={"customer_id": "bench", "rate_limit": str(10**9), "quota_daily": str(10**9), "disabled": "0"},
+    )
+
+    app = Flask(__name__)
+    results = [
+        _scenario(app, {"redis": r}, args.iterations, "lookup"),
+        _scenario(app, {"redis": r, "apikey_cache": ApiKeyCache(r)}, args.iterations, "cache"),
+        _scenario(
+            app,
+            {"redis": r, "rate_limiter": RateLimiter(r, local_precheck=False)},
+            args.iterations,
+            "ratelimit",
+        ),
+        _scenario(app, {"redis": r, "rate_limiter": RateLimiter(r)}, args.iterations, "ratelimit+local"),
+    ]
+    report("require_apikey", results, args)
+
+
+if __name__ == "__main__":
+    main()
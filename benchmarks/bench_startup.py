@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - cold start (import time, time to first response)"""
+
+__updated__ = "2026-10-19 05:48:13"
+
+"""
+Each run is a fresh interpreter, so nothing is cached between runs except
+the OS page cache and the .pyc files:
+
+- startup.import:          `import <module>` as reported by `python -X importtime`
+- startup.imports_total:   every import of that interpreter (site included)
+- startup.first_response:  from spawning a process that builds the app
+                           (`create_api_app`) and serves it on a local port
+                           to its first 200 on /health
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_startup [--runs N] [--top 15] [--json out.json]
+
+The child processes inherit the environment: datastores are created as
+configured (PG_ENABLED, REDIS_ENABLED, DATASTORES_STARTUP, ...), and
+SERVICE_ENV defaults to `prod` here so that .env discovery is skipped as in
+a container. `--top` lists the slowest imports (median cumulative time) to
+find what a regression pulled in.
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.common import add_output_argument, report, summarize
+
+# Child of the first-response run: build the app, serve it until killed
+_SERVER = """
+import sys
+from werkzeug.serving import make_server
+from app import create_api_app
+from config import get_config
+make_server("127.0.0.1", int(sys.argv[1]), create_api_app(get_config())).serve_forever()
+"""
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath("src/skel_v3"), os.getcwd(), env.get("PYTHONPATH")]))
+    env.setdefault("SERVICE_ENV", "prod")
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    (module, self µs, cumulative µs, nesting level) per line of
+    `-X importtime` output.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header
+        name = fields[2].rstrip()
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), level))
+    return rows
+
+
+def measure_imports(module: str, runs: int) -> Tuple[List[int], List[int], Dict[str, List[int]]]:
+    """
+    Per run: cumulative import time of `module` and of every top-level
+    import (µs); per module, its cumulative times across runs.
+    """
+    target, total = [], []
+    per_module: Dict[str, List[int]] = {}
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            env=_env(),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        rows = parse_importtime(completed.stderr)
+        target.append(next(cumulative for name, _, cumulative, level in rows if name == module and level == 0))
+        total.append(sum(cumulative for _, _, cumulative, level in rows if level == 0))
+        for name, _, cumulative, _ in rows:
+            per_module.setdefault(name, []).append(cumulative)
+    return target, total, per_module
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _health_status(port: int) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    try:
+        conn.request("GET", "/health")
+        return conn.getresponse().status
+    except OSError:
+        return 0
+    finally:
+        conn.close()
+
+
+def measure_first_response(runs: int, timeout: float = 30.0) -> List[int]:
+    """
+    Nanoseconds from spawn to the first 200 on /health, per run.
+    """
+    samples = []
+    for _ in range(runs):
+        port = _free_port()
+        started = time.perf_counter_ns()
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, "-c", _SERVER, str(port)], env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            deadline = time.monotonic() + timeout
+            while _health_status(port) != 200:
+                if process.poll() is not None:
+                    raise SystemExit(f"app process exited with status {process.returncode}")
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"no response on /health after {timeout:.0f}s")
+                time.sleep(0.002)
+            samples.append(time.perf_counter_ns() - started)
+        finally:
+            process.terminate()
+            process.wait(10)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="app", help="module whose import is measured")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    parser.add_argument("--skip-server", action="store_true", help="only measure imports")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    target, total, per_module = measure_imports(args.module, args.runs)
+    elapsed = time.perf_counter() - started
+    results = [
+        summarize("startup.import", [us * 1000 for us in target], elapsed),
+        summarize("startup.imports_total", [us * 1000 for us in total], elapsed),
+    ]
+    if not args.skip_server:
+        started = time.perf_counter()
+        samples = measure_first_response(args.runs)
+        results.append(summarize("startup.first_response", samples, time.perf_counter() - started))
+    report("startup", results, args)
+
+    if args.top:
+        slowest = sorted(((statistics.median(v), k) for k, v in per_module.items()), reverse=True)[: args.top]
+        print(f"\n{'module':<50} {'cumulative ms':>14}")
+        for cumulative, name in slowest:
+            print(f"{name:<50} {cumulative / 1000.0:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
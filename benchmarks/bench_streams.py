@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - Redis Streams job consumption"""
+
+__updated__ = "2026-10-19 01:02:40"
+
+"""
+Jobs/sec consumed through `worker.streams.StreamConsumer` (read + handle +
+XACK) for several batch sizes, plus the enqueue-to-ack latency of each job.
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_streams [--redis-url redis://localhost:6379/0]
+
+Without --redis-url, fakeredis is used, which measures the Python side only.
+"""
+
+import argparse
+import logging
+import time
+
+import redis
+
+from worker.streams import StreamConsumer
+
+from benchmarks.common import add_output_argument, percentile, report
+
+STREAM = "bench:jobs"
+
+
+def _redis_client(url: str | None) -> redis.Redis:
+    if url:
+        return redis.Redis.from_url(url)
+    import fakeredis  # pylint: disable=import-outside-toplevel
+
+    return fakeredis.FakeRedis()
+
+
+def _scenario(r: redis.Redis, jobs: int, batch_size: int) -> dict:
+    r.delete(STREAM)
+    consumer = StreamConsumer(r, stream=STREAM, group="bench", consumer="bench-1", batch_size=batch_size)
+    consumer.ensure_group()
+
+    pipe = r.pipeline(transaction=False)
+    for _ in range(jobs):
+        pipe.xadd(STREAM, {"enqueued": repr(time.time())})
+    pipe.execute()
+
+    latencies = []
+
+    def handle(_mid, fields):
+        latencies.append((time.time() - float(fields[b"enqueued"])) * 1e6)
+
+    started = time.perf_counter()
+    done = 0
+    while done < jobs:
+        done += consumer.process(consumer.read_batch(block_ms=0), handle)
+    elapsed = time.perf_counter() - started
+    r.delete(STREAM)
+
+    latencies.sort()
+    return {
+        "name": f"batch={batch_size}",
+        "iterations": jobs,
+        "ops_per_sec": jobs / elapsed if elapsed else 0.0,
+        "mean_us": sum(latencies) / len(latencies),
+        "p50_us": percentile(latencies, 50),
+        "p95_us": percentile(latencies, 95),
+        "p99_us": percentile(latencies, 99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--batch-sizes", default="1,32,256")
+    add_output_argument(parser)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    r = _redis_client(args.redis_url)
+    report("streams", [_scenario(r, args.jobs, int(b)) for b in args.batch_sizes.split(",")], args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - request body validation"""
+
+__updated__ = "2026-10-19 07:15:52"
+
+"""
+`AuthRequestSchema` loads, plain marshmallow against api.validation:
+
+- marshmallow.new:       `AuthRequestSchema().load(body)` (instance per request)
+- marshmallow.cached:    one instance, `.load(body)`
+- compiled:              `compiled_schema(AuthRequestSchema).load(body)`
+- *.invalid:             the same with a username the regex rejects
+- *.many100:             100 bodies (`Schema(many=True).load` / `load_many`)
+- validate_body:         the decorator around a trivial view (Flask test
+                         request context, JSON parsing included)
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_validation [--iterations N] [--json out.json]
+"""
+
+import argparse
+import json
+
+from flask import Flask, g
+from marshmallow import ValidationError
+
+from api.schemas import AuthRequestSchema
+from api.validation import compiled_schema, validate_body
+
+from benchmarks.common import add_output_argument, measure, report
+
+BODY = {"username": "alice.smith-01", "password": "hunter2", "client_id": "web", "ip": "10.0.0.1"}
+INVALID = dict(BODY, username="alice smith")
+BATCH = [dict(BODY, username=f"user{i:03d}") for i in range(100)]
+
+
+def _expect_error(load):
+    def run():
+        try:
+            load(INVALID)
+        except ValidationError:
+            pass
+
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    add_output_argument(parser)
+    args = parser.parse_args()
+    n = args.iterations
+
+    cached = AuthRequestSchema()
+    many = AuthRequestSchema(many=True)
+    compiled = compiled_schema(AuthRequestSchema)
+
+    app = Flask(__name__)
+
+    @validate_body(AuthRequestSchema)
+    def view():
+        return g.body
+
+    payload = json.dumps(BODY).encode()
+
+    def decorated():
+        with app.test_request_context("/login", method="POST", data=payload):
+            view()
+
+    results = [
+        measure("marshmallow.new", lambda: AuthRequestSchema().load(BODY), iterations=n),
+        measure("marshmallow.cached", lambda: cached.load(BODY), iterations=n),
+        measure("compiled", lambda: compiled.load(BODY), iterations=n),
+        measure("marshmallow.cached.invalid", _expect_error(cached.load), iterations=n // 4),
+        measure("compiled.invalid", _expect_error(compiled.load), iterations=n // 4),
+        measure("marshmallow.many100", lambda: many.load(BATCH), iterations=max(1, n // 100)),
+        measure("compiled.many100", lambda: compiled.load_many(BATCH), iterations=max(1, n // 100)),
+        measure("validate_body", decorated, iterations=n // 4),
+    ]
+    report("validation", results, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - sync vs asyncio worker runtime on I/O-bound jobs"""
+
+__updated__ = "2026-10-18 17:12:40"
+
+"""
+Jobs/sec for an I/O-bound unit of work on each worker engine:
+
+- inline:   sync, one job at a time
+- thread:   sync, thread pool with --concurrency slots
+- asyncio:  coroutines on one event loop with --concurrency slots
+
+Each job waits --io-ms milliseconds, simulated with sleep by default. With
+--redis-url every job runs --round-trips Redis round trips instead (redis.Redis
+for the sync engines, redis.asyncio for asyncio).
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.bench_worker_io [--jobs N] [--concurrency N] [--redis-url URL]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+import redis
+import redis.asyncio as aioredis
+
+from worker.async_runtime import AsyncEngine
+from worker.engine import ENGINE_THREAD, InlineEngine, PoolEngine
+
+CONFIG = {"LOG_LEVEL": "WARNING"}
+
+
+def _sync_job(args):
+    if args.redis_url:
+        client = redis.Redis.from_url(args.redis_url)
+
+        def job(config, stores):
+            for _ in range(args.round_trips):
+                client.ping()
+            return 1
+
+    else:
+
+        def job(config, stores):
+            time.sleep(args.io_ms / 1000.0)
+            return 1
+
+    return job
+
+
+def _async_job(args):
+    if args.redis_url:
+        client = aioredis.Redis.from_url(args.redis_url)
+
+        async def job(config, stores):
+            for _ in range(args.round_trips):
+                await client.ping()
+            return 1
+
+    else:
+
+        async def job(config, stores):
+            await asyncio.sleep(args.io_ms / 1000.0)
+            return 1
+
+    return job
+
+
+def _run_sync(engine, job, jobs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(jobs):
+        engine.submit(job)
+    engine.drain(None)
+    return time.perf_counter() - started
+
+
+async def _run_async(engine: AsyncEngine, job, jobs: int) -> float:
+    started = time.perf_counter()
+    for _ in range(jobs):
+        await engine.submit(job)
+    await engine.drain(None)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--io-ms", type=float, default=10.0)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--round-trips", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    inline_jobs = max(1, args.jobs // 10)
+    results = [
+        ("inline", inline_jobs, _run_sync(InlineEngine(CONFIG, {}), _sync_job(args), inline_jobs)),
+        (
+            f"thread x{args.concurrency}",
+            args.jobs,
+            _run_sync(
+                PoolEngine(CONFIG, {}, kind=ENGINE_THREAD, concurrency=args.concurrency),
+                _sync_job(args),
+                args.jobs,
+            ),
+        ),
+        (
+            f"asyncio x{args.concurrency}",
+            args.jobs,
+            asyncio.run(_run_async(AsyncEngine(CONFIG, {}, concurrency=args.concurrency), _async_job(args), args.jobs)),
+        ),
+    ]
+
+    print(f"{'engine':<40} {'jobs':>8} {'jobs/s':>12}")
+    for name, jobs, elapsed in results:
+        print(f"{name:<40} {jobs:>8} {jobs / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - shared timing helpers"""
+
+__updated__ = "2026-10-19 00:58:12"
+
+"""
+Run benchmarks from the repository root with the package on the path:
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.<module> --help
+
+Every benchmark takes `--json PATH` to save its results (with the Python
+version, host and arguments) for `python -m benchmarks.compare`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def measure(name: str, func: Callable[[], Any], *, iterations: int = 10000, warmup: int = 500) -> Dict[str, Any]:
+    """
+    Call `func` `iterations` times and return throughput and latency percentiles (µs).
+    """
+    for _ in range(warmup):
+        func()
+
+    clock = time.perf_counter_ns
+    samples = [0] * iterations
+    started = clock()
+    for i in range(iterations):
+        t0 = clock()
+        func()
+        samples[i] = clock() - t0
+    elapsed = (clock() - started) / 1e9
+
+    latencies = sorted(s / 1000.0 for s in samples)
+    return {
+        "name": name,
+        "iterations": iterations,
+        "ops_per_sec": iterations / elapsed if elapsed else 0.0,
+        "mean_us": sum(latencies) / len(latencies),
+        "p50_us": percentile(latencies, 50),
+        "p95_us": percentile(latencies, 95),
+        "p99_us": percentile(latencies, 99),
+    }
+
+
+def summarize(name: str, latencies_ns: List[int], elapsed: float, **extra: Any) -> Dict[str, Any]:
+    """
+    Same shape as `measure()` from raw per-operation latencies (ns) and the
+    wall time they took in total (s), e.g. for concurrent load runs.
+    """
+    latencies = sorted(ns / 1000.0 for ns in latencies_ns)
+    count = len(latencies)
+    result = {
+        "name": name,
+        "iterations": count,
+        "ops_per_sec": count / elapsed if elapsed else 0.0,
+        "mean_us": sum(latencies) / count if count else 0.0,
+        "p50_us": percentile(latencies, 50),
+        "p95_us": percentile(latencies, 95),
+        "p99_us": percentile(latencies, 99),
+    }
+    result.update(extra)
+    return result
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    """
+    Print results as a fixed-width table.
+    """
+    print(f"{'benchmark':<40} {'ops/s':>12} {'mean µs':>10} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10}")
+    for r in results:
+        print(
+            f"{r['name']:<40} {r['ops_per_sec']:>12.0f} {r['mean_us']:>10.2f} "
+            f"{r['p50_us']:>10.2f} {r['p95_us']:>10.2f} {r['p99_us']:>10.2f}"
+        )
+
+
+def add_output_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--json", metavar="PATH", default=None, help="also save the results as JSON")
+
+
+def write_results(path: str, suite: str, results: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> None:
+    document = {
+        "suite": suite,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "params": params or {},
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(document, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def report(suite: str, results: List[Dict[str, Any]], args: argparse.Namespace) -> None:
+    """
+    Print the results table and save them when `--json` was given.
+    """
+    print_results(results)
+    if getattr(args, "json", None):
+        write_results(args.json, suite, results, {k: v for k, v in vars(args).items() if k != "json"})
+        print(f"results saved to {args.json}")
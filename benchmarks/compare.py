@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - compare two saved runs"""
+
+__updated__ = "2026-10-19 01:44:51"
+
+"""
+Side by side throughput and p99 of two `--json` results of the same
+benchmark, matched by name. A benchmark regresses when its throughput drops,
+or its p99 grows, by more than --threshold percent; with --fail the exit
+status is 1 if any did (e.g. in CI).
+
+PYTHONPATH=src/skel_v3 python -m benchmarks.compare base.json new.json [--threshold 10] [--fail]
+
+Microbenchmarks are noisy below a few percent; compare runs from the same
+machine and repeat before trusting a small difference.
+"""
+
+import argparse
+import sys
+from typing import Any, Dict, List
+
+from benchmarks.common import load_results
+
+
+def _change(base: float, new: float) -> float:
+    return (new - base) / base * 100.0 if base else 0.0
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 10.0) -> List[Dict[str, Any]]:
+    """
+    One row per benchmark present in both runs, with percent changes and a
+    `regression` flag.
+    """
+    base_by_name = {r["name"]: r for r in baseline.get("results", ())}
+    rows = []
+    for result in current.get("results", ()):
+        base = base_by_name.get(result["name"])
+        if base is None:
+            continue
+        ops_change = _change(base["ops_per_sec"], result["ops_per_sec"])
+        p99_change = _change(base["p99_us"], result["p99_us"])
+        rows.append(
+            {
+                "name": result["name"],
+                "base_ops_per_sec": base["ops_per_sec"],
+                "ops_per_sec": result["ops_per_sec"],
+                "ops_change_pct": ops_change,
+                "base_p99_us": base["p99_us"],
+                "p99_us": result["p99_us"],
+                "p99_change_pct": p99_change,
+                "regression": ops_change < -threshold or p99_change > threshold,
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    parser.add_argument("--fail", action="store_true", help="exit 1 on any regression")
+    args = parser.parse_args()
+
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    if baseline.get("suite") != current.get("suite"):
+        print(f"warning: comparing suite {baseline.get('suite')!r} with {current.get('suite')!r}")
+    for key in ("python", "machine", "cpus"):
+        if baseline.get(key) != current.get(key):
+            print(f"warning: {key} differs ({baseline.get(key)} vs {current.get(key)})")
+
+    rows = compare(baseline, current, args.threshold)
+    print(f"{'benchmark':<40} {'base ops/s':>12} {'ops/s':>12} {'Δ%':>8} {'base p99':>10} {'p99 µs':>10} {'Δ%':>8}")
+    for row in rows:
+        print(
+            f"{row['name']:<40} {row['base_ops_per_sec']:>12.0f} {row['ops_per_sec']:>12.0f} "
+            f"{row['ops_change_pct']:>+8.1f} {row['base_p99_us']:>10.2f} {row['p99_us']:>10.2f} "
+            f"{row['p99_change_pct']:>+8.1f}{'  REGRESSION' if row['regression'] else ''}"
+        )
+    regressions = [row["name"] for row in rows if row["regression"]]
+    if regressions and args.fail:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
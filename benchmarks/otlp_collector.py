@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Benchmarks - stand-in OTLP/HTTP collector"""
+
+__updated__ = "2026-10-19 00:31:02"
+
+"""
+Accepts OTLP/HTTP JSON on `POST /v1/traces` (what `util.tracing.OtlpExporter`
+sends) and prints one line per span, indented under its parent, so traces
+can be checked locally without running a real collector.
+
+python -m benchmarks.otlp_collector [--port 4318] [--quiet]
+
+With --quiet only a per-batch span count is printed.
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+TRACES_PATH = "/v1/traces"
+
+
+def _spans(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        span
+        for resource in payload.get("resourceSpans", ())
+        for scope in resource.get("scopeSpans", ())
+        for span in scope.get("spans", ())
+    ]
+
+
+def format_spans(spans: List[Dict[str, Any]]) -> List[str]:
+    """
+    One line per span: duration in ms and name, indented by depth in its trace.
+    """
+    by_id = {span["spanId"]: span for span in spans}
+
+    def depth(span: Dict[str, Any]) -> int:
+        level = 0
+        while span.get("parentSpanId") in by_id and level < 32:
+            span = by_id[span["parentSpanId"]]
+            level += 1
+        return level
+
+    lines = []
+    for span in spans:
+        duration_ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+        attributes = {a["key"]: next(iter(a["value"].values())) for a in span.get("attributes", ())}
+        prefix = f"{span['traceId'][:8]} " if "parentSpanId" not in span or span["parentSpanId"] not in by_id else " " * 9
+        lines.append(f"{prefix}{'  ' * depth(span)}{span['name']:<30} {duration_ms:9.3f} ms {attributes or ''}")
+    return lines
+
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    quiet = False
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self.path != TRACES_PATH:
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            spans = _spans(json.loads(body))
+        except ValueError:
+            self.send_error(400, "expected OTLP JSON")
+            return
+        if self.quiet:
+            print(f"received {len(spans)} spans")
+        else:
+            print("\n".join(format_spans(spans)), flush=True)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    CollectorHandler.quiet = args.quiet
+    server = ThreadingHTTPServer((args.host, args.port), CollectorHandler)
+    print(f"OTLP collector listening on http://{args.host}:{args.port}{TRACES_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,45 @@
 # Default values for environment variables
 DEFAULT_PORT=9000
 PORT=${GUNIPORT:-$DEFAULT_PORT}
+APP_TYPE=${APP_TYPE:-api}
+APP_MODULE=${APP_MODULE:-skel_v3}
 
-echo "Starting Gunicorn on port $PORT"
+# The package modules import each other top-level (from config import ...),
+# so the package directory itself goes on PYTHONPATH: /opt/app/<module> in
+# the image, src/<module> in a checkout.
+if [ -z "$APP_DIR" ]; then
+    for dir in "/opt/app/$APP_MODULE" "$(dirname "$0")/src/$APP_MODULE"; do
+        if [ -d "$dir" ]; then
+            APP_DIR=$dir
+            break
+        fi
+    done
+fi
+export PYTHONPATH="$APP_DIR${PYTHONPATH:+:$PYTHONPATH}"
+export GUNIPORT=$PORT APP_TYPE
 
-# First try Poetry-installed Gunicorn
+# First try Poetry-installed tools, fallback to global ones
+RUN=""
 if command -v poetry > /dev/null; then
-    exec poetry run gunicorn -b 0.0.0.0:$PORT app:app --access-logfile=-
-else
-    # Fallback to globally installed Gunicorn
-    exec gunicorn -b 0.0.0.0:$PORT app:app --access-logfile=-
+    RUN="poetry run"
 fi
+
+case "$APP_TYPE" in
+    worker)
+        echo "Starting worker"
+        exec $RUN python -m "${WORKER_TARGET:-app}"
+        ;;
+    asgi)
+        # gunicorn_conf selects uvicorn workers for APP_TYPE=asgi
+        if ! $RUN python -c "import uvicorn" > /dev/null 2>&1; then
+            echo "APP_TYPE=asgi needs uvicorn: install the asgi extra (poetry install --extras asgi)" >&2
+            exit 1
+        fi
+        echo "Starting Gunicorn (uvicorn workers) on port $PORT"
+        exec $RUN gunicorn -c python:gunicorn_conf "${GUNICORN_APP:-asgi:app}"
+        ;;
+    *)
+        echo "Starting Gunicorn on port $PORT"
+        exec $RUN gunicorn -c python:gunicorn_conf "${GUNICORN_APP:-wsgi:app}"
+        ;;
+esac
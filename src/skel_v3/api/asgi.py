@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""ASGI serving mode (APP_TYPE=asgi)"""
+
+__updated__ = "2026-10-19 10:01:26"
+
+"""
+An ASGI application in front of the Flask app, for uvicorn, hypercorn or
+gunicorn's `uvicorn.workers.UvicornWorker`:
+
+- Routes registered with `AsgiApp.route` are coroutines served on the event
+  loop: the probes (`/health`, `/startup`, `/ready`) and `/example`. Their
+  Redis/Postgres waits use the asyncio clients of `db.init_async_datastores`,
+  so one process keeps many I/O-bound requests in flight.
+- Every other request (`/`, `/metrics`, any Flask route without an async
+  version) is passed to the Flask app on a pool of ASGI_THREADS threads.
+  Request and response bodies are buffered there (no streaming).
+- `require_apikey_async` is the coroutine counterpart of
+  `util.decorators.require_apikey`; it shares the worker's API key cache and
+  rate limiter with the Flask side and only awaits Redis on a miss.
+- Async datastores are opened on lifespan startup and closed on shutdown.
+"""
+
+import asyncio
+import io
+import json
+import logging
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import redis
+
+from db import close_async_datastores, init_async_datastores
+from db.redis_apikeys import get_apikey_metadata_async
+from util.passwords import VerifierBusy
+from util.static_response import StaticResponse
+
+from .health import liveness_status, readiness_status, startup_status
+from .metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# (status, headers, body) of a request sent to the Flask app
+_WsgiResult = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+
+class AsgiRequest:
+    """
+    The parts of an ASGI HTTP scope an async route needs.
+    """
+
+    __slots__ = ("scope", "method", "path", "query_string", "headers", "remote_addr", "request_id", "customer")
+
+    def __init__(self, scope: Dict[str, Any]) -> None:
+        self.scope = scope
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query_string = scope.get("query_string", b"").decode("latin-1")
+        self.headers: Dict[str, str] = {}
+        for name, value in scope.get("headers", ()):
+            key = name.decode("latin-1").lower()
+            value = value.decode("latin-1")
+            self.headers[key] = f"{self.headers[key]},{value}" if key in self.headers else value
+        client = scope.get("client")
+        self.remote_addr = client[0] if client else None
+        self.request_id = self.headers.get("x-request-id") or str(uuid.uuid4())
+        self.customer: Any = None
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name.lower(), default)
+
+
+class BytesResponse:
+    """
+    A JSON body already serialized (see util.static_response).
+    """
+
+    __slots__ = ("body", "status", "headers")
+
+    def __init__(self, body: bytes, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        self.body = body
+        self.status = status
+        self.headers = headers or {}
+
+
+class JsonResponse(BytesResponse):
+    __slots__ = ()
+
+    def __init__(self, body: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(json.dumps(body, separators=(",", ":")).encode(), status, headers)
+
+
+AsyncHandler = Callable[[AsgiRequest], Awaitable[BytesResponse]]
+
+
+class AsgiApp:
+    """
+    Async routes on the event loop, everything else through `wsgi_app`.
+    """
+
+    def __init__(self, wsgi_app: Callable, *, threads: int = 16, metrics: bool = True) -> None:
+        self.wsgi_app = wsgi_app
+        self.routes: Dict[Tuple[str, str], AsyncHandler] = {}
+        self.on_startup: List[Callable[[], Awaitable[None]]] = []
+        self.on_shutdown: List[Callable[[], Awaitable[None]]] = []
+        self.metrics = metrics
+        self._in_flight = HTTP_IN_FLIGHT.labels()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(threads)), thread_name_prefix="asgi-wsgi")
+
+    def route(self, path: str, methods: Tuple[str, ...] = ("GET",)) -> Callable[[AsyncHandler], AsyncHandler]:
+        def decorator(handler: AsyncHandler) -> AsyncHandler:
+            for method in methods:
+                self.routes[(method.upper(), path)] = handler
+            return handler
+
+        return decorator
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise RuntimeError(f"unsupported ASGI scope type {scope['type']!r}")
+        handler = self.routes.get((scope["method"], scope["path"]))
+        if handler is None:
+            status, headers, body = await self._call_wsgi(scope, receive)
+            await _send_response(send, status, headers, body)
+        else:
+            await self._call_native(handler, scope, send)
+
+    # ----------------------------------------------------------------- lifespan
+
+    async def startup(self) -> None:
+        for hook in self.on_startup:
+            await hook()
+
+    async def shutdown(self) -> None:
+        for hook in self.on_shutdown:
+            await hook()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as exc:  # noqa: BLE001
+                    logger.exception("ASGI startup failed")
+                    await send({"type": "lifespan.startup.failed", "message": str(exc)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ------------------------------------------------------------- async routes
+
+    async def _call_native(self, handler: AsyncHandler, scope: Dict[str, Any], send: Callable) -> None:
+        request = AsgiRequest(scope)
+        started = time.perf_counter()
+        if self.metrics:
+            self._in_flight.inc()
+        try:
+            response = await handler(request)
+        except VerifierBusy as exc:
+            response = JsonResponse(
+                {"ok": False, "error": "Too many concurrent logins"}, 429, {"Retry-After": str(exc.retry_after)}
+            )
+        except TimeoutError as exc:
+            retry_after = getattr(exc, "retry_after", 1)
+            response = JsonResponse({"ok": False, "error": "Request timed out"}, 503, {"Retry-After": str(retry_after)})
+        except Exception:  # noqa: BLE001
+            logger.exception("Unhandled error in handler", extra={"request_id": request.request_id})
+            response = JsonResponse({"ok": False, "error": "Internal server error"}, 500)
+        finally:
+            if self.metrics:
+                self._in_flight.dec()
+        if self.metrics:
+            HTTP_SECONDS.labels(request.method, request.path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(request.method, request.path, response.status).inc()
+
+        if response.status == 304:
+            headers = []
+        else:
+            headers = [(b"content-type", b"application/json"), (b"content-length", str(len(response.body)).encode())]
+        headers.extend((k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in response.headers.items())
+        await _send_response(send, response.status, headers, response.body)
+
+    # --------------------------------------------------------------- WSGI bridge
+
+    async def _call_wsgi(self, scope: Dict[str, Any], receive: Callable) -> _WsgiResult:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        environ = _wsgi_environ(scope, b"".join(chunks))
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._run_wsgi, environ)
+
+    def _run_wsgi(self, environ: Dict[str, Any]) -> _WsgiResult:
+        started: List[Any] = []
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info: Any = None) -> Callable:
+            if exc_info is not None and started:
+                raise exc_info[1].with_traceback(exc_info[2])
+            started[:] = [status, headers]
+            return lambda data: None
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            body = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        status, headers = started
+        return (
+            int(status.split(" ", 1)[0]),
+            [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+            body,
+        )
+
+
+async def _send_response(send: Callable, status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _wsgi_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": str(server[0]),
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0] if client else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", ()):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name == "CONTENT_LENGTH":
+            environ["CONTENT_LENGTH"] = value
+        else:
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+# ---------------------------------------------------------------------------
+# Async API key check
+# ---------------------------------------------------------------------------
+
+
+def require_apikey_async(stores: Dict[str, Any]):
+    """
+    `require_apikey` for async routes. `stores` is read on every call (the
+    asyncio clients only exist after lifespan startup): `redis` is a
+    `redis.asyncio.Redis`, `apikey_cache`/`rate_limiter` the worker's shared
+    instances. The metadata is left on `request.customer`.
+    """
+
+    def decorator(func: AsyncHandler) -> AsyncHandler:
+        @wraps(func)
+        async def wrapper(request: AsgiRequest) -> JsonResponse:
+            redis_client = stores.get("redis")
+            apikey_cache = stores.get("apikey_cache")
+            rate_limiter = stores.get("rate_limiter")
+            base_extra = {
+                "request_id": request.request_id,
+                "http_method": request.method,
+                "http_path": request.path,
+                "remote_ip": request.remote_addr,
+            }
+
+            def log(level: int, message: str, **extra_fields):
+                payload = dict(base_extra)
+                payload.update({k: v for k, v in extra_fields.items() if v is not None})
+                logger.log(level, message, extra=payload)
+
+            if redis_client is None:
+                log(logging.ERROR, "Redis client not configured for API key validation", redis_status="missing")
+                return JsonResponse({"ok": False, "error": "Internal configuration error"}, 500)
+
+            apikey = request.header("X-API-Key")
+            decision = None
+            try:
+                if rate_limiter is not None:
+                    decision = await rate_limiter.check_async(apikey, redis_client)
+                    metadata = decision.metadata
+                elif apikey_cache is not None:
+                    metadata = await apikey_cache.get_async(apikey, redis_client)
+                else:
+                    metadata = await get_apikey_metadata_async(redis_client, apikey)
+            except redis.exceptions.AuthenticationError as exc:
+                log(logging.ERROR, f"Redis authentication error during API key lookup: {exc}", redis_status="auth_error")
+                return JsonResponse({"ok": False, "error": "API key store authentication error"}, 500)
+            except redis.exceptions.RedisError as exc:
+                log(logging.ERROR, f"Redis error during API key lookup: {exc}", redis_status="error")
+                return JsonResponse({"ok": False, "error": "API key store unavailable"}, 500)
+
+            if decision is not None and decision.limited:
+                log(logging.INFO, "API key over its limit", redis_status="ok", reason=decision.reason)
+                error = "Daily quota exceeded" if decision.reason == "quota_exceeded" else "Rate limit exceeded"
+                return JsonResponse({"ok": False, "error": error}, 429, decision.headers())
+
+            if metadata is None:
+                log(logging.INFO, "Invalid or disabled API key", redis_status="ok", reason="invalid_or_disabled")
+                return JsonResponse({"ok": False, "error": "Unauthorized"}, 401)
+
+            request.customer = metadata
+            response = await func(request)
+            if decision is not None:
+                response.headers.update(decision.headers())
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Application
+# ---------------------------------------------------------------------------
+
+
+def build_asgi_app(flask_app, *, config: dict) -> AsgiApp:
+    """
+    Wrap the app built by `create_api_app`: its readiness gate, dependency
+    monitor and sync stores (API key cache, rate limiter) are shared.
+    """
+    sync_stores = flask_app.extensions.get("stores", {})
+    readiness = flask_app.extensions.get("readiness")
+    monitor = flask_app.extensions.get("dependency_monitor")
+
+    app = AsgiApp(
+        flask_app,
+        threads=int(config.get("ASGI_THREADS", 16)),
+        metrics=bool(config.get("METRICS_ENABLED", True)),
+    )
+    # Filled on startup; routes look clients up per request
+    app.stores = {}
+
+    async def open_stores() -> None:
+        # The sync stores exist by now, also when created after fork (preload)
+        app.stores.update(apikey_cache=sync_stores.get("apikey_cache"), rate_limiter=sync_stores.get("rate_limiter"))
+        app.stores.update(await init_async_datastores(config))
+
+    async def close_stores() -> None:
+        await close_async_datastores(app.stores)
+
+    app.on_startup.append(open_stores)
+    app.on_shutdown.append(close_stores)
+
+    health_response = StaticResponse.json(liveness_status(config)[0])
+
+    @app.route("/health")
+    async def health(request: AsgiRequest) -> BytesResponse:
+        if health_response.not_modified(request.header("if-none-match")):
+            return BytesResponse(b"", 304, health_response.headers)
+        return BytesResponse(health_response.body, 200, health_response.headers)
+
+    @app.route("/startup")
+    async def startup(_request: AsgiRequest) -> JsonResponse:
+        return JsonResponse(*startup_status(readiness))
+
+    @app.route("/ready")
+    async def ready(_request: AsgiRequest) -> JsonResponse:
+        return JsonResponse(*readiness_status(readiness, monitor))
+
+    @app.route("/example")
+    async def example(_request: AsgiRequest) -> JsonResponse:
+        return JsonResponse({"module": "example"})
+
+    return app
+
+
+def _uvicorn_runner() -> Callable[[AsgiApp, str, int], None]:
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    def run(app: AsgiApp, host: str, port: int) -> None:
+        uvicorn.run(app, host=host, port=port, lifespan="on", log_config=None, access_log=False)
+
+    return run
+
+
+def _hypercorn_runner() -> Callable[[AsgiApp, str, int], None]:
+    from hypercorn.asyncio import serve  # pylint: disable=import-outside-toplevel
+    from hypercorn.config import Config  # pylint: disable=import-outside-toplevel
+
+    def run(app: AsgiApp, host: str, port: int) -> None:
+        hypercorn_config = Config()
+        hypercorn_config.bind = [f"{host}:{port}"]
+        asyncio.run(serve(app, hypercorn_config))
+
+    return run
+
+
+# Server name -> loader importing it and returning a runner
+ASGI_SERVERS: Dict[str, Callable[[], Callable[[AsgiApp, str, int], None]]] = {
+    "uvicorn": _uvicorn_runner,
+    "hypercorn": _hypercorn_runner,
+}
+
+
+def serve_asgi(app: AsgiApp, config: dict, *, host: str = "0.0.0.0", port: int = 9000) -> None:
+    """
+    Serve with ASGI_SERVER (uvicorn by default), falling back to the other
+    server when that one is not installed.
+    """
+    preferred = str(config.get("ASGI_SERVER", "uvicorn")).lower()
+    if preferred not in ASGI_SERVERS:
+        raise RuntimeError(f"Invalid ASGI_SERVER {preferred!r}; use one of {', '.join(ASGI_SERVERS)}")
+    errors = []
+    for name in [preferred] + [other for other in ASGI_SERVERS if other != preferred]:
+        try:
+            runner = ASGI_SERVERS[name]()
+        except ImportError as exc:
+            errors.append(f"{name}: {exc}")
+            continue
+        if name != preferred:
+            logger.warning("ASGI_SERVER %s is not installed, serving with %s", preferred, name)
+        runner(app, host, port)
+        return
+    raise RuntimeError(f"APP_TYPE=asgi needs uvicorn (the asgi extra) or hypercorn: {'; '.join(errors)}")
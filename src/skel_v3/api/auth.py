@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Password verification for login routes"""
+
+__updated__ = "2026-10-19 09:36:48"
+
+from typing import Optional
+
+from flask import current_app, jsonify
+
+from util.passwords import PasswordVerifier, RehashCallback, VerifierBusy, create_password_verifier
+
+EXTENSION = "password_verifier"
+
+
+def install_password_verifier(app, *, config: dict, on_rehash: Optional[RehashCallback] = None) -> PasswordVerifier:
+    """
+    Create the app's `PasswordVerifier` (its process pool starts on the
+    first check) and answer `VerifierBusy` with 429 and a timed-out check
+    (`TimeoutError`) with 503, both with Retry-After.
+
+    A login view loads the stored hash (e.g. from Postgres) and calls
+    `get_password_verifier().verify(username, password, stored_hash)`.
+    `on_rehash(username, new_hash)` should store upgraded hashes.
+    """
+    verifier = create_password_verifier(config, on_rehash=on_rehash)
+    app.extensions[EXTENSION] = verifier
+
+    @app.errorhandler(VerifierBusy)
+    def _verifier_busy(exc: VerifierBusy):
+        return jsonify({"ok": False, "error": "Too many concurrent logins"}), 429, {"Retry-After": str(exc.retry_after)}
+
+    @app.errorhandler(TimeoutError)
+    def _verifier_timeout(exc: TimeoutError):
+        retry_after = getattr(exc, "retry_after", 1)
+        return jsonify({"ok": False, "error": "Request timed out"}), 503, {"Retry-After": str(retry_after)}
+
+    return verifier
+
+
+def get_password_verifier() -> PasswordVerifier:
+    return current_app.extensions[EXTENSION]
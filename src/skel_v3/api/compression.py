@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Response compression (gzip, zstd)"""
+
+__updated__ = "2026-10-19 07:36:05"
+
+"""
+Compresses Flask responses as negotiated by `Accept-Encoding`: zstd when
+available (Python 3.14 `compression.zstd` or the `zstandard` package) and
+accepted, otherwise gzip.
+
+- Only compressible types (COMPRESSION_TYPES, e.g. JSON and text) and
+  bodies of at least COMPRESSION_MIN_SIZE bytes; already encoded responses,
+  file passthroughs, HEAD and bodiless statuses are left alone, as is a
+  body that would not shrink.
+- Levels per content type: COMPRESSION_LEVELS overrides the default gzip /
+  zstd levels ("application/x-ndjson=1:1,text/csv=9").
+- Streamed responses are compressed chunk by chunk (each chunk flushed, so
+  the client receives data as it is produced), never buffered.
+- Responses with a strong ETag (see util.static_response) have a body fixed
+  for that tag: their compressed form is cached per (ETag, encoding, level),
+  so a static response is compressed once. The ETag sent with a compressed
+  body is made weak, as it no longer names the identity bytes.
+- Metrics: compressed responses, bytes in/out (the difference is what was
+  saved) and CPU seconds spent compressing, per encoding. With tracing on,
+  the work shows up as a `compress` span (Server-Timing, summary log).
+"""
+
+import gzip
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import request
+
+from util.metrics import REGISTRY
+from util.tracing import span
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:  # pragma: no cover - optional dependency
+    zstd = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+GZIP = "gzip"
+ZSTD = "zstd"
+
+COMPRESSED_RESPONSES = REGISTRY.counter(
+    "http_compressed_responses_total", "Responses sent compressed.", ("encoding",)
+)
+COMPRESSION_BYTES_IN = REGISTRY.counter(
+    "http_compression_input_bytes_total", "Response bytes before compression.", ("encoding",)
+)
+COMPRESSION_BYTES_OUT = REGISTRY.counter(
+    "http_compression_output_bytes_total", "Response bytes after compression.", ("encoding",)
+)
+COMPRESSION_CPU_SECONDS = REGISTRY.histogram(
+    "http_compression_cpu_seconds",
+    "CPU time spent compressing one response.",
+    ("encoding",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+DEFAULT_TYPES = "application/json,+json,application/x-ndjson,text/*"
+_NO_BODY_STATUSES = frozenset((204, 206, 304))
+
+
+# ----------------------------------------------------------------- encoders
+
+
+class _GzipStream:
+    def __init__(self, level: int) -> None:
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _ZstdStream:
+    def __init__(self, level: int) -> None:
+        if zstd is not None:
+            self._obj = zstd.ZstdCompressor(level=level)
+            self._flush_block = zstd.ZstdCompressor.FLUSH_BLOCK
+        else:
+            self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+            self._flush_block = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+
+    def chunk(self, data: bytes) -> bytes:
+        if zstd is not None:
+            return self._obj.compress(data, mode=self._flush_block)
+        return self._obj.compress(data) + self._obj.flush(self._flush_block)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    if zstd is not None:
+        return zstd.compress(data, level=level)
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+_ONE_SHOT: Dict[str, Callable[[bytes, int], bytes]] = {GZIP: _gzip, ZSTD: _zstd}
+_STREAMS = {GZIP: _GzipStream, ZSTD: _ZstdStream}
+
+
+def available_encodings() -> List[str]:
+    """
+    Supported encodings, preferred first.
+    """
+    return ([ZSTD] if zstd is not None or zstandard is not None else []) + [GZIP]
+
+
+# ------------------------------------------------------------- negotiation
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """
+    {coding: q} of an Accept-Encoding header (lowercased; malformed q = 0).
+    """
+    accepted: Dict[str, float] = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header: Optional[str], encodings: List[str]) -> Optional[str]:
+    """
+    The first of `encodings` the client accepts (q > 0), directly or via `*`.
+    """
+    accepted = parse_accept_encoding(header)
+    if not accepted:
+        return None
+    wildcard = accepted.get("*", 0.0)
+    for encoding in encodings:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def _matches(mimetype: str, patterns: Tuple[str, ...]) -> bool:
+    for pattern in patterns:
+        if pattern == mimetype:
+            return True
+        if pattern.endswith("/*") and mimetype.startswith(pattern[:-1]):
+            return True
+        if pattern.startswith("+") and mimetype.endswith(pattern):
+            return True  # "+json" matches application/problem+json
+    return False
+
+
+def parse_levels(value: str) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+    """
+    "application/x-ndjson=1:1,text/csv=9" -> {mimetype: (gzip, zstd)}.
+    """
+    levels: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+    for item in value.split(","):
+        mimetype, _, spec = item.strip().partition("=")
+        if not mimetype or not spec:
+            continue
+        gzip_level, _, zstd_level = spec.partition(":")
+        levels[mimetype.strip().lower()] = (
+            int(gzip_level) if gzip_level.strip() else None,
+            int(zstd_level) if zstd_level.strip() else None,
+        )
+    return levels
+
+
+# ------------------------------------------------------------------- hook
+
+
+class ResponseCompressor:
+    """
+    The after_request hook and its cache of compressed static bodies.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_size: int = 1024,
+        types: Tuple[str, ...] = tuple(DEFAULT_TYPES.split(",")),
+        gzip_level: int = 6,
+        zstd_level: int = 3,
+        levels: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+        encodings: Optional[List[str]] = None,
+        cache_size: int = 256,
+    ) -> None:
+        self.min_size = max(0, int(min_size))
+        self.types = tuple(t.strip().lower() for t in types if t.strip())
+        self.default_levels = {GZIP: int(gzip_level), ZSTD: int(zstd_level)}
+        self.levels = levels or {}
+        self.encodings = encodings if encodings is not None else available_encodings()
+        self.cache_size = max(0, int(cache_size))
+        self._cache: "OrderedDict[Tuple[str, str, int], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def level(self, encoding: str, mimetype: str) -> int:
+        override = self.levels.get(mimetype)
+        if override is not None:
+            value = override[0] if encoding == GZIP else override[1]
+            if value is not None:
+                return value
+        return self.default_levels[encoding]
+
+    def __call__(self, response):
+        if (
+            request.method == "HEAD"
+            or response.status_code < 200
+            or response.status_code in _NO_BODY_STATUSES
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+        mimetype = (response.mimetype or "").lower()
+        if not _matches(mimetype, self.types):
+            return response
+        streamed = response.is_streamed
+        if not streamed and (response.content_length or 0) < self.min_size:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"), self.encodings)
+        if encoding is None:
+            return response
+        level = self.level(encoding, mimetype)
+        if streamed:
+            self._compress_stream(response, encoding, level)
+        else:
+            self._compress_body(response, encoding, level)
+        return response
+
+    def _compress_body(self, response, encoding: str, level: int) -> None:
+        body = response.get_data()
+        etag, weak = response.get_etag()
+        cache_key = (etag, encoding, level) if etag and not weak and self.cache_size else None
+        compressed = None
+        if cache_key is not None:
+            with self._lock:
+                compressed = self._cache.get(cache_key)
+                if compressed is not None:
+                    self._cache.move_to_end(cache_key)
+        if compressed is None:
+            with span("compress"):
+                started = time.thread_time()
+                compressed = _ONE_SHOT[encoding](body, level)
+                COMPRESSION_CPU_SECONDS.labels(encoding).observe(time.thread_time() - started)
+            if cache_key is not None:
+                with self._lock:
+                    self._cache[cache_key] = compressed
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        if len(compressed) >= len(body):
+            return
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        _record(encoding, len(body), len(compressed))
+
+    def _compress_stream(self, response, encoding: str, level: int) -> None:
+        response.response = _compressed_chunks(response.response, _STREAMS[encoding](level), encoding)
+        response.headers["Content-Encoding"] = encoding
+        response.headers.pop("Content-Length", None)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+
+def _record(encoding: str, size_in: int, size_out: int) -> None:
+    COMPRESSED_RESPONSES.labels(encoding).inc()
+    COMPRESSION_BYTES_IN.labels(encoding).inc(size_in)
+    COMPRESSION_BYTES_OUT.labels(encoding).inc(size_out)
+
+
+def _compressed_chunks(chunks: Iterable, stream, encoding: str) -> Iterator[bytes]:
+    size_in = size_out = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if not chunk:
+                continue
+            started = time.thread_time()
+            data = stream.chunk(chunk)
+            cpu += time.thread_time() - started
+            size_in += len(chunk)
+            size_out += len(data)
+            if data:
+                yield data
+        started = time.thread_time()
+        data = stream.finish()
+        cpu += time.thread_time() - started
+        size_out += len(data)
+        if data:
+            yield data
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        COMPRESSION_CPU_SECONDS.labels(encoding).observe(cpu)
+        _record(encoding, size_in, size_out)
+
+
+def install_compression(app, *, config: dict) -> Optional[ResponseCompressor]:
+    """
+    Register the compression hook. Install it after the other after_request
+    hooks that change the body (they run in reverse order).
+    """
+    if not config.get("COMPRESSION_ENABLED", True):
+        return None
+    compressor = ResponseCompressor(
+        min_size=int(config.get("COMPRESSION_MIN_SIZE", 1024)),
+        types=tuple(str(config.get("COMPRESSION_TYPES", DEFAULT_TYPES)).split(",")),
+        gzip_level=int(config.get("COMPRESSION_GZIP_LEVEL", 6)),
+        zstd_level=int(config.get("COMPRESSION_ZSTD_LEVEL", 3)),
+        levels=parse_levels(str(config.get("COMPRESSION_LEVELS", ""))),
+        cache_size=int(config.get("COMPRESSION_CACHE_SIZE", 256)),
+    )
+    app.after_request(compressor)
+    app.extensions["response_compressor"] = compressor
+    return compressor
@@ -5,7 +5,7 @@
 
 """Authn Service"""
 
-__updated__ = "2026-02-07 07:40:04"
+__updated__ = "2026-10-19 04:12:15"
 
 
 import logging
@@ -22,8 +22,8 @@ def register_example_routes(app, *, config: dict, stores: Optional[Dict[str, Any
     if stores is None:
         stores = {}
 
-    pg_pool = stores.get("pg_pool")
-    if pg_pool is None:
+    # Empty until after fork under gunicorn --preload
+    if stores and stores.get("pg_pool") is None:
         logger.warning("PG pool is not available; module will always fall back to guest/RO")
 
     @app.route("/example", methods=["GET"])
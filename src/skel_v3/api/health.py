@@ -5,32 +5,72 @@
 
 """Health Service"""
 
-__updated__ = "2026-02-07 07:24:13"
+__updated__ = "2026-10-19 05:07:40"
 
-from flask import jsonify
+from typing import Any, Dict, Tuple
 
+from flask import jsonify, request
 
-def register_health_routes(app, *, config: dict):
+from util.readiness import DependencyMonitor, ReadinessGate
+from util.static_response import StaticResponse
+
+
+def register_health_routes(
+    app,
+    *,
+    config: dict,
+    readiness: ReadinessGate | None = None,
+    monitor: DependencyMonitor | None = None,
+):
     """
-    Register basic health/ready endpoints.
+    Register the probe endpoints. None of them touches a datastore: the
+    dependency results come from `monitor`'s background refresher.
 
-    - GET /health  -> simple liveness check
-    - GET /ready   -> can be extended to check DB, etc.
+    - GET /health   -> liveness: the process serves requests (precomputed
+                       body with ETag; If-None-Match gets a 304)
+    - GET /startup  -> startup: 503 while startup tasks (cache warm-up,
+                       first dependency check round) are pending
+    - GET /ready    -> readiness: startup done and every critical dependency
+                       passed its last check; per-dependency status/latency
     """
-    service_name = config.get("SERVICE_NAME", "micro-service")
-    service_version = config.get("SERVICE_VERSION", "0.1.0")
+    health_response = StaticResponse.json(liveness_status(config)[0])
 
     @app.route("/health", methods=["GET"])
     def health():
-        return jsonify(
-            {
-                "status": "ok",
-                "service": service_name,
-                "version": service_version,
-            }
-        )
+        return health_response.flask_response(request.headers.get("If-None-Match"))
+
+    @app.route("/startup", methods=["GET"])
+    def startup():
+        body, status = startup_status(readiness)
+        return jsonify(body), status
 
     @app.route("/ready", methods=["GET"])
     def ready():
-        # In the future it can be added other checks: DB connectivity, config sanity, etc.
-        return jsonify({"status": "ready"})
+        body, status = readiness_status(readiness, monitor)
+        return jsonify(body), status
+
+
+# Probe bodies and status codes, shared with the ASGI app (api.asgi)
+
+
+def liveness_status(config: dict) -> Tuple[Dict[str, Any], int]:
+    return {
+        "status": "ok",
+        "service": config.get("SERVICE_NAME", "micro-service"),
+        "version": config.get("SERVICE_VERSION", "0.1.0"),
+    }, 200
+
+
+def startup_status(readiness: ReadinessGate | None) -> Tuple[Dict[str, Any], int]:
+    if readiness is not None and not readiness.ready:
+        return {"status": "starting", "pending": readiness.pending()}, 503
+    return {"status": "started"}, 200
+
+
+def readiness_status(readiness: ReadinessGate | None, monitor: DependencyMonitor | None) -> Tuple[Dict[str, Any], int]:
+    if readiness is not None and not readiness.ready:
+        return {"status": "starting", "pending": readiness.pending()}, 503
+    if monitor is None:
+        return {"status": "ready"}, 200
+    healthy = monitor.healthy
+    return {"status": "ready" if healthy else "not_ready", "checks": monitor.results()}, 200 if healthy else 503
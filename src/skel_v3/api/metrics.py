@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Metrics Service"""
+
+__updated__ = "2026-10-19 05:27:34"
+
+"""
+Per-route request metrics recorded by request hooks, pool utilization
+gauges sampled by callbacks, and GET /metrics in the Prometheus text format.
+
+With METRICS_MULTIPROC_DIR set, every gunicorn worker writes its values to
+its own mmap file in that directory and /metrics, served by whichever worker
+gets the scrape, adds them all up. Empty the directory when the server
+starts (see README).
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+from flask import g, request
+
+from util.metrics import REGISTRY
+
+HTTP_REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+HTTP_SECONDS = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests being served.")
+PG_POOL_CONNECTIONS = REGISTRY.gauge(
+    "pg_pool_connections", "Postgres pool connections by state.", ("pool", "state")
+)
+REDIS_POOL_CONNECTIONS = REGISTRY.gauge("redis_pool_connections", "Redis pool connections by state.", ("state",))
+
+UNMATCHED_ROUTE = "<unmatched>"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _pool_callback(stores: Dict[str, Any]):
+    # Pools are looked up per sample: they may be created after the app (preload)
+    def sample() -> None:
+        router = stores.get("pg_router")
+        pg_pools = [node.pool for node in (router.primary, *router.replicas)] if router is not None else []
+        if not pg_pools and stores.get("pg_pool") is not None:
+            pg_pools = [stores["pg_pool"]]
+        redis_pool = stores.get("redis_pool")
+        for pool in pg_pools:
+            stats = pool.stats()
+            for state in ("in_use", "idle", "waiting", "max"):
+                PG_POOL_CONNECTIONS.labels(pool.name, state).set(stats[state])
+        if redis_pool is not None:
+            from db.redis_pool import redis_pool_stats  # pylint: disable=import-outside-toplevel
+
+            for state, value in redis_pool_stats(redis_pool).items():
+                REDIS_POOL_CONNECTIONS.labels(state).set(value)
+
+    return sample
+
+
+def register_metrics_routes(app, *, config: dict, stores: Optional[Dict[str, Any]] = None):
+    """
+    Install the request hooks and GET /metrics.
+
+    Requests are labelled with the matched URL rule (`/users/<id>`, not the
+    raw path) so the number of series stays bounded.
+    """
+    if not config.get("METRICS_ENABLED", True):
+        return
+
+    REGISTRY.configure(config.get("METRICS_MULTIPROC_DIR") or None)
+    REGISTRY.set_callback("pools", _pool_callback(stores or {}))
+    callback_interval = float(config.get("METRICS_CALLBACK_INTERVAL", 5))
+    in_flight = HTTP_IN_FLIGHT.labels()
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_in_flight = True
+        in_flight.inc()
+
+    @app.after_request
+    def _metrics_record(response):
+        started = g.get("request_started_at")
+        route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+        if started is not None:
+            HTTP_SECONDS.labels(request.method, route).observe(time.perf_counter() - started)
+        HTTP_REQUESTS.labels(request.method, route, response.status_code).inc()
+        REGISTRY.run_callbacks(callback_interval)
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(_exc):
+        if g.pop("metrics_in_flight", False):
+            in_flight.dec()
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        REGISTRY.run_callbacks()
+        return app.response_class(REGISTRY.render(), mimetype=None, content_type=CONTENT_TYPE)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Request tracing hooks"""
+
+__updated__ = "2026-10-19 00:12:37"
+
+"""
+With TRACING_ENABLED, a sampled request (TRACING_SAMPLE_RATE) gets a trace
+keyed by its request ID (and joined to the caller's trace when it sends a
+W3C `traceparent` header). The view itself is recorded as the `handler`
+span; Redis commands, Postgres acquire/queries and the API key check add
+their own spans. When the response is ready:
+
+- `Server-Timing: auth;dur=0.8, redis;dur=0.4, handler;dur=2.1, total;dur=2.6`
+  (TRACING_SERVER_TIMING),
+- one "Request trace" log line with `duration_ms` and the per-phase `spans`
+  (TRACING_LOG_SUMMARY),
+- OTLP/HTTP export to TRACING_OTLP_ENDPOINT when set.
+
+Unsampled requests and disabled tracing only pay for the `span()` no-op.
+"""
+
+import logging
+import random
+
+from flask import g, request
+
+from logs import register_context_fields
+from util.request_id import get_or_create_request_id
+from util.tracing import OtlpExporter, Span, end_trace, parse_traceparent, start_trace
+
+logger = logging.getLogger(__name__)
+
+register_context_fields("http_status", "trace_id", "spans")
+
+
+def install_tracing(app, *, config: dict) -> None:
+    if not config.get("TRACING_ENABLED", False):
+        return
+
+    sample_rate = float(config.get("TRACING_SAMPLE_RATE", 1.0))
+    max_spans = int(config.get("TRACING_MAX_SPANS", 256))
+    server_timing = bool(config.get("TRACING_SERVER_TIMING", True))
+    log_summary = bool(config.get("TRACING_LOG_SUMMARY", True))
+    exporter = None
+    if config.get("TRACING_OTLP_ENDPOINT"):
+        exporter = OtlpExporter(config["TRACING_OTLP_ENDPOINT"], service_name=config.get("SERVICE_NAME", "micro-service"))
+        app.extensions["otlp_exporter"] = exporter
+
+    # Registered after the app's own hooks: starts last, and as after_request
+    # hooks run in reverse order, closes the handler span first.
+    @app.before_request
+    def _trace_start():
+        if sample_rate < 1.0 and random.random() >= sample_rate:
+            return
+        trace_id, parent = parse_traceparent(request.headers.get("traceparent"))
+        trace, token = start_trace(
+            f"{request.method} {request.url_rule.rule if request.url_rule is not None else request.path}",
+            trace_id=trace_id,
+            parent_span_id=parent,
+            request_id=get_or_create_request_id(),
+            max_spans=max_spans,
+            # Include the earlier before_request hooks
+            start=g.get("request_started_at"),
+        )
+        handler = Span(trace, "handler", {})
+        handler.__enter__()
+        g.trace = (trace, token, handler)
+
+    @app.after_request
+    def _trace_finish(response):
+        state = g.get("trace")
+        if state is None:
+            return response
+        trace, _, handler = state
+        handler.__exit__(None, None, None)
+        trace.finish()
+        trace.attributes.update({"http.method": request.method, "http.status_code": response.status_code})
+        if server_timing:
+            response.headers["Server-Timing"] = trace.server_timing()
+        if log_summary:
+            logger.info(
+                "Request trace",
+                extra={
+                    "request_id": trace.request_id,
+                    "trace_id": trace.trace_id,
+                    "http_method": request.method,
+                    "http_path": request.path,
+                    "http_status": response.status_code,
+                    "duration_ms": round(trace.duration_ms(), 3),
+                    "spans": trace.phases_ms(),
+                },
+            )
+        if exporter is not None:
+            exporter.export(trace)
+        return response
+
+    @app.teardown_request
+    def _trace_reset(_exc):
+        state = g.pop("trace", None)
+        if state is not None:
+            end_trace(state[1])
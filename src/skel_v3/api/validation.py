@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Request body validation (compiled marshmallow schemas)"""
+
+__updated__ = "2026-10-19 06:58:40"
+
+"""
+`Schema().load` dispatches per field and per validator and builds an error
+store even for a valid body. Here each schema class is instantiated once
+(`compiled_schema`, cached) and, when its fields allow it, compiled into one
+generated function that checks and copies a valid body in a single pass:
+type checks, required/default handling, unknown keys and the validators
+(`Regexp`, `Length`, `OneOf`, `Range`) inline.
+
+The compiled function only decides "valid" fast. Any body it rejects is
+loaded again by marshmallow, so errors (messages, structure) are exactly
+marshmallow's. A schema it cannot compile (hooks such as `@validates` or
+`@post_load`, other field types or validators) always goes through the
+cached marshmallow instance.
+
+Supported fields: `String`, `Integer`, `Boolean` (others fall back).
+
+- `load(data)` returns the loaded dict or raises `ValidationError`.
+- `load_many(items)` returns the valid items and the errors by index.
+- `@validate_body(Schema)` parses `request.get_data()` and puts the result
+  in `g.body` (400 with the errors otherwise).
+"""
+
+import json
+import logging
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from flask import g, jsonify, request
+from marshmallow import EXCLUDE, INCLUDE, Schema, ValidationError, fields, missing, validate
+
+logger = logging.getLogger(__name__)
+
+_REJECT = object()
+
+
+class _Compiler:
+    """
+    Generates the source of `_load(data)` for one schema instance.
+    """
+
+    def __init__(self, schema: Schema) -> None:
+        self.schema = schema
+        self.names: Dict[str, Any] = {"_REJECT": _REJECT, "_MISSING": missing}
+        self.lines: List[str] = []
+
+    def constant(self, value: Any) -> str:
+        name = f"_c{len(self.names)}"
+        self.names[name] = value
+        return name
+
+    def compile(self) -> Optional[Callable[[Any], Any]]:
+        schema = self.schema
+        if any(schema._hooks.values()) or schema.dump_fields.keys() - schema.load_fields.keys():  # noqa: SLF001
+            return None  # hooks, or dump_only keys marshmallow would reject as unknown
+        known = []
+        out = self.lines
+        out.append("def _load(data):")
+        out.append("    if type(data) is not dict: return _REJECT")
+        out.append("    out = {}")
+        out.append("    seen = 0")
+        for attr_name, field in schema.load_fields.items():
+            data_key = field.data_key if field.data_key is not None else attr_name
+            known.append(data_key)
+            if not self.field(data_key, field.attribute or attr_name, field):
+                return None
+        if schema.unknown == INCLUDE:
+            keys = self.constant(frozenset(known))
+            out.append("    if seen != len(data):")
+            out.append("        for k, v in data.items():")
+            out.append(f"            if k not in {keys}: out[k] = v")
+        elif schema.unknown != EXCLUDE:
+            out.append("    if seen != len(data): return _REJECT")
+        out.append("    return out")
+
+        namespace = dict(self.names)
+        exec("\n".join(out), namespace)  # pylint: disable=exec-used
+        return namespace["_load"]
+
+    def field(self, data_key: str, attribute: str, field: fields.Field) -> bool:
+        checks = self.type_checks(field)
+        if checks is None:
+            return False
+        for validator in field.validators:
+            check = self.validator_check(validator)
+            if check is None:
+                return False
+            checks.append(check)
+
+        out = self.lines
+        key, attr = repr(data_key), repr(attribute)
+        out.append(f"    v = data.get({key}, _MISSING)")
+        out.append("    if v is _MISSING:")
+        if field.required:
+            out.append("        return _REJECT")
+        elif field.load_default is missing:
+            out.append("        pass")
+        elif callable(field.load_default):
+            out.append(f"        out[{attr}] = {self.constant(field.load_default)}()")
+        else:
+            out.append(f"        out[{attr}] = {self.constant(field.load_default)}")
+        out.append("    else:")
+        out.append("        seen += 1")
+        if field.allow_none:
+            out.append("        if v is None:")
+            out.append(f"            out[{attr}] = None")
+            out.append("        else:")
+            indent = "            "
+        else:
+            out.append("        if v is None: return _REJECT")
+            indent = "        "
+        out.append(f"{indent}if not ({' and '.join(checks)}): return _REJECT")
+        out.append(f"{indent}out[{attr}] = v")
+        return True
+
+    def type_checks(self, field: fields.Field) -> Optional[List[str]]:
+        # Exact classes only: a subclass may override _deserialize
+        kind = type(field)
+        if kind is fields.String:
+            return ["type(v) is str"]
+        if kind is fields.Integer and not field.as_string:
+            # Non-strict fields also cast "12" or 12.0: those take the slow path
+            return ["type(v) is int"]
+        if kind is fields.Boolean and True in field.truthy and False in field.falsy:
+            return ["(v is True or v is False)"]
+        return None
+
+    def validator_check(self, validator: Any) -> Optional[str]:
+        kind = type(validator)
+        if kind is validate.Regexp:
+            return f"{self.constant(validator.regex.match)}(v) is not None"
+        if kind is validate.Length:
+            if validator.equal is not None:
+                return f"len(v) == {validator.equal!r}"
+            bounds = []
+            if validator.min is not None:
+                bounds.append(f"len(v) >= {validator.min!r}")
+            if validator.max is not None:
+                bounds.append(f"len(v) <= {validator.max!r}")
+            return " and ".join(bounds) or "True"
+        if kind is validate.OneOf:
+            try:
+                choices = frozenset(validator.choices)
+            except TypeError:
+                return None
+            return f"v in {self.constant(choices)}"
+        if kind is validate.Range:
+            bounds = []
+            if validator.min is not None:
+                op = ">=" if validator.min_inclusive else ">"
+                bounds.append(f"v {op} {self.constant(validator.min)}")
+            if validator.max is not None:
+                op = "<=" if validator.max_inclusive else "<"
+                bounds.append(f"v {op} {self.constant(validator.max)}")
+            return " and ".join(bounds) or "True"
+        return None
+
+
+class CompiledSchema:
+    """
+    A marshmallow schema instance plus, when possible, its compiled loader.
+    """
+
+    def __init__(self, schema: Schema) -> None:
+        self.schema = schema
+        self._fast = _Compiler(schema).compile()
+        if self._fast is None:
+            logger.debug("Schema %s not compiled; using marshmallow", type(schema).__name__)
+
+    @property
+    def compiled(self) -> bool:
+        return self._fast is not None
+
+    def load(self, data: Any) -> Dict[str, Any]:
+        if self._fast is not None:
+            result = self._fast(data)
+            if result is not _REJECT:
+                return result
+        return self.schema.load(data)
+
+    def load_many(self, items: Any) -> Tuple[List[Dict[str, Any]], Dict[int, Any]]:
+        """
+        (valid items in order, {index: errors} of the others). Raises
+        `ValidationError` if `items` is not a list.
+        """
+        if not isinstance(items, list):
+            raise ValidationError([self.schema.error_messages["type"]])
+        loaded, errors = [], {}
+        for index, item in enumerate(items):
+            try:
+                loaded.append(self.load(item))
+            except ValidationError as exc:
+                errors[index] = exc.messages
+        return loaded, errors
+
+
+@lru_cache(maxsize=None)
+def compiled_schema(schema_cls: Type[Schema]) -> CompiledSchema:
+    """
+    The shared `CompiledSchema` of a schema class, built on first use.
+    """
+    return CompiledSchema(schema_cls())
+
+
+def validate_body(schema_cls: Type[Schema], *, many: bool = False):
+    """
+    Parse the JSON request body and load it with `schema_cls` before the
+    view runs. The result is in `g.body`; with `many` the body must be a
+    list, `g.body` holds the valid items and `g.body_errors` the errors by
+    index (the view decides what a partial batch means).
+    """
+
+    def decorator(func):
+        compiled = compiled_schema(schema_cls)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                data = json.loads(request.get_data())
+            except ValueError:
+                return jsonify({"ok": False, "error": "Invalid JSON body"}), 400
+            try:
+                if many:
+                    g.body, g.body_errors = compiled.load_many(data)
+                else:
+                    g.body = compiled.load(data)
+            except ValidationError as exc:
+                return jsonify({"ok": False, "error": "Invalid request body", "errors": exc.messages}), 400
+            return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -5,21 +5,36 @@
 
 """Main app module"""
 
-__updated__ = "2026-02-07 08:00:28"
+__updated__ = "2026-10-19 07:39:44"
 
 import logging
 import sys
+import threading
 import time
+from typing import TYPE_CHECKING, Union
 from flask import Flask, g, jsonify, url_for
 
 from config import get_config
-from db import init_datastores
+from db import build_datastore_checks, close_datastores, init_datastores
 from logs import init_logging
 
+from api.auth import install_password_verifier
+from api.compression import install_compression
 from api.example import register_example_routes
 from api.health import register_health_routes
+from api.metrics import register_metrics_routes
+from api.tracing import install_tracing
+from util.readiness import ReadinessGate, create_dependency_monitor
+from util.static_response import cached_response
 from util.request_id import get_or_create_request_id
 
+# Imported where used, to keep a cold start short: the ASGI front and the
+# worker (asyncio, redis.asyncio), the Redis/Postgres drivers (db.*).
+if TYPE_CHECKING:
+    from api.asgi import AsgiApp
+
+logger = logging.getLogger(__name__)
+
 
 ###############################################################################
 #
@@ -27,18 +42,50 @@ from util.request_id import get_or_create_request_id
 #
 ###############################################################################
 
+# Set to "1" (by gunicorn_conf when preloading) to build the app in the
+# master and open datastores in each worker after fork
+DEFER_DATASTORES_ENV = "APP_DEFER_DATASTORES"
+
+# DATASTORES_STARTUP values
+STARTUP_SYNC = "sync"
+STARTUP_BACKGROUND = "background"
+# Readiness task held while datastores open in the background
+READINESS_DATASTORES = "datastores"
+
 
-def create_api_app(config: dict) -> Flask:
+def create_api_app(config: dict, *, defer_datastores: bool = False) -> Flask:
     """
     Create the Flask app with logging and datastores initialized.
+
+    With `defer_datastores` (gunicorn --preload, see gunicorn_conf) no
+    connection or thread is created here: `start_datastores` runs in each
+    worker after fork. Only the API key warm table is built up front, so the
+    workers share it.
+
+    With DATASTORES_STARTUP=background the datastores are opened in a thread
+    instead: the app serves /health at once and /ready stays 503 until they
+    are up.
     """
     init_logging(config)
 
-    stores = init_datastores(config)
+    stores: dict = {}
+    readiness = ReadinessGate()
+    monitor = create_dependency_monitor(config, {})
 
     app = Flask(__name__)
+    app.extensions["config"] = config
+    app.extensions["readiness"] = readiness
+    app.extensions["dependency_monitor"] = monitor
+    app.extensions["stores"] = stores
     logging.getLogger("werkzeug").disabled = True
 
+    if not defer_datastores:
+        start_datastores(app, background=config.get("DATASTORES_STARTUP", STARTUP_SYNC) == STARTUP_BACKGROUND)
+    elif config.get("REDIS_ENABLED", False) and config.get("APIKEY_CACHE_ENABLED", False):
+        from db.apikey_warmup import preload_apikey_table  # pylint: disable=import-outside-toplevel
+
+        app.extensions["apikey_warm_table"] = preload_apikey_table(config)
+
     @app.before_request
     def _log_request_start():
         g.request_started_at = time.perf_counter()
@@ -51,9 +98,11 @@ def create_api_app(config: dict) -> Flask:
     }
 
     @app.route("/", methods=["GET"])
+    @cached_response(cache_control=f"public, max-age={int(config.get('STATIC_CACHE_MAX_AGE', 60))}")
     def root():
         """
-        HATEOAS-style discovery endpoint for automatic clients.
+        HATEOAS-style discovery endpoint for automatic clients. Built on the
+        first request (url_for needs one), then served as cached bytes.
         """
         discovery = {
             "service": metadata["service"],
@@ -72,6 +121,12 @@ def create_api_app(config: dict) -> Flask:
                     "method": "GET",
                     "description": "Readiness probe",
                 },
+                {
+                    "rel": "startup",
+                    "href": url_for("startup", _external=False),
+                    "method": "GET",
+                    "description": "Startup probe",
+                },
                 {
                     "rel": "example",
                     "href": url_for("example", _external=False),
@@ -83,12 +138,82 @@ def create_api_app(config: dict) -> Flask:
         return jsonify(discovery)
 
     # Register the endpoints here
-    register_health_routes(app, config=config)
+    register_health_routes(app, config=config, readiness=readiness, monitor=monitor)
+    register_metrics_routes(app, config=config, stores=stores)
+    install_tracing(app, config=config)
     register_example_routes(app, config=config, stores=stores)
+    install_password_verifier(app, config=config)
+    # Last: compresses the final body, before tracing closes the request span
+    install_compression(app, config=config)
 
     return app
 
 
+def _flask_app(app: Union[Flask, "AsgiApp"]) -> Flask:
+    return app if isinstance(app, Flask) else app.wsgi_app
+
+
+def start_datastores(app: Union[Flask, "AsgiApp"], *, background: bool = False) -> None:
+    """
+    Open the datastores and start the per-process background work (API key
+    warm-up, dependency checks). Once per process: threads and connections
+    do not survive a fork. With `background` this runs in a thread, holding
+    readiness until it is done.
+    """
+    app = _flask_app(app)
+    config = app.extensions["config"]
+    stores = app.extensions["stores"]
+    readiness = app.extensions["readiness"]
+    monitor = app.extensions["dependency_monitor"]
+
+    def _open() -> None:
+        stores.update(init_datastores(config))
+        if stores.get("apikey_cache") is not None:
+            from db.apikey_warmup import start_apikey_warmup  # pylint: disable=import-outside-toplevel
+
+            start_apikey_warmup(
+                config,
+                stores["apikey_cache"],
+                readiness,
+                table=app.extensions.pop("apikey_warm_table", None),
+            )
+        monitor.set_checks(build_datastore_checks(config, stores))
+        monitor.start(readiness)
+
+    if not background:
+        _open()
+        return
+
+    def _run() -> None:
+        try:
+            _open()
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Datastore startup failed")
+            readiness.done(READINESS_DATASTORES, error=str(exc))
+            return
+        readiness.done(READINESS_DATASTORES)
+
+    readiness.add(READINESS_DATASTORES)
+    threading.Thread(target=_run, name="datastores-startup", daemon=True).start()
+
+
+def stop_datastores(app: Union[Flask, "AsgiApp"]) -> None:
+    app = _flask_app(app)
+    app.extensions["dependency_monitor"].stop()
+    app.extensions["password_verifier"].close()
+    close_datastores(app.extensions["stores"])
+
+
+def create_asgi_app(config: dict, *, defer_datastores: bool = False) -> "AsgiApp":
+    """
+    The Flask app behind an ASGI front with async versions of the hot routes
+    (see api.asgi). Serve it with uvicorn/hypercorn.
+    """
+    from api.asgi import build_asgi_app  # pylint: disable=import-outside-toplevel
+
+    return build_asgi_app(create_api_app(config, defer_datastores=defer_datastores), config=config)
+
+
 ###############################################################################
 #
 # APPLICATION MAIN
@@ -101,16 +226,24 @@ def main() -> None:
     Main entry point: decide whether to launch the API or worker.
     """
     config = get_config()
-    app_type = config.get("APP_TYPE", "api")  # this can be api or worker
+    app_type = config.get("APP_TYPE", "api")  # this can be api, asgi or worker
 
     if app_type == "api":
         app = create_api_app(config)
         app.run(host="0.0.0.0", port=9000)
+    elif app_type == "asgi":
+        from api.asgi import serve_asgi  # pylint: disable=import-outside-toplevel
+
+        serve_asgi(create_asgi_app(config), config, port=9000)
+    elif app_type == "worker":
+        from worker import run_worker_app  # pylint: disable=import-outside-toplevel
+
+        run_worker_app(config)
     else:
         # Fail fast but with a clear message
         logging.basicConfig(level=logging.ERROR)
         logging.error(
-            "Invalid APP_TYPE %r. Use 'api' or 'worker'. " "Check your environment or .env file.",
+            "Invalid APP_TYPE %r. Use 'api', 'asgi' or 'worker'. " "Check your environment or .env file.",
             app_type,
         )
         sys.exit(2)
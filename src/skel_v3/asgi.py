@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""ASGI entry point"""
+
+__updated__ = "2026-10-19 04:37:11"
+
+"""
+uvicorn asgi:app --port 9000
+APP_TYPE=asgi gunicorn -c python:gunicorn_conf asgi:app
+
+(run from src/skel_v3, or with it on PYTHONPATH)
+"""
+
+import os
+
+from app import DEFER_DATASTORES_ENV, create_asgi_app
+from config import get_config
+
+# Set by gunicorn_conf when preloading: datastores are opened after fork
+app = create_asgi_app(get_config(), defer_datastores=os.getenv(DEFER_DATASTORES_ENV) == "1")
@@ -5,15 +5,18 @@
 
 """Configuration module"""
 
-__updated__ = "2026-02-07 07:13:47"
+__updated__ = "2026-10-19 10:02:10"
 
 import os
-from dotenv import load_dotenv, find_dotenv
 
 
-# Load .env if present (ideal for local development).
-# In containers, if .env is missing, environment variables are used as-is.
-load_dotenv(find_dotenv())
+# Load .env if present (ideal for local development). Only when SERVICE_ENV
+# is local (the default): find_dotenv walks up the filesystem, which a
+# container with its environment already set should not pay for at startup.
+if os.getenv("SERVICE_ENV", "local") == "local":
+    from dotenv import load_dotenv, find_dotenv
+
+    load_dotenv(find_dotenv())
 
 
 def str_to_bool(value: str | None, default: bool = True) -> bool:
@@ -45,8 +48,32 @@ def get_config() -> dict:
     return {
         # --- Execution mode ---
         # - api: run the Flask API
+        # - asgi: run the API as an ASGI app (async routes + Flask, see api.asgi)
         # - worker: run the worker
         "APP_TYPE": os.getenv("APP_TYPE", "api"),
+        # --- ASGI mode ---
+        # uvicorn or hypercorn (python -m skel_v3.app with APP_TYPE=asgi); the
+        # other one is used when the chosen server is not installed
+        "ASGI_SERVER": os.getenv("ASGI_SERVER", "uvicorn").lower(),
+        # Threads running Flask routes that have no async version
+        "ASGI_THREADS": int(os.getenv("ASGI_THREADS", "16")),
+        # --- Gunicorn (gunicorn_conf.py) ---
+        "GUNICORN_BIND": os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('GUNIPORT', '9000')}"),
+        # sync, gthread, gevent or uvicorn (APP_TYPE=asgi always uses uvicorn)
+        "GUNICORN_WORKER_CLASS": os.getenv("GUNICORN_WORKER_CLASS", "gthread").lower(),
+        # 0: sized from the CPUs available to the container
+        "GUNICORN_WORKERS": int(os.getenv("GUNICORN_WORKERS", "0")),
+        "GUNICORN_THREADS": int(os.getenv("GUNICORN_THREADS", "0")),
+        "GUNICORN_WORKER_CONNECTIONS": int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000")),
+        # Import the app once in the master; datastores open after fork
+        "GUNICORN_PRELOAD": str_to_bool(os.getenv("GUNICORN_PRELOAD", "true"), default=True),
+        "GUNICORN_KEEPALIVE": int(os.getenv("GUNICORN_KEEPALIVE", "5")),
+        "GUNICORN_TIMEOUT": int(os.getenv("GUNICORN_TIMEOUT", "30")),
+        "GUNICORN_GRACEFUL_TIMEOUT": int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30")),
+        # Recycle a worker after MAX_REQUESTS + random(0, JITTER) requests (0: never)
+        "GUNICORN_MAX_REQUESTS": int(os.getenv("GUNICORN_MAX_REQUESTS", "5000")),
+        "GUNICORN_MAX_REQUESTS_JITTER": int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "500")),
+        "GUNICORN_ACCESS_LOG": str_to_bool(os.getenv("GUNICORN_ACCESS_LOG", "false"), default=False),
         # --- Service ---
         "SERVICE_NAME": os.getenv("SERVICE_NAME", "skel-service"),
         "SERVICE_VERSION": os.getenv("SERVICE_VERSION", "0.1.0"),
@@ -57,6 +84,57 @@ def get_config() -> dict:
         # - local/dev: DEBUG
         # - others: INFO
         "LOG_LEVEL": os.getenv("LOG_LEVEL", default_log_level),
+        # - sync: write each record on the calling thread
+        # - async: enqueue records, a background thread writes them in batches
+        "LOG_MODE": os.getenv("LOG_MODE", "sync"),
+        "LOG_QUEUE_SIZE": int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+        # drop | block (block waits up to 1s for room, then drops)
+        "LOG_QUEUE_POLICY": os.getenv("LOG_QUEUE_POLICY", "drop"),
+        "LOG_BATCH_SIZE": int(os.getenv("LOG_BATCH_SIZE", "256")),
+        # auto: orjson when installed, json: stdlib only (same output)
+        "LOG_ENCODER": os.getenv("LOG_ENCODER", "auto"),
+        # Sampling for high-QPS paths; records with exc_info or at/above
+        # LOG_SAMPLING_PASS_LEVEL always go through.
+        # LOG_SAMPLE_RATES: "logger=ratio;logger:message template=ratio;..."
+        # LOG_RATE_CAP_PER_SEC: max records per second per (logger, template), 0 = no cap
+        "LOG_SAMPLING_ENABLED": str_to_bool(os.getenv("LOG_SAMPLING_ENABLED", "false"), default=False),
+        "LOG_SAMPLE_RATES": os.getenv("LOG_SAMPLE_RATES", ""),
+        "LOG_RATE_CAP_PER_SEC": int(os.getenv("LOG_RATE_CAP_PER_SEC", "0")),
+        "LOG_SAMPLING_PASS_LEVEL": os.getenv("LOG_SAMPLING_PASS_LEVEL", "ERROR"),
+        # --- Worker ---
+        # WORKER_ENGINE: inline (serial), thread or process (pool), asyncio (coroutines)
+        # WORKER_ASYNC_CONCURRENCY: max coroutine units in flight for asyncio
+        # WORKER_CONCURRENCY: max tasks in flight for pools, 0 = CPU count
+        # WORKER_TASK_TIMEOUT: seconds before a running task is abandoned, 0 = off
+        # WORKER_DRAIN_TIMEOUT: seconds to wait for in-flight tasks on shutdown
+        # Poll scheduling: re-poll at once while work is found; when idle wait
+        # WORKER_POLL_MIN_INTERVAL, x WORKER_POLL_BACKOFF per empty poll, up to
+        # WORKER_POLL_INTERVAL seconds, randomized by +/- WORKER_POLL_JITTER
+        # WORKER_STATS_INTERVAL: seconds between loop stats log lines, 0 = off
+        "WORKER_POLL_INTERVAL": float(os.getenv("WORKER_POLL_INTERVAL", "5")),
+        "WORKER_POLL_MIN_INTERVAL": float(os.getenv("WORKER_POLL_MIN_INTERVAL", "0.1")),
+        "WORKER_POLL_BACKOFF": float(os.getenv("WORKER_POLL_BACKOFF", "2.0")),
+        "WORKER_POLL_JITTER": float(os.getenv("WORKER_POLL_JITTER", "0.2")),
+        "WORKER_STATS_INTERVAL": float(os.getenv("WORKER_STATS_INTERVAL", "60")),
+        "WORKER_ENGINE": os.getenv("WORKER_ENGINE", "inline"),
+        "WORKER_CONCURRENCY": int(os.getenv("WORKER_CONCURRENCY", "0")),
+        "WORKER_ASYNC_CONCURRENCY": int(os.getenv("WORKER_ASYNC_CONCURRENCY", "100")),
+        "WORKER_TASK_TIMEOUT": float(os.getenv("WORKER_TASK_TIMEOUT", "0")),
+        "WORKER_DRAIN_TIMEOUT": float(os.getenv("WORKER_DRAIN_TIMEOUT", "30")),
+        # WORKER_SOURCE: poll (call _perform_work periodically) or stream (Redis Streams jobs)
+        "WORKER_SOURCE": os.getenv("WORKER_SOURCE", "poll"),
+        "WORKER_STREAM": os.getenv("WORKER_STREAM", "jobs"),
+        "WORKER_STREAM_GROUP": os.getenv("WORKER_STREAM_GROUP", "workers"),
+        # Defaults to <hostname>-<pid>
+        "WORKER_STREAM_CONSUMER": os.getenv("WORKER_STREAM_CONSUMER", ""),
+        "WORKER_STREAM_BATCH": int(os.getenv("WORKER_STREAM_BATCH", "32")),
+        "WORKER_STREAM_BLOCK_MS": int(os.getenv("WORKER_STREAM_BLOCK_MS", "2000")),
+        "WORKER_STREAM_CLAIM_IDLE_MS": int(os.getenv("WORKER_STREAM_CLAIM_IDLE_MS", "60000")),
+        "WORKER_STREAM_CLAIM_INTERVAL": float(os.getenv("WORKER_STREAM_CLAIM_INTERVAL", "30")),
+        "WORKER_STREAM_MAX_DELIVERIES": int(os.getenv("WORKER_STREAM_MAX_DELIVERIES", "5")),
+        # Defaults to <WORKER_STREAM>:dead
+        "WORKER_STREAM_DEADLETTER": os.getenv("WORKER_STREAM_DEADLETTER", ""),
+        "WORKER_STREAM_DEADLETTER_MAXLEN": int(os.getenv("WORKER_STREAM_DEADLETTER_MAXLEN", "100000")),
         # --- Postgres ---
         "PG_ENABLED": str_to_bool(os.getenv("PG_ENABLED", "false"), default=False),
         "PG_HOST": os.getenv("PG_HOST", "postgres"),
@@ -66,6 +144,24 @@ def get_config() -> dict:
         "PG_DBNAME": os.getenv("PG_DBNAME", "postgres"),
         "PG_MIN_CONN": int(os.getenv("PG_MIN_CONN", "1")),
         "PG_MAX_CONN": int(os.getenv("PG_MAX_CONN", "5")),
+        # Pool: seconds to wait for a free connection, max connection age and
+        # idle time before recycling (0 = never), idle seconds before a
+        # checkout is validated with SELECT 1 (0 = always)
+        "PG_CONNECT_TIMEOUT": int(os.getenv("PG_CONNECT_TIMEOUT", "5")),
+        "PG_POOL_ACQUIRE_TIMEOUT": float(os.getenv("PG_POOL_ACQUIRE_TIMEOUT", "5")),
+        "PG_POOL_MAX_LIFETIME": float(os.getenv("PG_POOL_MAX_LIFETIME", "1800")),
+        "PG_POOL_MAX_IDLE": float(os.getenv("PG_POOL_MAX_IDLE", "300")),
+        "PG_POOL_VALIDATE_AFTER": float(os.getenv("PG_POOL_VALIDATE_AFTER", "5")),
+        # Prepared statements kept per connection (LRU, see db.pg_query)
+        "PG_PREPARED_CACHE_SIZE": int(os.getenv("PG_PREPARED_CACHE_SIZE", "100")),
+        # Read replicas (see db.pg_router): comma-separated libpq DSNs/URLs,
+        # least_outstanding or round_robin, ejection backoff (seconds), and
+        # how long reads of a session that wrote stay on the primary
+        "PG_REPLICA_DSNS": os.getenv("PG_REPLICA_DSNS", ""),
+        "PG_REPLICA_POLICY": os.getenv("PG_REPLICA_POLICY", "least_outstanding"),
+        "PG_REPLICA_EJECT_BASE": float(os.getenv("PG_REPLICA_EJECT_BASE", "1")),
+        "PG_REPLICA_EJECT_MAX": float(os.getenv("PG_REPLICA_EJECT_MAX", "60")),
+        "PG_READ_YOUR_WRITES_WINDOW": float(os.getenv("PG_READ_YOUR_WRITES_WINDOW", "5")),
         # "PG_SSLMODE": os.getenv("PG_SSLMODE", "prefer"),  # use if TLS is ever required
         # --- Redis ---
         "REDIS_ENABLED": str_to_bool(os.getenv("REDIS_ENABLED", "false"), default=False),
@@ -74,4 +170,81 @@ def get_config() -> dict:
         "REDIS_DB": int(os.getenv("REDIS_DB", "0")),
         "REDIS_PASSWORD": os.getenv("REDIS_PASSWORD"),
         "REDIS_MAX_CONN": int(os.getenv("REDIS_MAX_CONN", "20")),
+        # --- API key metadata cache (per worker, in front of Redis) ---
+        # TTL is also the upper bound for a disabled key to stop working
+        # when an invalidation message is lost.
+        "APIKEY_CACHE_ENABLED": str_to_bool(os.getenv("APIKEY_CACHE_ENABLED", "true"), default=True),
+        "APIKEY_CACHE_MAX_SIZE": int(os.getenv("APIKEY_CACHE_MAX_SIZE", "10000")),
+        "APIKEY_CACHE_TTL": float(os.getenv("APIKEY_CACHE_TTL", "30")),
+        "APIKEY_CACHE_NEGATIVE_TTL": float(os.getenv("APIKEY_CACHE_NEGATIVE_TTL", "5")),
+        "APIKEY_CACHE_CHANNEL": os.getenv("APIKEY_CACHE_CHANNEL", "apikey:invalidate"),
+        "APIKEY_CACHE_KEYSPACE_EVENTS": str_to_bool(
+            os.getenv("APIKEY_CACHE_KEYSPACE_EVENTS", "false"), default=False
+        ),
+        # --- API key warm-up (db.apikey_warmup): scan / snapshot / off ---
+        # Warmed entries are served for at most APIKEY_WARMUP_TTL seconds
+        # after they were read from Redis (default: APIKEY_CACHE_TTL, keep
+        # it no longer); /ready is 503 until warm-up ends.
+        "APIKEY_WARMUP": os.getenv("APIKEY_WARMUP", "scan").lower(),
+        "APIKEY_WARMUP_TTL": float(os.getenv("APIKEY_WARMUP_TTL", os.getenv("APIKEY_CACHE_TTL", "30"))),
+        "APIKEY_WARMUP_TIMEOUT": float(os.getenv("APIKEY_WARMUP_TIMEOUT", "30")),
+        "APIKEY_WARMUP_BATCH": int(os.getenv("APIKEY_WARMUP_BATCH", "1000")),
+        "APIKEY_SNAPSHOT_PATH": os.getenv("APIKEY_SNAPSHOT_PATH", "/tmp/apikey_snapshot.bin"),
+        # --- Prometheus metrics (/metrics) ---
+        # With gunicorn workers set METRICS_MULTIPROC_DIR to a directory
+        # shared by them (emptied at startup) so /metrics adds up all workers.
+        "METRICS_ENABLED": str_to_bool(os.getenv("METRICS_ENABLED", "true"), default=True),
+        "METRICS_MULTIPROC_DIR": os.getenv("METRICS_MULTIPROC_DIR", os.getenv("PROMETHEUS_MULTIPROC_DIR", "")),
+        "METRICS_CALLBACK_INTERVAL": float(os.getenv("METRICS_CALLBACK_INTERVAL", "5")),
+        # --- Request tracing (Server-Timing, summary log, OTLP export) ---
+        "TRACING_ENABLED": str_to_bool(os.getenv("TRACING_ENABLED", "false"), default=False),
+        "TRACING_SAMPLE_RATE": float(os.getenv("TRACING_SAMPLE_RATE", "1.0")),
+        "TRACING_SERVER_TIMING": str_to_bool(os.getenv("TRACING_SERVER_TIMING", "true"), default=True),
+        "TRACING_LOG_SUMMARY": str_to_bool(os.getenv("TRACING_LOG_SUMMARY", "true"), default=True),
+        "TRACING_MAX_SPANS": int(os.getenv("TRACING_MAX_SPANS", "256")),
+        # e.g. http://localhost:4318 (OTLP/HTTP JSON, /v1/traces is appended)
+        "TRACING_OTLP_ENDPOINT": os.getenv("TRACING_OTLP_ENDPOINT", ""),
+        # --- Datastore startup (app.start_datastores) ---
+        # sync: connect before the app serves; background: serve /health at
+        # once, /ready stays 503 until the pools are open.
+        "DATASTORES_STARTUP": os.getenv("DATASTORES_STARTUP", "sync").lower(),
+        # --- Password verification (util.passwords) ---
+        # bcrypt runs in AUTH_VERIFY_WORKERS processes per gunicorn worker;
+        # more than AUTH_VERIFY_MAX_PENDING pending checks (0: 4 per
+        # process) get 429. Hashes cheaper than AUTH_BCRYPT_ROUNDS are
+        # upgraded after a successful login.
+        "AUTH_VERIFY_WORKERS": int(os.getenv("AUTH_VERIFY_WORKERS", "2")),
+        "AUTH_VERIFY_MAX_PENDING": int(os.getenv("AUTH_VERIFY_MAX_PENDING", "0")),
+        "AUTH_VERIFY_TIMEOUT": float(os.getenv("AUTH_VERIFY_TIMEOUT", "5")),
+        "AUTH_BCRYPT_ROUNDS": int(os.getenv("AUTH_BCRYPT_ROUNDS", "12")),
+        # Successful verifications reused for AUTH_CACHE_TTL seconds (0: off)
+        "AUTH_CACHE_TTL": float(os.getenv("AUTH_CACHE_TTL", "30")),
+        "AUTH_CACHE_MAX_SIZE": int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000")),
+        # --- Precomputed responses (util.static_response) ---
+        # Cache-Control max-age of the discovery document (/)
+        "STATIC_CACHE_MAX_AGE": int(os.getenv("STATIC_CACHE_MAX_AGE", "60")),
+        # --- Response compression (api.compression) ---
+        # gzip, and zstd when available, as negotiated by Accept-Encoding;
+        # only COMPRESSION_TYPES bodies of at least COMPRESSION_MIN_SIZE bytes
+        "COMPRESSION_ENABLED": str_to_bool(os.getenv("COMPRESSION_ENABLED", "true"), default=True),
+        "COMPRESSION_MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+        "COMPRESSION_TYPES": os.getenv("COMPRESSION_TYPES", "application/json,+json,application/x-ndjson,text/*"),
+        "COMPRESSION_GZIP_LEVEL": int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+        "COMPRESSION_ZSTD_LEVEL": int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3")),
+        # Per content type, mimetype=GZIP[:ZSTD], e.g. "application/x-ndjson=1:1"
+        "COMPRESSION_LEVELS": os.getenv("COMPRESSION_LEVELS", ""),
+        # Compressed bodies of strong-ETag (static) responses kept in memory
+        "COMPRESSION_CACHE_SIZE": int(os.getenv("COMPRESSION_CACHE_SIZE", "256")),
+        # --- Readiness dependency checks (background, cached for /ready) ---
+        # Names listed in HEALTH_CHECK_CRITICAL gate readiness; the others
+        # (e.g. postgres:replica1) are only reported.
+        "HEALTH_CHECK_INTERVAL": float(os.getenv("HEALTH_CHECK_INTERVAL", "5")),
+        "HEALTH_CHECK_TIMEOUT": float(os.getenv("HEALTH_CHECK_TIMEOUT", "1")),
+        "HEALTH_CHECK_CRITICAL": os.getenv("HEALTH_CHECK_CRITICAL", "postgres,redis"),
+        # --- API key rate limiting / daily quota (rate_limit, quota_daily) ---
+        # When enabled, one Lua call per request replaces the metadata lookup.
+        "RATE_LIMIT_ENABLED": str_to_bool(os.getenv("RATE_LIMIT_ENABLED", "false"), default=False),
+        "RATE_LIMIT_WINDOW": int(os.getenv("RATE_LIMIT_WINDOW", "60")),
+        "RATE_LIMIT_LOCAL_PRECHECK": str_to_bool(os.getenv("RATE_LIMIT_LOCAL_PRECHECK", "true"), default=True),
+        "RATE_LIMIT_LOCAL_MAX_KEYS": int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "10000")),
     }
@@ -5,28 +5,100 @@
 
 """DATABASE STORES"""
 
-__updated__ = "2025-12-07 01:43:22"
+__updated__ = "2026-10-19 05:24:51"
 
 
-from .pg_pool import create_pg_pool  # noqa: F401
-from .redis_pool import create_redis_pool, create_redis_client
+import importlib
+from typing import Any
+
+# Re-exported names and their modules. Loaded on first access (PEP 562) so
+# importing `db` does not pull in psycopg2 / redis for a service that has
+# those datastores disabled.
+_EXPORTS = {
+    "create_pg_pool": ".pg_pool",
+    "PgPool": ".pg_pool",
+    "PoolTimeout": ".pg_pool",
+    "create_pg_query": ".pg_query",
+    "PgQuery": ".pg_query",
+    "create_pg_router": ".pg_router",
+    "PgRouter": ".pg_router",
+    "create_redis_pool": ".redis_pool",
+    "create_redis_client": ".redis_pool",
+    "create_apikey_cache": ".apikey_cache",
+    "start_apikey_warmup": ".apikey_warmup",
+    "build_datastore_checks": ".health_checks",
+    "create_rate_limiter": ".redis_ratelimit",
+    "init_async_datastores": ".async_stores",
+    "close_async_datastores": ".async_stores",
+}
+
+__all__ = sorted(_EXPORTS) + ["init_datastores", "close_datastores"]
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
 
 
 def init_datastores(config: dict) -> dict:
     """
     Initialize the required datastores (Postgres, Redis).
-    Return a dict containing the pools and ready-to-use clients.
+    Return a dict containing the pools and ready-to-use clients. Driver
+    modules are imported only for the enabled datastores.
     """
-    pg_pool = create_pg_pool(config) if config.get("PG_ENABLED", False) else None
+    pg_pool = None
+    pg_router = None
+    pg_query = None
+    if config.get("PG_ENABLED", False):
+        from .pg_pool import create_pg_pool  # pylint: disable=import-outside-toplevel
+        from .pg_query import create_pg_query  # pylint: disable=import-outside-toplevel
+        from .pg_router import create_pg_router  # pylint: disable=import-outside-toplevel
+
+        pg_pool = create_pg_pool(config)
+        if pg_pool is not None:
+            pg_router = create_pg_router(config, pg_pool)
+            pg_query = create_pg_query(config, pg_pool, pg_router)
 
     redis_pool = None
     redis_client = None
+    apikey_cache = None
+    rate_limiter = None
     if config.get("REDIS_ENABLED", False):
+        from .apikey_cache import create_apikey_cache  # pylint: disable=import-outside-toplevel
+        from .redis_pool import create_redis_client, create_redis_pool  # pylint: disable=import-outside-toplevel
+        from .redis_ratelimit import create_rate_limiter  # pylint: disable=import-outside-toplevel
+
         redis_pool = create_redis_pool(config)
         redis_client = create_redis_client(redis_pool)
+        if config.get("APIKEY_CACHE_ENABLED", False):
+            apikey_cache = create_apikey_cache(config, redis_client)
+        if config.get("RATE_LIMIT_ENABLED", False):
+            rate_limiter = create_rate_limiter(config, redis_client, cache=apikey_cache)
 
     return {
         "pg_pool": pg_pool,
+        "pg_router": pg_router,
+        "pg_query": pg_query,
         "redis_pool": redis_pool,
         "redis": redis_client,
+        "apikey_cache": apikey_cache,
+        "rate_limiter": rate_limiter,
     }
+
+
+def close_datastores(stores: dict) -> None:
+    """
+    Stop the background threads of `init_datastores` and close its pools.
+    """
+    if stores.get("apikey_cache") is not None:
+        stores["apikey_cache"].stop()
+    if stores.get("pg_router") is not None:
+        stores["pg_router"].closeall()
+    elif stores.get("pg_pool") is not None:
+        stores["pg_pool"].closeall()
+    if stores.get("redis_pool") is not None:
+        stores["redis_pool"].disconnect()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""DATABASE STORES - In-process API key metadata cache"""
+
+__updated__ = "2026-10-19 08:14:30"
+
+"""
+Per-worker cache in front of `get_apikey_metadata`.
+
+- Bounded LRU with a TTL per entry (positive and negative entries have
+  independent TTLs, so unknown keys do not hammer Redis either).
+- Invalidation via a Redis pub/sub channel: publish the raw API key (or "*"
+  to flush everything) on APIKEY_CACHE_CHANNEL. Optionally, keyspace
+  notifications on `apikey:*` are followed too (requires the server to run
+  with `notify-keyspace-events Kgh`).
+- The TTL is the hard staleness bound: if the listener is disconnected or a
+  message is lost, a disabled key stops working after at most TTL seconds.
+- Optionally backed by a read-only warm table (see db.apikey_warmup)
+  consulted on a miss until it expires; invalidated keys skip it (also
+  those invalidated while it was read) and a full flush detaches it.
+
+Example (Redis CLI), after disabling a key:
+
+redis-cli PUBLISH apikey:invalidate abcd1234
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis
+
+from .redis_apikeys import (
+    APIKEY_INVALIDATION_CHANNEL,
+    APIKEY_PREFIX,
+    ApiKeyRecord,
+    get_apikey_metadata,
+    get_apikey_metadata_async,
+)
+
+logger = logging.getLogger(__name__)
+
+FLUSH_ALL = "*"
+
+
+class ApiKeyCache:
+    """
+    Thread-safe TTL/LRU cache for API key metadata.
+    `None` results (unknown or disabled keys) are cached as negative entries.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        *,
+        max_size: int = 10000,
+        ttl: float = 30.0,
+        negative_ttl: float = 5.0,
+        channel: str = APIKEY_INVALIDATION_CHANNEL,
+        keyspace_events: bool = False,
+        loader: Callable[[redis.Redis, str], Optional[ApiKeyRecord]] = get_apikey_metadata,
+        async_loader: Callable[[Any, str], Awaitable[Optional[ApiKeyRecord]]] = get_apikey_metadata_async,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.redis = redis_client
+        self.max_size = max(1, int(max_size))
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.channel = channel
+        self.keyspace_events = keyspace_events
+        self._loader = loader
+        self._async_loader = async_loader
+        self._clock = clock
+
+        self._entries: "OrderedDict[str, tuple[float, Optional[ApiKeyRecord]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped on every invalidation so in-flight loads do not resurrect stale data
+        self._generation = 0
+        self._counters = {
+            "hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "warm_hits": 0,
+        }
+        self._warm: Any = None
+        self._warm_expires_at = 0.0
+        self._warm_masked: set = set()
+        # Keys invalidated while a warm table loads (see begin_warm_table)
+        self._warm_pending: Optional[set] = None
+        # Generation of the latest full flush
+        self._flushed_at = 0
+        self._subscribed = threading.Event()
+
+        self._stop = threading.Event()
+        self._listener: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ lookup
+
+    def get(self, apikey: Optional[str]) -> Optional[ApiKeyRecord]:
+        """
+        Return cached metadata for `apikey`, loading it from Redis on a miss.
+        Redis errors from the loader propagate to the caller unchanged.
+        """
+        if not apikey:
+            return None
+        found, value, generation = self._lookup(apikey)
+        if found:
+            return value
+        value = self._loader(self.redis, apikey)
+        self.put(apikey, value, generation=generation)
+        return value
+
+    async def get_async(self, apikey: Optional[str], redis_client: Any) -> Optional[ApiKeyRecord]:
+        """
+        `get()` for asyncio callers: a miss is loaded through `redis_client`
+        (a `redis.asyncio.Redis`) without blocking the event loop. Hits never
+        await anything.
+        """
+        if not apikey:
+            return None
+        found, value, generation = self._lookup(apikey)
+        if found:
+            return value
+        value = await self._async_loader(redis_client, apikey)
+        self.put(apikey, value, generation=generation)
+        return value
+
+    def _lookup(self, apikey: str) -> tuple[bool, Optional[ApiKeyRecord], int]:
+        """
+        (found, value, generation) from the entries or the warm table; a
+        miss is counted and must be loaded by the caller.
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(apikey)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(apikey)
+                    if entry[1] is None:
+                        self._counters["negative_hits"] += 1
+                    else:
+                        self._counters["hits"] += 1
+                    return True, entry[1], self._generation
+                del self._entries[apikey]
+                self._counters["expirations"] += 1
+            generation = self._generation
+            warm = self._warm
+            if warm is not None and (self._warm_expires_at <= now or apikey in self._warm_masked):
+                if self._warm_expires_at <= now:
+                    self._detach_warm_table()
+                warm = None
+
+        if warm is not None:
+            value = warm.get(apikey)
+            if value is not None:
+                with self._lock:
+                    self._counters["warm_hits"] += 1
+                # Never outlive the warm table's own staleness bound
+                self.put(apikey, value, ttl=min(self.ttl, self._warm_expires_at - now), generation=generation)
+                return True, value, generation
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return False, None, generation
+
+    def peek(self, apikey: Optional[str]) -> tuple[bool, Optional[ApiKeyRecord]]:
+        """
+        Return (found, value) for a fresh entry without ever calling Redis.
+        """
+        if not apikey:
+            return True, None
+        with self._lock:
+            entry = self._entries.get(apikey)
+            if entry is None or entry[0] <= self._clock():
+                return False, None
+            return True, entry[1]
+
+    def put(
+        self,
+        apikey: str,
+        value: Optional[ApiKeyRecord],
+        ttl: Optional[float] = None,
+        generation: Optional[int] = None,
+    ) -> None:
+        """
+        Store `value` for `apikey`, evicting least recently used entries if full.
+        When `generation` is given, the write is skipped if an invalidation
+        happened since it was read.
+        """
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0:
+            return
+
+        expires_at = self._clock() + ttl
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[apikey] = (expires_at, value)
+            self._entries.move_to_end(apikey)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, apikey: Optional[str] = None) -> None:
+        """
+        Drop one key from the cache, or everything when `apikey` is None.
+        """
+        with self._lock:
+            self._generation += 1
+            if apikey is None:
+                self._flushed_at = self._generation
+                self._counters["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._detach_warm_table()
+                return
+            if self._warm is not None:
+                self._warm_masked.add(apikey)
+            if self._warm_pending is not None:
+                self._warm_pending.add(apikey)
+            if self._entries.pop(apikey, None) is not None:
+                self._counters["invalidations"] += 1
+
+    def begin_warm_table(self) -> int:
+        """
+        Call before reading the data of a warm table: keys invalidated from
+        now on stay masked once it is attached. Return the generation to
+        pass to `attach_warm_table`.
+        """
+        with self._lock:
+            self._warm_pending = set()
+            return self._generation
+
+    def attach_warm_table(self, table: Any, expires_in: float, generation: Optional[int] = None) -> None:
+        """
+        Serve misses from `table` (anything with `get(apikey)` returning a
+        record or None) for the next `expires_in` seconds. Keys absent from
+        the table still go to Redis. With the `generation` returned by
+        `begin_warm_table`, keys invalidated while the table was read are
+        masked, and a full flush in the meantime drops the table.
+        """
+        with self._lock:
+            pending, self._warm_pending = self._warm_pending, None
+            if expires_in <= 0:
+                return
+            if generation is not None and (
+                self._flushed_at > generation or (pending is None and self._generation != generation)
+            ):
+                logger.info("Warm API key table dropped: the cache was flushed while it was read")
+                return
+            self._warm = table
+            self._warm_expires_at = self._clock() + expires_in
+            self._warm_masked = set(pending) if generation is not None and pending else set()
+
+    def _detach_warm_table(self) -> None:
+        """
+        Under the lock.
+        """
+        self._warm = None
+        self._warm_expires_at = 0.0
+        self._warm_masked = set()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return a snapshot of the cache counters, useful for sizing.
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["warm_size"] = len(self._warm) if self._warm is not None else 0
+        stats["max_size"] = self.max_size
+        served = stats["hits"] + stats["negative_hits"] + stats["warm_hits"]
+        lookups = served + stats["misses"]
+        stats["hit_ratio"] = served / lookups if lookups else 0.0
+        return stats
+
+    # ------------------------------------------------------------ invalidation
+
+    def handle_message(self, message: Optional[Dict]) -> None:
+        """
+        Apply a pub/sub message (plain channel or keyspace notification).
+        """
+        if not message or message.get("type") not in ("message", "pmessage"):
+            return
+
+        if message["type"] == "pmessage":
+            # Keyspace notification: channel is "__keyspace@<db>__:apikey:<key>"
+            channel = _to_str(message.get("channel"))
+            _, _, key = channel.partition(f"__:{APIKEY_PREFIX}")
+            if key:
+                self.invalidate(key)
+            return
+
+        data = _to_str(message.get("data"))
+        if not data:
+            return
+        if data == FLUSH_ALL:
+            self.invalidate()
+        else:
+            self.invalidate(data)
+
+    def start_invalidation_listener(self) -> None:
+        """
+        Start the background thread following the invalidation channel.
+        """
+        if self._listener is not None and self._listener.is_alive():
+            return
+        self._stop.clear()
+        self._listener = threading.Thread(
+            target=self._listen,
+            name="apikey-cache-invalidation",
+            daemon=True,
+        )
+        self._listener.start()
+
+    def wait_subscribed(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the invalidation listener has subscribed (True at once if
+        it is not running).
+        """
+        if self._listener is None:
+            return True
+        return self._subscribed.wait(timeout)
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.join(timeout)
+            self._listener = None
+
+    def _listen(self) -> None:
+        backoff = 0.5
+        while not self._stop.is_set():
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if self.keyspace_events:
+                    pubsub.psubscribe(f"__keyspace@*__:{APIKEY_PREFIX}*")
+                # Anything cached before (re)subscribing may have missed a message.
+                self.invalidate()
+                self._subscribed.set()
+                backoff = 0.5
+                while not self._stop.is_set():
+                    self.handle_message(pubsub.get_message(timeout=1.0))
+            except redis.exceptions.RedisError as exc:
+                logger.warning(
+                    "API key cache invalidation listener error: %s",
+                    exc,
+                    extra={"redis_status": "error"},
+                )
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    pubsub.close()
+                except redis.exceptions.RedisError:
+                    pass
+
+
+def _to_str(value: Any) -> str:
+    if isinstance(value, bytes):
+        return value.decode()
+    return value or ""
+
+
+def create_apikey_cache(config: dict, redis_client: redis.Redis) -> ApiKeyCache:
+    """
+    Build the API key cache from configuration and start its listener.
+    """
+    cache = ApiKeyCache(
+        redis_client,
+        max_size=int(config.get("APIKEY_CACHE_MAX_SIZE", 10000)),
+        ttl=float(config.get("APIKEY_CACHE_TTL", 30)),
+        negative_ttl=float(config.get("APIKEY_CACHE_NEGATIVE_TTL", 5)),
+        channel=config.get("APIKEY_CACHE_CHANNEL", APIKEY_INVALIDATION_CHANNEL),
+        keyspace_events=bool(config.get("APIKEY_CACHE_KEYSPACE_EVENTS", False)),
+    )
+    cache.start_invalidation_listener()
+    return cache
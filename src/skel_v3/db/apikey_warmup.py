@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""DATABASE STORES - API key warm-up and snapshot"""
+
+__updated__ = "2026-10-19 08:16:02"
+
+"""
+Fills the API key cache before a freshly started worker reports ready, so a
+restart or scale-out does not send the first wave of traffic to Redis.
+
+APIKEY_WARMUP selects the source:
+
+- `scan`: SCAN `apikey:*` (hashes only) and HGETALL them in pipelined
+  batches of APIKEY_WARMUP_BATCH.
+- `snapshot`: map APIKEY_SNAPSHOT_PATH if it is recent enough, otherwise
+  scan as above and write the snapshot for the next worker.
+- `off`: no warm-up.
+
+The result is an `ApiKeySnapshot`: a sorted, read-only binary table looked
+up by binary search and decoded per key on demand. Opened from a file it is
+memory-mapped, so all gunicorn workers on a host share the same page cache
+pages; built in memory before fork it is a single bytes object, shared
+copy-on-write. The cache consults it on a miss until APIKEY_WARMUP_TTL
+seconds after the data was read from Redis (by default APIKEY_CACHE_TTL,
+so a lost invalidation is not served longer than from the cache itself).
+Invalidation messages mask individual keys, including those received while
+the table was read; a full flush during the read drops it. A table
+preloaded in the master misses invalidations published before the worker
+subscribed: the TTL bounds those.
+
+Under `gunicorn --preload` the table is built once in the master
+(`preload_apikey_table`) and every forked worker attaches the same bytes.
+
+File layout (little-endian):
+
+header  magic "AKS1", version u16, reserved u16, count u32, created_at f64
+index   count x (offset u64, key_len u16, value_len u32), sorted by key
+data    key bytes followed by the JSON of `ApiKeyRecord.as_dict()`
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+import redis
+
+from util.readiness import ReadinessGate
+
+from .redis_apikeys import APIKEY_PREFIX, ApiKeyRecord, get_apikey_metadata_many
+from .redis_pool import create_redis_pool
+
+logger = logging.getLogger(__name__)
+
+WARMUP_OFF = "off"
+WARMUP_SCAN = "scan"
+WARMUP_SNAPSHOT = "snapshot"
+WARMUP_PRELOAD = "preload"
+READINESS_NAME = "apikey_warmup"
+
+_MAGIC = b"AKS1"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHId")
+_ENTRY = struct.Struct("<QHI")
+
+
+class SnapshotError(ValueError):
+    """
+    The snapshot file is missing pieces or is not a snapshot at all.
+    """
+
+
+class ApiKeySnapshot:
+    """
+    Read-only API key table over a bytes-like buffer (bytes or mmap).
+    """
+
+    def __init__(self, buffer: Any) -> None:
+        if len(buffer) < _HEADER.size:
+            raise SnapshotError("snapshot too short")
+        magic, version, _, count, created_at = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise SnapshotError("not an API key snapshot")
+        if len(buffer) < _HEADER.size + count * _ENTRY.size:
+            raise SnapshotError("snapshot index truncated")
+        self._buffer = buffer
+        self.count = count
+        self.created_at = created_at
+
+    @classmethod
+    def open(cls, path: str) -> "ApiKeySnapshot":
+        with open(path, "rb") as fh:
+            # The mapping stays valid after the file is closed (or replaced)
+            return cls(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _entry(self, index: int) -> Tuple[int, int, int]:
+        return _ENTRY.unpack_from(self._buffer, _HEADER.size + index * _ENTRY.size)
+
+    def _key(self, index: int) -> bytes:
+        offset, key_len, _ = self._entry(index)
+        return self._buffer[offset : offset + key_len]
+
+    def get(self, apikey: str) -> Optional[ApiKeyRecord]:
+        """
+        Decode the record for `apikey`, or None if it is not in the table.
+        """
+        wanted = apikey.encode()
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < wanted:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count:
+            return None
+        offset, key_len, value_len = self._entry(lo)
+        if self._buffer[offset : offset + key_len] != wanted:
+            return None
+        start = offset + key_len
+        return ApiKeyRecord.from_dict(json.loads(self._buffer[start : start + value_len]))
+
+    def keys(self) -> Iterator[str]:
+        for index in range(self.count):
+            yield self._key(index).decode()
+
+
+def build_snapshot(records: Iterable[Tuple[str, ApiKeyRecord]], created_at: Optional[float] = None) -> bytes:
+    """
+    Serialize (apikey, record) pairs; later duplicates win.
+    """
+    table = {apikey.encode(): json.dumps(record.as_dict(), separators=(",", ":")).encode() for apikey, record in records}
+    keys = sorted(table)
+    data_offset = _HEADER.size + len(keys) * _ENTRY.size
+    index = bytearray()
+    data = bytearray()
+    for key in keys:
+        value = table[key]
+        index += _ENTRY.pack(data_offset + len(data), len(key), len(value))
+        data += key
+        data += value
+    header = _HEADER.pack(_MAGIC, _VERSION, 0, len(keys), time.time() if created_at is None else created_at)
+    return bytes(header + index + data)
+
+
+def write_snapshot(path: str, data: bytes) -> None:
+    """
+    Write atomically: readers see the old or the new file, never a mix.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def scan_apikeys(
+    r: redis.Redis,
+    *,
+    batch_size: int = 1000,
+    limit: int = 0,
+    deadline: Optional[float] = None,
+) -> Iterator[Tuple[str, ApiKeyRecord]]:
+    """
+    Yield (apikey, record) for every enabled key, one SCAN page and one
+    pipelined HGETALL batch at a time. Stops after `limit` keys (0: no limit)
+    or once `time.monotonic()` passes `deadline`.
+    """
+    yielded = 0
+    cursor = 0
+    while True:
+        cursor, keys = r.scan(cursor, match=f"{APIKEY_PREFIX}*", count=batch_size, _type="hash")
+        apikeys = [(k.decode() if isinstance(k, bytes) else k)[len(APIKEY_PREFIX) :] for k in keys]
+        for apikey, record in zip(apikeys, get_apikey_metadata_many(r, apikeys, chunk_size=batch_size)):
+            if record is None:
+                continue
+            yield apikey, record
+            yielded += 1
+            if limit and yielded >= limit:
+                return
+        if cursor == 0:
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            logger.warning("API key warm-up stopped at its time budget after %d keys", yielded)
+            return
+
+
+def load_snapshot(path: str, max_age: float) -> Optional[ApiKeySnapshot]:
+    """
+    Map the snapshot at `path` if it exists, is valid and younger than `max_age`.
+    """
+    try:
+        snapshot = ApiKeySnapshot.open(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Ignoring unreadable API key snapshot %s: %s", path, exc)
+        return None
+    if time.time() - snapshot.created_at > max_age:
+        return None
+    return snapshot
+
+
+def warmup_ttl(config: dict) -> float:
+    """
+    APIKEY_WARMUP_TTL, defaulting to APIKEY_CACHE_TTL.
+    """
+    return float(config.get("APIKEY_WARMUP_TTL", config.get("APIKEY_CACHE_TTL", 30)))
+
+
+def _load_table(config: dict, r: redis.Redis, limit: int, deadline: float) -> Tuple[ApiKeySnapshot, str]:
+    """
+    Map a fresh snapshot or scan Redis (writing the snapshot in `snapshot`
+    mode). Return the table and its source ("snapshot" or "scan").
+    """
+    mode = str(config.get("APIKEY_WARMUP", WARMUP_SCAN)).lower()
+    path = config.get("APIKEY_SNAPSHOT_PATH") or ""
+    ttl = warmup_ttl(config)
+
+    snapshot = load_snapshot(path, ttl) if mode == WARMUP_SNAPSHOT and path else None
+    source = WARMUP_SNAPSHOT
+    if snapshot is None:
+        source = WARMUP_SCAN
+        started = time.time()
+        records = scan_apikeys(
+            r,
+            batch_size=int(config.get("APIKEY_WARMUP_BATCH", 1000)),
+            limit=limit,
+            deadline=deadline,
+        )
+        data = build_snapshot(records, created_at=started)
+        if mode == WARMUP_SNAPSHOT and path:
+            try:
+                write_snapshot(path, data)
+                snapshot = ApiKeySnapshot.open(path)
+            except OSError as exc:
+                logger.warning("Unable to write API key snapshot %s: %s", path, exc)
+        if snapshot is None:
+            snapshot = ApiKeySnapshot(data)
+    return snapshot, source
+
+
+def warm_apikey_cache(config: dict, cache: Any, table: Optional[ApiKeySnapshot] = None) -> Tuple[ApiKeySnapshot, str]:
+    """
+    Attach a warm table to `cache`: `table` (built before fork) while it is
+    fresh, otherwise one loaded as configured. Return it with its source
+    ("preload", "snapshot" or "scan"). Redis errors propagate.
+    """
+    ttl = warmup_ttl(config)
+    timeout = float(config.get("APIKEY_WARMUP_TIMEOUT", 30))
+    deadline = time.monotonic() + timeout
+
+    # Anything attached before the invalidation listener subscribes is flushed
+    cache.wait_subscribed(timeout)
+    # From here on, invalidated keys stay masked in the table attached below
+    generation = cache.begin_warm_table()
+
+    if table is not None and time.time() - table.created_at < ttl:
+        snapshot, source = table, WARMUP_PRELOAD
+    else:
+        snapshot, source = _load_table(config, cache.redis, cache.max_size, deadline)
+    cache.attach_warm_table(snapshot, expires_in=snapshot.created_at + ttl - time.time(), generation=generation)
+    return snapshot, source
+
+
+def preload_apikey_table(config: dict) -> Optional[ApiKeySnapshot]:
+    """
+    Build the warm table in the gunicorn master so forked workers share it.
+    Uses its own Redis connection, closed before returning; None when the
+    warm-up is off or Redis fails (workers then warm up on their own).
+    """
+    mode = str(config.get("APIKEY_WARMUP", WARMUP_SCAN)).lower()
+    if mode not in (WARMUP_SCAN, WARMUP_SNAPSHOT):
+        return None
+    pool = create_redis_pool(config)
+    r = redis.Redis(connection_pool=pool)
+    try:
+        deadline = time.monotonic() + float(config.get("APIKEY_WARMUP_TIMEOUT", 30))
+        snapshot, _ = _load_table(config, r, int(config.get("APIKEY_CACHE_MAX_SIZE", 10000)), deadline)
+    except (redis.exceptions.RedisError, OSError) as exc:
+        logger.warning("API key preload failed: %s", exc, extra={"redis_status": "error"})
+        return None
+    finally:
+        pool.disconnect()
+    logger.info("API key table preloaded", extra={"keys": len(snapshot)})
+    return snapshot
+
+
+def start_apikey_warmup(
+    config: dict,
+    cache: Any,
+    gate: ReadinessGate,
+    table: Optional[ApiKeySnapshot] = None,
+) -> Optional[threading.Thread]:
+    """
+    Run the warm-up in a background thread, holding `gate` not-ready until it
+    finishes. Failures are logged and the worker becomes ready without a
+    warm table (lookups go to Redis as usual).
+    """
+    mode = str(config.get("APIKEY_WARMUP", WARMUP_SCAN)).lower()
+    if cache is None or mode not in (WARMUP_SCAN, WARMUP_SNAPSHOT):
+        return None
+
+    gate.add(READINESS_NAME)
+
+    def _run() -> None:
+        try:
+            snapshot, source = warm_apikey_cache(config, cache, table)
+        except (redis.exceptions.RedisError, OSError) as exc:
+            logger.warning("API key warm-up failed: %s", exc, extra={"redis_status": "error"})
+            gate.done(READINESS_NAME, error=str(exc))
+            return
+        logger.info("API key warm-up complete", extra={"keys": len(snapshot), "source": source})
+        gate.done(READINESS_NAME, keys=len(snapshot), source=source)
+
+    thread = threading.Thread(target=_run, name="apikey-warmup", daemon=True)
+    thread.start()
+    return thread
+
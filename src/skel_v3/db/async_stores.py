@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""DATABASE STORES - asyncio clients (redis.asyncio, asyncpg)"""
+
+__updated__ = "2026-10-18 16:38:24"
+
+"""
+Async counterpart of `init_datastores`, used by the asyncio worker runtime.
+
+- Redis: `redis.asyncio` client on its own connection pool (same settings as
+  the sync pool).
+- Postgres: asyncpg pool sized by PG_MIN_CONN/PG_MAX_CONN. asyncpg is an
+  optional dependency; without it (or if Postgres is unreachable) the pool is
+  None so the service can fail-open, like `create_pg_pool`.
+"""
+
+import logging
+from typing import Any, Optional
+
+import redis.asyncio as aioredis
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - optional dependency
+    asyncpg = None
+
+LOGGER = logging.getLogger(__name__)
+
+
+def create_async_redis_pool(config: dict) -> aioredis.ConnectionPool:
+    """
+    Create an asyncio Redis connection pool from the provided config.
+    """
+    return aioredis.ConnectionPool(
+        host=config["REDIS_HOST"],
+        port=config["REDIS_PORT"],
+        db=config["REDIS_DB"],
+        password=config.get("REDIS_PASSWORD") or None,
+        max_connections=int(config.get("REDIS_MAX_CONN", 20)),
+        decode_responses=False,
+    )
+
+
+async def create_async_pg_pool(config: dict) -> Optional[Any]:
+    """
+    Create an asyncpg pool, or return None if asyncpg is missing or the
+    connection fails.
+    """
+    if asyncpg is None:
+        LOGGER.warning(
+            "asyncpg is not installed; async PG pool disabled",
+            extra={"pg_status": "error"},
+        )
+        return None
+    try:
+        return await asyncpg.create_pool(
+            min_size=int(config.get("PG_MIN_CONN", 1)),
+            max_size=int(config.get("PG_MAX_CONN", 5)),
+            user=config["PG_USER"],
+            password=config["PG_PASSWORD"],
+            host=config["PG_HOST"],
+            port=config["PG_PORT"],
+            database=config["PG_DBNAME"],
+        )
+    except (OSError, asyncpg.PostgresError) as exc:
+        LOGGER.warning(
+            "Unable to connect to Postgres; async PG pool disabled. Error: %s",
+            exc,
+            extra={"pg_status": "error"},
+        )
+        return None
+
+
+async def init_async_datastores(config: dict) -> dict:
+    """
+    Initialize the asyncio datastores (Postgres, Redis).
+    Return a dict containing the pools and ready-to-use clients.
+    """
+    pg_pool = await create_async_pg_pool(config) if config.get("PG_ENABLED", False) else None
+
+    redis_pool = None
+    redis_client = None
+    if config.get("REDIS_ENABLED", False):
+        redis_pool = create_async_redis_pool(config)
+        redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+    return {
+        "pg_pool": pg_pool,
+        "redis_pool": redis_pool,
+        "redis": redis_client,
+    }
+
+
+async def close_async_datastores(stores: dict) -> None:
+    """
+    Close the clients and pools created by `init_async_datastores`.
+    """
+    if stores.get("redis") is not None:
+        await stores["redis"].aclose()
+    if stores.get("redis_pool") is not None:
+        await stores["redis_pool"].disconnect()
+    if stores.get("pg_pool") is not None:
+        await stores["pg_pool"].close()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""DATABASE STORES - dependency checks for readiness probes"""
+
+__updated__ = "2026-10-19 05:26:10"
+
+"""
+One callable per enabled datastore for `util.readiness.DependencyMonitor`;
+each raises when the dependency is unusable.
+
+- `postgres`: check out a primary connection (bounded by the check timeout)
+  and run `SELECT 1`.
+- `postgres:<replica>`: the same against each read replica (see
+  db.pg_router). Replicas are not critical by default: reads fall back to
+  the primary.
+- `redis`: PING.
+
+A datastore enabled in the configuration whose client could not be created
+at startup is reported as failing.
+"""
+
+from typing import TYPE_CHECKING, Any, Callable, Dict
+
+if TYPE_CHECKING:  # psycopg2 is only imported when Postgres is enabled
+    from .pg_pool import PgPool
+
+
+def _pg_check(pool: "PgPool", timeout: float) -> Callable[[], None]:
+    def check() -> None:
+        with pool.connection(timeout=timeout) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+
+    return check
+
+
+def _unavailable(name: str) -> Callable[[], None]:
+    def check() -> None:
+        raise RuntimeError(f"{name} unavailable since startup")
+
+    return check
+
+
+def build_datastore_checks(config: dict, stores: dict) -> Dict[str, Callable[[], Any]]:
+    timeout = float(config.get("HEALTH_CHECK_TIMEOUT", 1))
+    checks: Dict[str, Callable[[], Any]] = {}
+
+    if config.get("PG_ENABLED", False):
+        router = stores.get("pg_router")
+        pg_pool = stores.get("pg_pool")
+        if pg_pool is None:
+            checks["postgres"] = _unavailable("Postgres pool")
+        else:
+            checks["postgres"] = _pg_check(pg_pool, timeout)
+        for node in getattr(router, "replicas", ()):
+            checks[f"postgres:{node.name}"] = _pg_check(node.pool, timeout)
+
+    if config.get("REDIS_ENABLED", False):
+        redis_client = stores.get("redis")
+        checks["redis"] = redis_client.ping if redis_client is not None else _unavailable("Redis client")
+
+    return checks
@@ -5,39 +5,409 @@
 
 """DATABASE STORES - Postgres connection pool"""
 
-__updated__ = "2025-12-12 02:51:18"
+__updated__ = "2026-10-19 00:21:14"
+
+"""
+Thread-safe pool shared by gunicorn threads and worker pool threads.
+
+- `getconn(timeout)` blocks until a connection is free (up to
+  PG_POOL_ACQUIRE_TIMEOUT) instead of failing at once when exhausted;
+  `PoolTimeout` is a `psycopg2.pool.PoolError`.
+- On checkout, broken connections are discarded, and connections idle for
+  more than PG_POOL_VALIDATE_AFTER seconds are pinged with `SELECT 1`.
+- Connections older than PG_POOL_MAX_LIFETIME or idle for more than
+  PG_POOL_MAX_IDLE are closed and replaced on demand.
+- PG_MIN_CONN connections are opened at startup.
+- `connection()` is a context manager that always returns the connection.
+- `stats()` exposes in-use/idle gauges and the acquire wait histogram.
+
+`getconn`/`putconn`/`closeall` keep the psycopg2 pool interface.
+"""
 
 import logging
-from typing import Any, Optional
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
 
 import psycopg2
-from psycopg2 import pool
+from psycopg2 import extensions, pool
+
+from util.metrics import REGISTRY, Histogram
+from util.tracing import span
 
 LOGGER = logging.getLogger(__name__)
 
+PG_ACQUIRE_SECONDS = REGISTRY.histogram(
+    "pg_pool_acquire_duration_seconds", "Time waited for a Postgres connection.", ("pool",)
+)
+PG_ACQUIRE_TIMEOUTS = REGISTRY.counter(
+    "pg_pool_acquire_timeouts_total", "Postgres connection checkouts that timed out.", ("pool",)
+)
+
 minconn = 1  # Minimum number of connections to keep in the pool
 maxconn = 20  # Maximum number of connections to keep in the pool
 
+_BROKEN_STATUSES = (extensions.TRANSACTION_STATUS_INERROR, extensions.TRANSACTION_STATUS_UNKNOWN)
+
 
-def create_pg_pool(config: dict) -> Optional[Any]:
+class PoolTimeout(pool.PoolError):
     """
-    Create a psycopg2 SimpleConnectionPool based on configuration.
-    Return None if connection fails so the service can fail-open.
+    No connection became available within the acquire timeout.
     """
-    try:
-        return pool.SimpleConnectionPool(
-            minconn=int(config.get("PG_MIN_CONN", minconn)),
-            maxconn=int(config.get("PG_MAX_CONN", maxconn)),
+
+
+class ConnectionMeta:
+    """
+    Pool bookkeeping for one connection. `data` is free for per-connection
+    caches owned by other modules; it lives and dies with the connection.
+    """
+
+    __slots__ = ("created_at", "last_used", "uses", "data")
+
+    def __init__(self, now: float) -> None:
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+        self.data: Dict[str, Any] = {}
+
+
+class PgPool:
+    """
+    Blocking, thread-safe connection pool with validation and recycling.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        *,
+        min_conn: int = minconn,
+        max_conn: int = maxconn,
+        acquire_timeout: float = 5.0,
+        max_lifetime: float = 1800.0,
+        max_idle: float = 300.0,
+        validate_after: float = 5.0,
+        name: str = "primary",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._connect = connect
+        self.name = name
+        self.max_conn = max(1, int(max_conn))
+        self.min_conn = min(max(0, int(min_conn)), self.max_conn)
+        self.acquire_timeout = float(acquire_timeout)
+        self.max_lifetime = float(max_lifetime)
+        self.max_idle = float(max_idle)
+        self.validate_after = float(validate_after)
+        self._clock = clock
+
+        self._cond = threading.Condition(threading.Lock())
+        # Most recently returned on the right: checkout takes from the right so
+        # surplus connections age on the left and get reaped
+        self._idle: Deque[Any] = deque()
+        self._meta: Dict[int, ConnectionMeta] = {}
+        self._in_use: Dict[int, Any] = {}
+        self._opening = 0
+        self._waiting = 0
+        self.closed = False
+
+        self.wait_seconds = Histogram()
+        self.acquired = 0
+        self.timeouts = 0
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+        self._acquire_metric = PG_ACQUIRE_SECONDS.labels(name)
+        self._timeout_metric = PG_ACQUIRE_TIMEOUTS.labels(name)
+
+    # ---------------------------------------------------------------- lifecycle
+
+    def warm(self) -> None:
+        """
+        Open connections up to `min_conn`. Connection errors propagate.
+        """
+        while True:
+            with self._cond:
+                if self._total() >= self.min_conn:
+                    return
+                self._opening += 1
+            try:
+                conn = self._open()
+            finally:
+                with self._cond:
+                    self._opening -= 1
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def closeall(self) -> None:
+        """
+        Close idle connections now; checked-out ones are closed when returned.
+        """
+        with self._cond:
+            self.closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            for conn in idle:
+                self._meta.pop(id(conn), None)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    # ----------------------------------------------------------------- checkout
+
+    def getconn(self, key: Any = None, timeout: Optional[float] = None) -> Any:
+        """
+        Check out a connection, waiting up to `timeout` seconds (default
+        `acquire_timeout`) for one to be free. `key` is accepted for psycopg2
+        compatibility and ignored.
+        """
+        with span("pg.acquire", pool=self.name):
+            return self._getconn(self.acquire_timeout if timeout is None else timeout)
+
+    def _getconn(self, timeout: float) -> Any:
+        started = self._clock()
+        deadline = started + timeout
+        while True:
+            conn, expired, action = self._checkout(deadline)
+            self._close_all(expired)
+            if action == "timeout":
+                self._timeout_metric.inc()
+                raise PoolTimeout(f"no Postgres connection available within {timeout:.3f}s")
+            if action == "open":
+                try:
+                    conn = self._open()
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        if conn is not None:
+                            self._in_use[id(conn)] = conn
+                        else:
+                            self._cond.notify()
+            elif not self._usable(conn):
+                self._discard(conn)
+                continue
+
+            meta = self._meta[id(conn)]
+            now = self._clock()
+            meta.last_used = now
+            meta.uses += 1
+            self.wait_seconds.observe(now - started)
+            self._acquire_metric.observe(now - started)
+            with self._cond:
+                self.acquired += 1
+            return conn
+
+    def _checkout(self, deadline: float):
+        """
+        Under the lock: take an idle connection, or reserve the right to open
+        one, or wait. Return (connection, expired connections, action) with
+        action one of "idle", "open", "timeout".
+        """
+        expired: List[Any] = []
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise pool.PoolError("connection pool is closed")
+                now = self._clock()
+                expired.extend(self._reap(now))
+                while self._idle:
+                    conn = self._idle.pop()
+                    if self._expired(self._meta[id(conn)], now):
+                        self._meta.pop(id(conn), None)
+                        self.recycled += 1
+                        expired.append(conn)
+                        continue
+                    self._in_use[id(conn)] = conn
+                    return conn, expired, "idle"
+                if self._total() < self.max_conn:
+                    self._opening += 1
+                    return None, expired, "open"
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.timeouts += 1
+                    return None, expired, "timeout"
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+    def putconn(self, conn: Any, key: Any = None, close: bool = False) -> None:
+        """
+        Return a connection. Broken or aborted transactions are rolled back
+        or discarded; with `close=True` the connection is closed.
+        """
+        with self._cond:
+            if self._in_use.pop(id(conn), None) is None:
+                raise pool.PoolError("trying to put unkeyed connection")
+
+        if not close and not self.closed and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+        else:
+            close = True
+
+        if close:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            meta = self._meta.get(id(conn))
+            if meta is not None:
+                meta.last_used = self._clock()
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        `with pool.connection() as conn:` — the connection is always returned;
+        on error any open transaction is rolled back by `putconn`.
+        """
+        conn = self.getconn(timeout=timeout)
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def meta(self, conn: Any) -> Optional[ConnectionMeta]:
+        with self._cond:
+            return self._meta.get(id(conn))
+
+    # ------------------------------------------------------------------ metrics
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            gauges = {
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "opening": self._opening,
+                "waiting": self._waiting,
+                "max": self.max_conn,
+            }
+            counters = {
+                "acquired": self.acquired,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "recycled": self.recycled,
+                "discarded": self.discarded,
+            }
+        return {**gauges, **counters, "wait_seconds": self.wait_seconds.snapshot()}
+
+    # ---------------------------------------------------------------- internals
+
+    def _total(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _open(self) -> Any:
+        conn = self._connect()
+        with self._cond:
+            self._meta[id(conn)] = ConnectionMeta(self._clock())
+            self.created += 1
+        return conn
+
+    def _expired(self, meta: ConnectionMeta, now: float) -> bool:
+        if self.max_lifetime > 0 and now - meta.created_at > self.max_lifetime:
+            return True
+        return self.max_idle > 0 and now - meta.last_used > self.max_idle
+
+    def _reap(self, now: float) -> List[Any]:
+        """
+        Under the lock: drop expired connections from the cold end of the
+        idle queue, keeping `min_conn` connections.
+        """
+        reaped = []
+        while self._idle and self._total() > self.min_conn:
+            meta = self._meta[id(self._idle[0])]
+            if not self._expired(meta, now):
+                break
+            conn = self._idle.popleft()
+            self._meta.pop(id(conn), None)
+            self.recycled += 1
+            reaped.append(conn)
+        return reaped
+
+    def _usable(self, conn: Any) -> bool:
+        if conn.closed or conn.get_transaction_status() in _BROKEN_STATUSES:
+            return False
+        meta = self._meta[id(conn)]
+        if self._clock() - meta.last_used < self.validate_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn: Any) -> None:
+        with self._cond:
+            self._in_use.pop(id(conn), None)
+            self._meta.pop(id(conn), None)
+            self.discarded += 1
+            self._cond.notify()
+        self._close_all([conn])
+
+    @staticmethod
+    def _close_all(conns: List[Any]) -> None:
+        for conn in conns:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+
+def build_pg_pool(config: dict, dsn: Optional[str] = None, name: str = "primary") -> PgPool:
+    """
+    Build a pool (no connection opened yet) for the primary described by
+    PG_HOST/PG_PORT/..., or for `dsn` (e.g. a read replica).
+    """
+    connect_timeout = int(config.get("PG_CONNECT_TIMEOUT", 5))
+
+    def connect() -> Any:
+        if dsn:
+            return psycopg2.connect(dsn, connect_timeout=connect_timeout)
+        return psycopg2.connect(
             user=config["PG_USER"],
             password=config["PG_PASSWORD"],
             host=config["PG_HOST"],
             port=config["PG_PORT"],
             database=config["PG_DBNAME"],
+            connect_timeout=connect_timeout,
         )
+
+    return PgPool(
+        connect,
+        min_conn=int(config.get("PG_MIN_CONN", minconn)),
+        max_conn=int(config.get("PG_MAX_CONN", maxconn)),
+        acquire_timeout=float(config.get("PG_POOL_ACQUIRE_TIMEOUT", 5)),
+        max_lifetime=float(config.get("PG_POOL_MAX_LIFETIME", 1800)),
+        max_idle=float(config.get("PG_POOL_MAX_IDLE", 300)),
+        validate_after=float(config.get("PG_POOL_VALIDATE_AFTER", 5)),
+        name=name,
+    )
+
+
+def create_pg_pool(config: dict) -> Optional[PgPool]:
+    """
+    Create the Postgres pool and open PG_MIN_CONN connections.
+    Return None if connection fails so the service can fail-open.
+    """
+    pg_pool = build_pg_pool(config)
+    try:
+        pg_pool.warm()
     except psycopg2.OperationalError as exc:
         LOGGER.warning(
             "Unable to connect to Postgres; PG pool disabled. Error: %s",
             exc,
             extra={"pg_status": "error"},
         )
+        pg_pool.closeall()
         return None
+    return pg_pool
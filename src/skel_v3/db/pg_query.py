@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""DATABASE STORES - Postgres query helpers (prepared statements, bulk, streaming)"""
+
+__updated__ = "2026-10-19 00:21:14"
+
+"""
+Query layer on top of `PgPool`.
+
+- Statements are registered once by name with psycopg2-style `%s`
+  placeholders and run with server-side PREPARE/EXECUTE: each connection
+  parses and plans a statement once. Prepared names are tracked per
+  connection in an LRU (PG_PREPARED_CACHE_SIZE, DEALLOCATE on eviction)
+  stored in the pool's connection metadata, so it goes away when the pool
+  recycles the connection.
+- Bulk inserts with `execute_values` (multi-row VALUES pages) or `COPY FROM
+  STDIN` fed from an iterator, without building the whole payload in memory.
+- `stream()` reads large results through a server-side named cursor,
+  `itersize` rows per round trip.
+- With a `PgRouter`, read-only statements go to replicas and everything
+  else to the primary.
+
+Example:
+
+queries = stores["pg_query"]
+queries.register("user_by_id", "SELECT id, name FROM users WHERE id = %s")
+row = queries.fetchone("user_by_id", (42,))
+"""
+
+import itertools
+import re
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from psycopg2 import errors, sql
+from psycopg2.extras import execute_values
+
+from util.metrics import REGISTRY
+from util.tracing import span
+
+from .pg_pool import PgPool
+from .pg_router import PgRouter
+
+_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,50}$")
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
+_READONLY_RE = re.compile(r"^\s*(SELECT|VALUES|TABLE|SHOW)\b", re.IGNORECASE)
+_LOCKING_RE = re.compile(r"\bFOR\s+(NO\s+KEY\s+)?(UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+_PREPARED_KEY = "prepared_statements"
+_cursor_ids = itertools.count(1)
+
+PG_QUERY_SECONDS = REGISTRY.histogram(
+    "pg_query_duration_seconds", "Postgres statement time, connection checkout included.", ("statement",)
+)
+PG_QUERY_ERRORS = REGISTRY.counter("pg_query_errors_total", "Postgres statements that raised.", ("statement",))
+
+
+def to_prepared_sql(query: str) -> str:
+    """
+    Convert psycopg2 `%s` placeholders to PREPARE's `$1, $2, ...`
+    (`%%` becomes a literal `%`).
+    """
+    counter = itertools.count(1)
+    return _PLACEHOLDER_RE.sub(lambda m: "%" if m.group(0) == "%%" else f"${next(counter)}", query)
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    text = str(value)
+    if any(c in text for c in "\\\t\n\r"):
+        text = text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+    return text
+
+
+class CopyStream:
+    """
+    File-like object producing COPY text format lazily from an iterable of
+    rows, for `cursor.copy_expert`.
+    """
+
+    def __init__(self, rows: Iterable[Sequence[Any]]) -> None:
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.rows = 0
+
+    def read(self, size: int = -1) -> str:
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            line = "\t".join(_copy_value(v) for v in row) + "\n"
+            parts.append(line)
+            length += len(line)
+            self.rows += 1
+        data = "".join(parts)
+        if size < 0:
+            size = length
+        chunk, self._buffer = data[:size], data[size:]
+        return chunk
+
+
+class PgQuery:
+    """
+    Named statements, bulk inserts and streaming reads over a `PgPool`, or
+    over a `PgRouter` to send read-only statements to replicas.
+
+    Each call checks out a connection and commits before returning it.
+    Pass `conn`, or call inside `PgRouter.transaction()`, to run in a
+    caller-managed transaction instead. `session` opts into
+    read-your-writes (see db.pg_router).
+    """
+
+    def __init__(self, pool: PgPool, *, router: Optional[PgRouter] = None, max_prepared: int = 100) -> None:
+        self.pool = pool
+        self.router = router
+        self.max_prepared = max(1, int(max_prepared))
+        # name -> (PREPARE body, read-only)
+        self._statements: Dict[str, Tuple[str, bool]] = {}
+        self._unpooled: "weakref.WeakKeyDictionary[Any, OrderedDict[str, str]]" = weakref.WeakKeyDictionary()
+        self.prepares = 0
+        self.executes = 0
+
+    @contextmanager
+    def _connection(self, conn: Optional[Any], readonly: bool, session: Optional[Hashable]) -> Iterator[Tuple[Any, bool]]:
+        """
+        Yield (connection, owned); owned connections are committed by the caller here.
+        """
+        if conn is not None:
+            yield conn, False
+        elif self.router is not None:
+            owned = not self.router.in_transaction()
+            with self.router.connection(readonly, session=session) as routed:
+                yield routed, owned
+        else:
+            with self.pool.connection() as own:
+                yield own, True
+
+    # -------------------------------------------------------------- statements
+
+    def register(self, name: str, query: str, *, readonly: Optional[bool] = None) -> None:
+        """
+        Register (or replace) statement `name`. Connections that prepared
+        an older version re-prepare it on next use. Plain SELECTs (without
+        FOR UPDATE/SHARE) are read-only unless `readonly` says otherwise.
+        """
+        if not _NAME_RE.match(name):
+            raise ValueError(f"invalid statement name: {name!r}")
+        if readonly is None:
+            readonly = bool(_READONLY_RE.match(query)) and not _LOCKING_RE.search(query)
+        self._statements[name] = (to_prepared_sql(query), readonly)
+
+    def _prepared(self, conn: Any) -> "OrderedDict[str, str]":
+        meta = (self.router or self.pool).meta(conn)
+        if meta is None:
+            # Connection not managed by the pool
+            return self._unpooled.setdefault(conn, OrderedDict())
+        return meta.data.setdefault(_PREPARED_KEY, OrderedDict())
+
+    def _statement(self, name: str) -> Tuple[str, bool]:
+        statement = self._statements.get(name)
+        if statement is None:
+            raise KeyError(f"unknown statement: {name!r}")
+        return statement
+
+    def _ensure_prepared(self, cur: Any, conn: Any, name: str) -> str:
+        statement, _ = self._statement(name)
+        prepared = self._prepared(conn)
+        server_name = f"s_{name}"
+        cached = prepared.get(name)
+        if cached == statement:
+            prepared.move_to_end(name)
+            return server_name
+        if cached is not None:
+            cur.execute(f"DEALLOCATE {server_name}")
+        cur.execute(f"PREPARE {server_name} AS {statement}")
+        self.prepares += 1
+        prepared[name] = statement
+        while len(prepared) > self.max_prepared:
+            evicted, _ = prepared.popitem(last=False)
+            cur.execute(f"DEALLOCATE s_{evicted}")
+        return server_name
+
+    def _execute(self, cur: Any, conn: Any, name: str, params: Sequence[Any]) -> None:
+        server_name = self._ensure_prepared(cur, conn, name)
+        if params:
+            cur.execute(f"EXECUTE {server_name} ({', '.join(['%s'] * len(params))})", tuple(params))
+        else:
+            cur.execute(f"EXECUTE {server_name}")
+        self.executes += 1
+
+    def _run(self, name: str, params: Sequence[Any], fetch: str, conn: Optional[Any], session: Optional[Hashable]) -> Any:
+        started = time.perf_counter()
+        try:
+            with span("pg.query", statement=name):
+                return self._run_statement(name, params, fetch, conn, session)
+        except Exception:
+            PG_QUERY_ERRORS.labels(name).inc()
+            raise
+        finally:
+            PG_QUERY_SECONDS.labels(name).observe(time.perf_counter() - started)
+
+    def _run_statement(
+        self, name: str, params: Sequence[Any], fetch: str, conn: Optional[Any], session: Optional[Hashable]
+    ) -> Any:
+        _, readonly = self._statement(name)
+        with self._connection(conn, readonly, session) as (active, owned):
+            if not owned:
+                return self._run_on(active, name, params, fetch)
+            try:
+                result = self._run_on(active, name, params, fetch)
+            except errors.InvalidSqlStatementName:
+                # Prepared statements lost server-side (e.g. DISCARD ALL): retry once
+                active.rollback()
+                result = self._run_on(active, name, params, fetch)
+            active.commit()
+            return result
+
+    def _run_on(self, conn: Any, name: str, params: Sequence[Any], fetch: str) -> Any:
+        try:
+            with conn.cursor() as cur:
+                self._execute(cur, conn, name, params)
+                if fetch == "one":
+                    return cur.fetchone()
+                if fetch == "all":
+                    return cur.fetchall()
+                return cur.rowcount
+        except errors.InvalidSqlStatementName:
+            # The session lost its prepared statements: start over
+            self._prepared(conn).clear()
+            raise
+
+    def execute(
+        self,
+        name: str,
+        params: Sequence[Any] = (),
+        *,
+        conn: Optional[Any] = None,
+        session: Optional[Hashable] = None,
+    ) -> int:
+        """
+        Run statement `name`; return the affected row count.
+        """
+        return self._run(name, params, "count", conn, session)
+
+    def fetchone(
+        self,
+        name: str,
+        params: Sequence[Any] = (),
+        *,
+        conn: Optional[Any] = None,
+        session: Optional[Hashable] = None,
+    ) -> Optional[tuple]:
+        return self._run(name, params, "one", conn, session)
+
+    def fetchall(
+        self,
+        name: str,
+        params: Sequence[Any] = (),
+        *,
+        conn: Optional[Any] = None,
+        session: Optional[Hashable] = None,
+    ) -> List[tuple]:
+        return self._run(name, params, "all", conn, session)
+
+    # -------------------------------------------------------------------- bulk
+
+    def insert_many(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Sequence[Any]],
+        *,
+        page_size: int = 1000,
+        conn: Optional[Any] = None,
+        session: Optional[Hashable] = None,
+    ) -> None:
+        """
+        Insert rows with multi-row VALUES statements, `page_size` rows each.
+        """
+        query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(*table.split(".")),
+            sql.SQL(", ").join(sql.Identifier(c) for c in columns),
+        )
+        with self._connection(conn, False, session) as (active, owned):
+            with active.cursor() as cur:
+                execute_values(cur, query, rows, page_size=page_size)
+            if owned:
+                active.commit()
+
+    def copy_rows(
+        self,
+        table: str,
+        columns: Sequence[str],
+        rows: Iterable[Sequence[Any]],
+        *,
+        buffer_size: int = 65536,
+        conn: Optional[Any] = None,
+        session: Optional[Hashable] = None,
+    ) -> int:
+        """
+        Stream rows with COPY FROM STDIN (text format); return the row count.
+        """
+        query = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(*table.split(".")),
+            sql.SQL(", ").join(sql.Identifier(c) for c in columns),
+        )
+        stream = CopyStream(rows)
+        with self._connection(conn, False, session) as (active, owned):
+            with active.cursor() as cur:
+                cur.copy_expert(query, stream, size=buffer_size)
+            if owned:
+                active.commit()
+        return stream.rows
+
+    # --------------------------------------------------------------- streaming
+
+    def stream(
+        self,
+        query: str,
+        params: Sequence[Any] = (),
+        *,
+        itersize: int = 2000,
+        session: Optional[Hashable] = None,
+    ) -> Iterator[tuple]:
+        """
+        Yield rows of a read-only `query` (psycopg2 `%s` placeholders)
+        through a server-side cursor. The connection is held until the
+        iterator is exhausted or closed.
+        """
+        with self._connection(None, True, session) as (conn, owned):
+            with conn.cursor(name=f"stream_{next(_cursor_ids)}") as cur:
+                cur.itersize = max(1, int(itersize))
+                cur.execute(query, tuple(params) or None)
+                yield from cur
+            if owned:
+                conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"statements": len(self._statements), "prepares": self.prepares, "executes": self.executes}
+
+
+def create_pg_query(config: dict, pool: PgPool, router: Optional[PgRouter] = None) -> PgQuery:
+    return PgQuery(pool, router=router, max_prepared=int(config.get("PG_PREPARED_CACHE_SIZE", 100)))
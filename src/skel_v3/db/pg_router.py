@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""DATABASE STORES - Postgres primary/replica routing"""
+
+__updated__ = "2026-10-18 23:18:04"
+
+"""
+One pool per node: the primary (PG_HOST...) plus one per DSN in
+PG_REPLICA_DSNS (comma-separated).
+
+- `connection(readonly=True)` goes to a replica chosen by PG_REPLICA_POLICY:
+  `least_outstanding` (fewest connections handed out by this process,
+  ties rotate) or `round_robin`. Everything else goes to the primary.
+- Inside `transaction()` every connection request, reads included, reuses
+  the transaction's primary connection.
+- A replica that fails to connect or raises a connection error is ejected
+  for PG_REPLICA_EJECT_BASE seconds, doubling per consecutive failure up to
+  PG_REPLICA_EJECT_MAX, then tried again. Reads fall back to the primary
+  while no replica is available.
+- Read-your-writes is opt-in per session key (user, API key, ...): after a
+  write made with `session=key`, reads with the same key go to the primary
+  for PG_READ_YOUR_WRITES_WINDOW seconds (replication lag budget).
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+import psycopg2
+
+from .pg_pool import ConnectionMeta, PgPool, PoolTimeout, build_pg_pool
+
+LOGGER = logging.getLogger(__name__)
+
+POLICY_LEAST_OUTSTANDING = "least_outstanding"
+POLICY_ROUND_ROBIN = "round_robin"
+
+_NODE_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+# (router, connection) of the transaction open in this context
+_current_tx: contextvars.ContextVar[Optional[Tuple["PgRouter", Any]]] = contextvars.ContextVar(
+    "pg_router_transaction", default=None
+)
+
+
+class PgNode:
+    """
+    One Postgres node with its pool and routing state.
+    """
+
+    __slots__ = ("name", "pool", "primary", "outstanding", "requests", "failures", "ejected_until")
+
+    def __init__(self, name: str, pool: PgPool, *, primary: bool = False) -> None:
+        self.name = name
+        self.pool = pool
+        self.primary = primary
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+
+class PgRouter:
+    """
+    Route connections between a primary pool and read-replica pools.
+    """
+
+    def __init__(
+        self,
+        primary: PgPool,
+        replicas: Sequence[Tuple[str, PgPool]] = (),
+        *,
+        policy: str = POLICY_LEAST_OUTSTANDING,
+        eject_base: float = 1.0,
+        eject_max: float = 60.0,
+        read_your_writes_window: float = 5.0,
+        max_sessions: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.primary = PgNode("primary", primary, primary=True)
+        self.replicas = [PgNode(name, pool) for name, pool in replicas]
+        self.policy = policy if policy in (POLICY_LEAST_OUTSTANDING, POLICY_ROUND_ROBIN) else POLICY_LEAST_OUTSTANDING
+        self.eject_base = max(0.0, float(eject_base))
+        self.eject_max = max(self.eject_base, float(eject_max))
+        self.read_your_writes_window = max(0.0, float(read_your_writes_window))
+        self.max_sessions = max(1, int(max_sessions))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._rr = 0
+        self._writes: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    # ----------------------------------------------------------------- routing
+
+    def _candidates(self, readonly: bool, session: Optional[Hashable]) -> List[PgNode]:
+        """
+        Nodes to try in order (the primary last), under the lock.
+        """
+        if not readonly or not self.replicas:
+            return [self.primary]
+        now = self._clock()
+        if session is not None:
+            written = self._writes.get(session)
+            if written is not None and now - written < self.read_your_writes_window:
+                return [self.primary]
+
+        healthy = [n for n in self.replicas if n.ejected_until <= now]
+        if not healthy:
+            return [self.primary]
+        start = self._rr % len(healthy)
+        self._rr += 1
+        rotated = healthy[start:] + healthy[:start]
+        if self.policy == POLICY_LEAST_OUTSTANDING:
+            # Stable sort keeps the rotation among equally loaded nodes
+            rotated.sort(key=lambda n: n.outstanding)
+        return rotated + [self.primary]
+
+    def _acquire(self, readonly: bool, session: Optional[Hashable], timeout: Optional[float]) -> Tuple[PgNode, Any]:
+        with self._lock:
+            candidates = self._candidates(readonly, session)
+        for node in candidates:
+            with self._lock:
+                node.outstanding += 1
+            try:
+                conn = node.pool.getconn(timeout=timeout)
+            except _NODE_ERRORS as exc:
+                self._release(node)
+                if node.primary:
+                    raise
+                self.eject(node, exc)
+                continue
+            except PoolTimeout:
+                self._release(node)
+                if node.primary:
+                    raise
+                continue
+            with self._lock:
+                node.requests += 1
+            return node, conn
+        raise AssertionError("unreachable: the primary is always a candidate")
+
+    def _release(self, node: PgNode) -> None:
+        with self._lock:
+            node.outstanding -= 1
+
+    def eject(self, node: PgNode, exc: BaseException) -> None:
+        with self._lock:
+            node.failures += 1
+            backoff = min(self.eject_max, self.eject_base * 2 ** (node.failures - 1))
+            node.ejected_until = self._clock() + backoff
+        LOGGER.warning(
+            "Postgres replica %s ejected for %.1fs: %s",
+            node.name,
+            backoff,
+            exc,
+            extra={"pg_status": "error"},
+        )
+
+    def _succeeded(self, node: PgNode) -> None:
+        if node.failures:
+            with self._lock:
+                node.failures = 0
+
+    def in_transaction(self) -> bool:
+        current = _current_tx.get()
+        return current is not None and current[0] is self
+
+    def note_write(self, session: Hashable) -> None:
+        """
+        Record a write for `session` (read-your-writes).
+        """
+        with self._lock:
+            self._writes[session] = self._clock()
+            self._writes.move_to_end(session)
+            while len(self._writes) > self.max_sessions:
+                self._writes.popitem(last=False)
+
+    # --------------------------------------------------------------- interface
+
+    @contextmanager
+    def connection(
+        self,
+        readonly: bool = False,
+        *,
+        session: Optional[Hashable] = None,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Any]:
+        """
+        `with router.connection(readonly=True) as conn:` — a replica
+        connection for reads, the primary otherwise. The connection always
+        goes back to its pool. Writes are not committed here.
+        """
+        if self.in_transaction():
+            yield _current_tx.get()[1]
+            return
+
+        node, conn = self._acquire(readonly, session, timeout)
+        try:
+            yield conn
+        except _NODE_ERRORS as exc:
+            if not node.primary:
+                self.eject(node, exc)
+            raise
+        finally:
+            self._release(node)
+            node.pool.putconn(conn)
+        self._succeeded(node)
+        if not readonly and session is not None:
+            self.note_write(session)
+
+    @contextmanager
+    def transaction(self, *, session: Optional[Hashable] = None, timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Primary connection for a transaction: committed on success, rolled
+        back on error. Connections requested inside reuse it.
+        """
+        if self.in_transaction():
+            yield _current_tx.get()[1]
+            return
+
+        with self.connection(session=session, timeout=timeout) as conn:
+            token = _current_tx.set((self, conn))
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                _current_tx.reset(token)
+
+    def meta(self, conn: Any) -> Optional[ConnectionMeta]:
+        for node in (self.primary, *self.replicas):
+            meta = node.pool.meta(conn)
+            if meta is not None:
+                return meta
+        return None
+
+    def closeall(self) -> None:
+        for node in (self.primary, *self.replicas):
+            node.pool.closeall()
+
+    def stats(self) -> Dict[str, Any]:
+        now = self._clock()
+        with self._lock:
+            nodes = {
+                node.name: {
+                    "primary": node.primary,
+                    "outstanding": node.outstanding,
+                    "requests": node.requests,
+                    "failures": node.failures,
+                    "ejected": node.ejected_until > now,
+                }
+                for node in (self.primary, *self.replicas)
+            }
+        return {"policy": self.policy, "nodes": nodes}
+
+
+def parse_replica_dsns(value: Optional[str]) -> List[str]:
+    return [dsn.strip() for dsn in (value or "").split(",") if dsn.strip()]
+
+
+def create_pg_router(config: dict, primary: PgPool) -> PgRouter:
+    """
+    Build the router around the primary pool, with one pool per replica in
+    PG_REPLICA_DSNS. Unreachable replicas start ejected.
+    """
+    replicas: List[Tuple[str, PgPool]] = []
+    for index, dsn in enumerate(parse_replica_dsns(config.get("PG_REPLICA_DSNS"))):
+        name = f"replica{index + 1}"
+        replicas.append((name, build_pg_pool(config, dsn, name=name)))
+
+    router = PgRouter(
+        primary,
+        replicas,
+        policy=str(config.get("PG_REPLICA_POLICY", POLICY_LEAST_OUTSTANDING)).lower(),
+        eject_base=float(config.get("PG_REPLICA_EJECT_BASE", 1)),
+        eject_max=float(config.get("PG_REPLICA_EJECT_MAX", 60)),
+        read_your_writes_window=float(config.get("PG_READ_YOUR_WRITES_WINDOW", 5)),
+    )
+    for node in router.replicas:
+        try:
+            node.pool.warm()
+        except _NODE_ERRORS as exc:
+            router.eject(node, exc)
+    return router
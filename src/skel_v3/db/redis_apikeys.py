@@ -5,7 +5,7 @@
 
 """DATABASE STORES - Redis API key management"""
 
-__updated__ = "2025-12-07 01:44:00"
+__updated__ = "2026-10-19 08:47:31"
 
 """
 Suggested Redis hash shape for API keys:
@@ -33,13 +33,118 @@ redis-cli HSET apikey:abcd1234 \
 
 
 import json
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
 import redis
-from typing import Optional, Dict
+
+APIKEY_PREFIX = "apikey:"
+APIKEY_INVALIDATION_CHANNEL = "apikey:invalidate"
+
+_EMPTY: Mapping = MappingProxyType({})
 
 
-def get_apikey_metadata(r: redis.Redis, apikey: str) -> Optional[Dict]:
+class ApiKeyRecord(Mapping):
     """
-    Return a dict with API key metadata if present and enabled,
+    Immutable API key metadata. Known fields are typed attributes
+    (`rate_limit`/`quota_daily` as int, `allowed_endpoints` as a tuple,
+    `metadata` as a read-only mapping); other hash fields are kept as strings
+    in `extra`. It is also a read-only mapping of the fields present in the
+    hash, so `record["customer_id"]` and `record.get("tier")` keep working.
+    """
+
+    __slots__ = ("customer_id", "tier", "rate_limit", "quota_daily", "allowed_endpoints", "metadata", "extra")
+
+    FIELDS: Tuple[str, ...] = ("customer_id", "tier", "rate_limit", "quota_daily", "allowed_endpoints", "metadata")
+
+    def __init__(
+        self,
+        customer_id: Optional[str] = None,
+        tier: Optional[str] = None,
+        rate_limit: Optional[int] = None,
+        quota_daily: Optional[int] = None,
+        allowed_endpoints: Optional[Iterable[str]] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        extra: Optional[Dict[str, str]] = None,
+    ) -> None:
+        setattr_ = object.__setattr__
+        setattr_(self, "customer_id", customer_id)
+        setattr_(self, "tier", tier)
+        setattr_(self, "rate_limit", rate_limit)
+        setattr_(self, "quota_daily", quota_daily)
+        setattr_(self, "allowed_endpoints", tuple(allowed_endpoints) if allowed_endpoints is not None else None)
+        setattr_(self, "metadata", MappingProxyType(dict(metadata)) if metadata is not None else None)
+        setattr_(self, "extra", MappingProxyType(dict(extra)) if extra else _EMPTY)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self.extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if getattr(self, field) is not None:
+                yield field
+        yield from self.extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"ApiKeyRecord({dict(self.items())!r})"
+
+    def __reduce__(self):
+        return (
+            _rebuild_record,
+            (
+                self.customer_id,
+                self.tier,
+                self.rate_limit,
+                self.quota_daily,
+                self.allowed_endpoints,
+                dict(self.metadata) if self.metadata is not None else None,
+                dict(self.extra),
+            ),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ApiKeyRecord":
+        """
+        Inverse of `as_dict()`.
+        """
+        known = {field: data[field] for field in cls.FIELDS if field in data}
+        extra = {k: v for k, v in data.items() if k not in known}
+        return cls(**known, extra=extra)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Plain JSON-serializable copy.
+        """
+        data = dict(self.items())
+        if self.allowed_endpoints is not None:
+            data["allowed_endpoints"] = list(self.allowed_endpoints)
+        if self.metadata is not None:
+            data["metadata"] = dict(self.metadata)
+        return data
+
+
+def _rebuild_record(*args: Any) -> ApiKeyRecord:
+    return ApiKeyRecord(*args)
+
+
+def get_apikey_metadata(r: redis.Redis, apikey: str) -> Optional[ApiKeyRecord]:
+    """
+    Return the API key metadata if present and enabled,
     or None if it does not exist or is disabled.
 
     r: existing Redis client (redis.Redis)
@@ -47,34 +152,108 @@ def get_apikey_metadata(r: redis.Redis, apikey: str) -> Optional[Dict]:
     if not apikey:
         return None
 
-    key = f"apikey:{apikey}"
+    key = f"{APIKEY_PREFIX}{apikey}"
     data = r.hgetall(key)  # dict {b'field': b'value'}
 
+    return decode_apikey_hash(data)
+
+
+async def get_apikey_metadata_async(r: Any, apikey: str) -> Optional[ApiKeyRecord]:
+    """
+    `get_apikey_metadata` for a `redis.asyncio.Redis` client.
+    """
+    if not apikey:
+        return None
+    return decode_apikey_hash(await r.hgetall(f"{APIKEY_PREFIX}{apikey}"))
+
+
+def get_apikey_metadata_many(
+    r: redis.Redis,
+    apikeys: Sequence[str],
+    fields: Optional[Sequence[str]] = None,
+    chunk_size: int = 1000,
+) -> List[Optional[ApiKeyRecord]]:
+    """
+    Look up many API keys with pipelined commands: one round trip per
+    `chunk_size` keys. Return one entry per input key, in order (None when
+    missing, disabled or empty).
+
+    `fields` limits the lookup to those hash fields with HMGET instead of
+    HGETALL (`disabled` is always fetched to honour the flag).
+    """
+    projection: Optional[List[str]] = None
+    if fields is not None:
+        projection = list(dict.fromkeys([*fields, "disabled"]))
+
+    results: List[Optional[ApiKeyRecord]] = []
+    chunk_size = max(1, int(chunk_size))
+    for start in range(0, len(apikeys), chunk_size):
+        chunk = apikeys[start : start + chunk_size]
+        pipe = r.pipeline(transaction=False)
+        for apikey in chunk:
+            key = f"{APIKEY_PREFIX}{apikey}"
+            if projection is None:
+                pipe.hgetall(key)
+            else:
+                pipe.hmget(key, projection)
+        replies = pipe.execute() if chunk else []
+
+        for apikey, reply in zip(chunk, replies):
+            if not apikey:
+                results.append(None)
+            elif projection is None:
+                results.append(decode_apikey_hash(reply))
+            else:
+                present = {f.encode(): v for f, v in zip(projection, reply) if v is not None}
+                results.append(decode_apikey_hash(present))
+    return results
+
+
+def _parse_json(value: str, default: Any) -> Any:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return default
+
+
+def decode_apikey_hash(data: Optional[Dict[bytes, bytes]]) -> Optional[ApiKeyRecord]:
+    """
+    Decode a raw `apikey:{apikey}` hash as returned by HGETALL.
+    Return None if it is empty or the key is disabled.
+    """
     if not data:
         return None
 
     decoded = {k.decode(): v.decode() for k, v in data.items()}
 
     # 1) Check disabled flag first
-    if decoded.get("disabled") == "1":
+    if decoded.pop("disabled", None) == "1":
         return None
 
-    # 2) Convert numeric fields
-    for field in ("rate_limit", "quota_daily"):
-        if field in decoded:
-            decoded[field] = int(decoded[field])
-
-    # 3) Parse JSON fields
-    if "allowed_endpoints" in decoded:
-        try:
-            decoded["allowed_endpoints"] = json.loads(decoded["allowed_endpoints"])
-        except json.JSONDecodeError:
-            decoded["allowed_endpoints"] = []
-
-    if "metadata" in decoded:
-        try:
-            decoded["metadata"] = json.loads(decoded["metadata"])
-        except json.JSONDecodeError:
-            decoded["metadata"] = {}
-
-    return decoded
+    # 2) Convert numeric fields, 3) parse JSON fields
+    rate_limit = decoded.pop("rate_limit", None)
+    quota_daily = decoded.pop("quota_daily", None)
+    allowed_endpoints = decoded.pop("allowed_endpoints", None)
+    metadata = decoded.pop("metadata", None)
+
+    return ApiKeyRecord(
+        customer_id=decoded.pop("customer_id", None),
+        tier=decoded.pop("tier", None),
+        rate_limit=int(rate_limit) if rate_limit is not None else None,
+        quota_daily=int(quota_daily) if quota_daily is not None else None,
+        allowed_endpoints=_parse_json(allowed_endpoints, []) if allowed_endpoints is not None else None,
+        metadata=_parse_json(metadata, {}) if metadata is not None else None,
+        extra=decoded,
+    )
+
+
+def publish_apikey_invalidation(
+    r: redis.Redis,
+    apikey: Optional[str] = None,
+    channel: str = APIKEY_INVALIDATION_CHANNEL,
+) -> int:
+    """
+    Tell every worker cache to drop `apikey` (or everything when None).
+    Call it after updating or disabling a key. Return the number of receivers.
+    """
+    return r.publish(channel, apikey or "*")
@@ -5,9 +5,55 @@
 
 """DATABASE STORES - Redis connection pool management"""
 
-__updated__ = "2025-12-07 01:44:17"
+__updated__ = "2026-10-19 00:21:14"
+
+import time
 
 import redis
+from redis.client import Pipeline
+
+from util.metrics import REGISTRY
+from util.tracing import span
+
+REDIS_COMMAND_SECONDS = REGISTRY.histogram(
+    "redis_command_duration_seconds", "Redis command round trip time (pipelines as PIPELINE).", ("command",)
+)
+REDIS_COMMAND_ERRORS = REGISTRY.counter("redis_command_errors_total", "Redis commands that raised.", ("command",))
+
+
+class InstrumentedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        started = time.perf_counter()
+        try:
+            with span("redis", command="PIPELINE", commands=len(self.command_stack)):
+                return super().execute(raise_on_error)
+        except redis.exceptions.RedisError:
+            REDIS_COMMAND_ERRORS.labels("PIPELINE").inc()
+            raise
+        finally:
+            REDIS_COMMAND_SECONDS.labels("PIPELINE").observe(time.perf_counter() - started)
+
+
+class InstrumentedRedis(redis.Redis):
+    """
+    `redis.Redis` recording the latency of every command and pipeline, as
+    metrics and as `redis` spans of the current trace.
+    """
+
+    def execute_command(self, *args, **options):
+        command = str(args[0]).upper() if args else "UNKNOWN"
+        started = time.perf_counter()
+        try:
+            with span("redis", command=command):
+                return super().execute_command(*args, **options)
+        except redis.exceptions.RedisError:
+            REDIS_COMMAND_ERRORS.labels(command).inc()
+            raise
+        finally:
+            REDIS_COMMAND_SECONDS.labels(command).observe(time.perf_counter() - started)
+
+    def pipeline(self, transaction=True, shard_hint=None) -> Pipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
 
 
 def create_redis_pool(config: dict) -> redis.ConnectionPool:
@@ -28,4 +74,14 @@ def create_redis_pool(config: dict) -> redis.ConnectionPool:
 
 
 def create_redis_client(pool: redis.ConnectionPool) -> redis.Redis:
-    return redis.Redis(connection_pool=pool)
+    return InstrumentedRedis(connection_pool=pool)
+
+
+def redis_pool_stats(pool: redis.ConnectionPool) -> dict:
+    """
+    Connection counts of a redis-py pool (read from its internals, zero if
+    they are not available in this redis-py version).
+    """
+    in_use = len(getattr(pool, "_in_use_connections", ()))
+    idle = len(getattr(pool, "_available_connections", ()))
+    return {"in_use": in_use, "idle": idle, "max": getattr(pool, "max_connections", 0) or 0}
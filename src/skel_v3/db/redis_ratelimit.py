@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""DATABASE STORES - Redis API key rate limiting and daily quotas"""
+
+__updated__ = "2026-10-19 09:45:52"
+
+"""
+Enforces `rate_limit` (requests per window, sliding) and `quota_daily` from
+the `apikey:{apikey}` hash in a single Redis round trip: one Lua script reads
+the hash, evaluates both limits and, only when the request is allowed,
+increments the counters.
+
+Keys used besides the API key hash:
+
+ratelimit:{apikey}:{window_index}   → INCR counter, expires after 2 windows
+quota:{apikey}:{YYYYMMDD}           → INCR counter, expires after UTC midnight
+
+The sliding window is approximated with the previous and current fixed
+windows: used = prev * (unelapsed fraction of window) + cur. When limited,
+the reset (Retry-After) is the time until the oldest counted hits have aged
+out enough for `used` to drop below the limit, which for a full current
+window lies past its end.
+
+A value of 0 (or a missing field) for `rate_limit` / `quota_daily` means
+unlimited.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import redis
+
+from .redis_apikeys import APIKEY_PREFIX, ApiKeyRecord, decode_apikey_hash
+
+RATELIMIT_PREFIX = "ratelimit:"
+QUOTA_PREFIX = "quota:"
+
+STATUS_INVALID = 0
+STATUS_OK = 1
+STATUS_RATE_LIMITED = 2
+STATUS_QUOTA_EXCEEDED = 3
+
+# Reply: {status, limit, remaining, reset_ms, quota, quota_remaining, quota_reset_s, field1, value1, ...}
+RATE_LIMIT_LUA = """
+local data = redis.call('HGETALL', KEYS[1])
+if #data == 0 then
+  return {0}
+end
+
+local limit, quota, disabled = 0, 0, '0'
+for i = 1, #data, 2 do
+  local f = data[i]
+  if f == 'disabled' then
+    disabled = data[i + 1]
+  elseif f == 'rate_limit' then
+    limit = tonumber(data[i + 1]) or 0
+  elseif f == 'quota_daily' then
+    quota = tonumber(data[i + 1]) or 0
+  end
+end
+if disabled == '1' then
+  return {0}
+end
+
+local window_ms = tonumber(ARGV[1])
+local elapsed_ms = tonumber(ARGV[2])
+local quota_reset = tonumber(ARGV[3])
+
+local status = 1
+local remaining, reset_ms, quota_remaining = -1, 0, -1
+
+if limit > 0 then
+  local cur = tonumber(redis.call('GET', KEYS[2]) or '0')
+  local prev = tonumber(redis.call('GET', KEYS[3]) or '0')
+  local used = math.floor(prev * (window_ms - elapsed_ms) / window_ms) + cur
+  reset_ms = window_ms - elapsed_ms
+  if used >= limit then
+    status = 2
+    remaining = 0
+    if cur >= limit then
+      -- the current window's hits become the previous window's share at its
+      -- end, and must then decay below the limit
+      reset_ms = window_ms - elapsed_ms + math.max(1, math.ceil(window_ms - limit * window_ms / cur))
+    elseif prev > 0 then
+      -- wait until the previous window's share decays below the limit
+      reset_ms = math.max(1, math.ceil(window_ms - elapsed_ms - (limit - cur) * window_ms / prev))
+    end
+  else
+    remaining = limit - used - 1
+  end
+end
+
+if quota > 0 then
+  local used_quota = tonumber(redis.call('GET', KEYS[4]) or '0')
+  if used_quota >= quota then
+    status = 3
+    quota_remaining = 0
+  else
+    quota_remaining = quota - used_quota - 1
+  end
+end
+
+if status == 1 then
+  if limit > 0 then
+    redis.call('INCR', KEYS[2])
+    redis.call('PEXPIRE', KEYS[2], window_ms * 2)
+  end
+  if quota > 0 then
+    redis.call('INCR', KEYS[4])
+    redis.call('EXPIRE', KEYS[4], quota_reset + 60)
+  end
+end
+
+local reply = {status, limit, remaining, reset_ms, quota, quota_remaining, quota_reset}
+for i = 1, #data do
+  reply[#reply + 1] = data[i]
+end
+return reply
+"""
+
+
+class RateLimitDecision:
+    """
+    Outcome of a rate limit check, including the API key metadata
+    (None when the key is invalid or the check was answered locally).
+    """
+
+    __slots__ = (
+        "status",
+        "metadata",
+        "limit",
+        "remaining",
+        "reset",
+        "quota",
+        "quota_remaining",
+        "quota_reset",
+        "window",
+        "local",
+    )
+
+    def __init__(
+        self,
+        status: int,
+        metadata: Optional[ApiKeyRecord] = None,
+        *,
+        limit: int = 0,
+        remaining: int = -1,
+        reset: int = 0,
+        quota: int = 0,
+        quota_remaining: int = -1,
+        quota_reset: int = 0,
+        window: int = 60,
+        local: bool = False,
+    ) -> None:
+        self.status = status
+        self.metadata = metadata
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.quota = quota
+        self.quota_remaining = quota_remaining
+        self.quota_reset = quota_reset
+        self.window = window
+        self.local = local
+
+    @property
+    def limited(self) -> bool:
+        return self.status in (STATUS_RATE_LIMITED, STATUS_QUOTA_EXCEEDED)
+
+    @property
+    def reason(self) -> Optional[str]:
+        if self.status == STATUS_RATE_LIMITED:
+            return "rate_limited"
+        if self.status == STATUS_QUOTA_EXCEEDED:
+            return "quota_exceeded"
+        return None
+
+    def headers(self) -> Dict[str, str]:
+        """
+        Return the `RateLimit-*` (and `Retry-After` when limited) headers.
+        """
+        headers: Dict[str, str] = {}
+        if self.status == STATUS_QUOTA_EXCEEDED:
+            headers["RateLimit-Limit"] = str(self.quota)
+            headers["RateLimit-Remaining"] = "0"
+            headers["RateLimit-Reset"] = str(self.quota_reset)
+            headers["RateLimit-Policy"] = f"{self.quota};w=86400"
+            headers["Retry-After"] = str(self.quota_reset)
+            return headers
+
+        if self.limit > 0:
+            headers["RateLimit-Limit"] = str(self.limit)
+            headers["RateLimit-Remaining"] = str(max(self.remaining, 0))
+            headers["RateLimit-Reset"] = str(self.reset)
+            headers["RateLimit-Policy"] = f"{self.limit};w={self.window}"
+        if self.status == STATUS_RATE_LIMITED:
+            headers["Retry-After"] = str(max(self.reset, 1))
+        return headers
+
+
+class _LocalBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated", "blocked")
+
+    def __init__(self, capacity: int, window: int, now: float) -> None:
+        # capacity 0 means no per-window limit, only remembered rejections
+        self.capacity = float(capacity)
+        self.rate = capacity / float(window)
+        self.tokens = float(capacity)
+        self.updated = now
+        # (blocked_until, decision from Redis) while the key is over a limit
+        self.blocked: Optional[tuple[float, RateLimitDecision]] = None
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter and daily quota enforcement for API keys.
+
+    With `local_precheck`, each worker keeps a token bucket per key (sized
+    with the key's own `rate_limit`) plus the last "blocked until" answer
+    from Redis, and rejects requests that are already over the limit from
+    this worker alone without a Redis round trip. Redis stays the authority.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        *,
+        window: int = 60,
+        local_precheck: bool = True,
+        local_max_keys: int = 10000,
+        cache: Any = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.redis = redis_client
+        self.window = max(1, int(window))
+        self.local_precheck = local_precheck
+        self.local_max_keys = max(1, int(local_max_keys))
+        self.cache = cache
+        self._clock = clock
+        self._script = redis_client.register_script(RATE_LIMIT_LUA)
+        # Scripts of asyncio clients used with check_async(), by client id
+        self._async_scripts: Dict[int, Any] = {}
+        self._buckets: "OrderedDict[str, _LocalBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, apikey: Optional[str]) -> RateLimitDecision:
+        """
+        Validate `apikey` and consume one request from its limits.
+        Redis errors propagate to the caller unchanged.
+        """
+        now = self._clock()
+        decision = self._precheck(apikey, now)
+        if decision is not None:
+            return decision
+        return self._decide(apikey, self._script(**self._script_params(apikey, now)), now)
+
+    async def check_async(self, apikey: Optional[str], redis_client: Any) -> RateLimitDecision:
+        """
+        `check()` for asyncio callers, running the script through
+        `redis_client` (a `redis.asyncio.Redis`). Local pre-check state and
+        the cache are shared with the sync path.
+        """
+        now = self._clock()
+        decision = self._precheck(apikey, now)
+        if decision is not None:
+            return decision
+        script = self._async_scripts.get(id(redis_client))
+        if script is None:
+            script = self._async_scripts[id(redis_client)] = redis_client.register_script(RATE_LIMIT_LUA)
+        return self._decide(apikey, await script(**self._script_params(apikey, now)), now)
+
+    def _precheck(self, apikey: Optional[str], now: float) -> Optional[RateLimitDecision]:
+        """
+        A decision reached without Redis, or None if the script must run.
+        """
+        if not apikey:
+            return RateLimitDecision(STATUS_INVALID, window=self.window)
+
+        # Known-bad keys never reach Redis while the negative entry is fresh
+        if self.cache is not None:
+            found, value = self.cache.peek(apikey)
+            if found and value is None:
+                return RateLimitDecision(STATUS_INVALID, window=self.window)
+
+        if self.local_precheck:
+            return self._local_check(apikey, now)
+        return None
+
+    def _script_params(self, apikey: str, now: float) -> Dict[str, list]:
+        window_ms = self.window * 1000
+        now_ms = int(now * 1000)
+        window_index = now_ms // window_ms
+        day = time.strftime("%Y%m%d", time.gmtime(now))
+        quota_reset = 86400 - int(now % 86400)
+        return {
+            "keys": [
+                f"{APIKEY_PREFIX}{apikey}",
+                f"{RATELIMIT_PREFIX}{apikey}:{window_index}",
+                f"{RATELIMIT_PREFIX}{apikey}:{window_index - 1}",
+                f"{QUOTA_PREFIX}{apikey}:{day}",
+            ],
+            "args": [window_ms, now_ms - window_index * window_ms, quota_reset],
+        }
+
+    def _decide(self, apikey: str, reply: list, now: float) -> RateLimitDecision:
+        status = int(reply[0])
+        if status == STATUS_INVALID:
+            if self.cache is not None:
+                self.cache.put(apikey, None)
+            return RateLimitDecision(STATUS_INVALID, window=self.window)
+
+        raw = reply[7:]
+        decision = RateLimitDecision(
+            status,
+            decode_apikey_hash(dict(zip(raw[::2], raw[1::2]))),
+            limit=int(reply[1]),
+            remaining=int(reply[2]),
+            reset=math.ceil(int(reply[3]) / 1000),
+            quota=int(reply[4]),
+            quota_remaining=int(reply[5]),
+            quota_reset=int(reply[6]),
+            window=self.window,
+        )
+        if self.local_precheck:
+            self._local_record(apikey, decision, now)
+        return decision
+
+    def _local_check(self, apikey: str, now: float) -> Optional[RateLimitDecision]:
+        with self._lock:
+            bucket = self._buckets.get(apikey)
+            if bucket is None:
+                return None
+
+            if bucket.blocked is not None:
+                blocked_until, previous = bucket.blocked
+                if blocked_until > now:
+                    retry = max(math.ceil(blocked_until - now), 1)
+                    return RateLimitDecision(
+                        previous.status,
+                        limit=previous.limit,
+                        remaining=0,
+                        reset=retry,
+                        quota=previous.quota,
+                        quota_remaining=0,
+                        quota_reset=retry,
+                        window=self.window,
+                        local=True,
+                    )
+                bucket.blocked = None
+
+            if bucket.capacity <= 0:
+                return None
+            bucket.refill(now)
+            if bucket.tokens >= 1:
+                return None
+            retry = max(math.ceil((1 - bucket.tokens) / bucket.rate), 1)
+            return RateLimitDecision(
+                STATUS_RATE_LIMITED,
+                limit=int(bucket.capacity),
+                remaining=0,
+                reset=retry,
+                window=self.window,
+                local=True,
+            )
+
+    def _local_record(self, apikey: str, decision: RateLimitDecision, now: float) -> None:
+        with self._lock:
+            bucket = self._buckets.get(apikey)
+            if decision.limit <= 0 and not decision.limited:
+                if bucket is not None:
+                    del self._buckets[apikey]
+                return
+
+            if bucket is None or bucket.capacity != max(decision.limit, 0):
+                bucket = _LocalBucket(max(decision.limit, 0), self.window, now)
+                self._buckets[apikey] = bucket
+                while len(self._buckets) > self.local_max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(apikey)
+                if bucket.capacity > 0:
+                    bucket.refill(now)
+
+            if decision.status == STATUS_RATE_LIMITED:
+                bucket.blocked = (now + decision.reset, decision)
+            elif decision.status == STATUS_QUOTA_EXCEEDED:
+                # Capped so a quota raised in Redis is picked up within one window
+                bucket.blocked = (now + min(decision.quota_reset, self.window), decision)
+            elif bucket.capacity > 0:
+                bucket.tokens = max(bucket.tokens - 1, 0.0)
+
+
+def create_rate_limiter(config: dict, redis_client: redis.Redis, cache: Any = None) -> RateLimiter:
+    """
+    Build the rate limiter from configuration.
+    """
+    return RateLimiter(
+        redis_client,
+        window=int(config.get("RATE_LIMIT_WINDOW", 60)),
+        local_precheck=bool(config.get("RATE_LIMIT_LOCAL_PRECHECK", True)),
+        local_max_keys=int(config.get("RATE_LIMIT_LOCAL_MAX_KEYS", 10000)),
+        cache=cache,
+    )
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Gunicorn configuration"""
+
+__updated__ = "2026-10-19 09:12:40"
+
+"""
+gunicorn -c python:gunicorn_conf wsgi:app    (with src/skel_v3 on PYTHONPATH)
+
+Every setting comes from `config.get_config()` (GUNICORN_* variables):
+
+- Worker class `gthread` by default; `sync`, `gevent` (the `gevent` extra)
+  or `uvicorn` (APP_TYPE=asgi, `asgi:app`).
+- Workers and threads sized from the CPUs the container may use (affinity
+  and cgroup quota) unless GUNICORN_WORKERS/GUNICORN_THREADS are set:
+  sync 2*CPU+1 workers; gthread CPU+1 workers x 4 threads; gevent and
+  uvicorn one worker per CPU (concurrency comes from the event loop).
+- Preload: the app is imported once in the master and forked, so modules and
+  the API key warm table are shared copy-on-write. Connection pools and
+  background threads must not cross a fork, so the app is built without
+  them and `post_fork` creates them in each worker.
+- gevent: the worker is monkey-patched in `post_fork`, before the app is
+  imported; the master is never patched. Preload is turned off, as a
+  preloaded app would be imported unpatched in the master.
+- Workers are recycled after GUNICORN_MAX_REQUESTS plus a random jitter, so
+  they do not all restart at once.
+- The metrics directory (METRICS_MULTIPROC_DIR) is emptied when the master
+  starts.
+"""
+
+import math
+import os
+
+from config import get_config
+
+CONFIG = get_config()
+
+# Read by wsgi.py / asgi.py (same name as app.DEFER_DATASTORES_ENV, not
+# imported: the app must not be imported before a gevent worker is patched)
+DEFER_DATASTORES_ENV = "APP_DEFER_DATASTORES"
+
+WORKER_CLASSES = {
+    "sync": "sync",
+    "gthread": "gthread",
+    "gevent": "gevent",
+    "uvicorn": "uvicorn.workers.UvicornWorker",
+}
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may run on, capped by a cgroup v2 CPU quota.
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max", encoding="utf-8") as fh:
+            quota, period = fh.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def size_workers(kind: str, cpus: int, workers: int = 0, threads: int = 0) -> tuple[int, int]:
+    """
+    (workers, threads) for a worker class; explicit non-zero values win.
+    """
+    if kind == "sync":
+        default_workers, default_threads = 2 * cpus + 1, 1
+    elif kind == "gthread":
+        default_workers, default_threads = cpus + 1, 4
+    else:
+        default_workers, default_threads = cpus, 1
+    if kind != "gthread":
+        threads = 1
+    return workers or default_workers, threads or default_threads
+
+
+_kind = "uvicorn" if CONFIG.get("APP_TYPE") == "asgi" else CONFIG["GUNICORN_WORKER_CLASS"]
+if _kind not in WORKER_CLASSES:
+    raise RuntimeError(f"Invalid GUNICORN_WORKER_CLASS {_kind!r}; use one of {', '.join(WORKER_CLASSES)}")
+
+bind = [CONFIG["GUNICORN_BIND"]]
+worker_class = WORKER_CLASSES[_kind]
+workers, threads = size_workers(_kind, available_cpus(), CONFIG["GUNICORN_WORKERS"], CONFIG["GUNICORN_THREADS"])
+worker_connections = CONFIG["GUNICORN_WORKER_CONNECTIONS"]
+preload_app = CONFIG["GUNICORN_PRELOAD"] and _kind != "gevent"
+keepalive = CONFIG["GUNICORN_KEEPALIVE"]
+timeout = CONFIG["GUNICORN_TIMEOUT"]
+graceful_timeout = CONFIG["GUNICORN_GRACEFUL_TIMEOUT"]
+max_requests = CONFIG["GUNICORN_MAX_REQUESTS"]
+max_requests_jitter = CONFIG["GUNICORN_MAX_REQUESTS_JITTER"] if max_requests else 0
+accesslog = "-" if CONFIG["GUNICORN_ACCESS_LOG"] else None
+# Worker heartbeat files on tmpfs: a slow container disk cannot stall them
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+if preload_app:
+    os.environ[DEFER_DATASTORES_ENV] = "1"
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    directory = CONFIG.get("METRICS_MULTIPROC_DIR")
+    if directory:
+        from util.metrics_store import clear_directory  # pylint: disable=import-outside-toplevel
+
+        clear_directory(directory)
+
+
+def post_fork(server, worker):
+    if _kind == "gevent":
+        # Before the worker imports the app (redis, threading users)
+        from gevent import monkey  # pylint: disable=import-outside-toplevel
+
+        monkey.patch_all()
+    if server.cfg.preload_app:
+        from app import start_datastores  # pylint: disable=import-outside-toplevel
+
+        start_datastores(worker.app.wsgi())
+
+
+def worker_exit(server, worker):  # pylint: disable=unused-argument
+    app = getattr(worker, "wsgi", None)
+    if app is not None:
+        from app import stop_datastores  # pylint: disable=import-outside-toplevel
+
+        stop_datastores(app)
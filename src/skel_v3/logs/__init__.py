@@ -5,10 +5,11 @@
 
 """LOGGING WITH FORMAT TO STDOUT"""
 
-__updated__ = "2026-02-07 07:22:46"
+__updated__ = "2026-10-18 12:43:01"
 
 
 # re-export to later import as `from module.log import init_logging`
 from .setup import init_logging
+from .encoder import register_context_fields
 
-__all__ = ["init_logging"]
+__all__ = ["init_logging", "register_context_fields"]
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""LOGGING WITH FORMAT TO STDOUT - queued, batched writer"""
+
+__updated__ = "2026-10-19 08:29:10"
+
+import copy
+import logging
+import os
+import queue
+import sys
+import threading
+import weakref
+from typing import IO, List, Optional
+
+from .encoder import JsonLogEncoder
+
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+
+_STOP = object()
+
+
+class AsyncJsonHandler(logging.Handler):
+    """
+    Handler that only enqueues records on the calling thread. A background
+    writer thread renders them to JSON and writes each batch to STDOUT with
+    a single write.
+
+    - Bounded queue; when full, `drop` discards the record (counted and
+      reported later) and `block` waits up to `block_timeout` seconds first.
+    - `close()` (called by `logging.shutdown` at exit) drains everything
+      queued before returning.
+    """
+
+    def __init__(
+        self,
+        service_name: Optional[str] = None,
+        environment: Optional[str] = None,
+        *,
+        stream: Optional[IO[str]] = None,
+        queue_size: int = 10000,
+        policy: str = POLICY_DROP,
+        batch_size: int = 256,
+        block_timeout: float = 1.0,
+        use_orjson: Optional[bool] = None,
+    ) -> None:
+        super().__init__()
+        self.service_name = service_name
+        self.environment = environment
+        self.encoder = JsonLogEncoder(service_name, environment, use_orjson=use_orjson)
+        self.stream = stream if stream is not None else sys.stdout
+        self.policy = policy if policy in (POLICY_DROP, POLICY_BLOCK) else POLICY_DROP
+        self.batch_size = max(1, int(batch_size))
+        self.block_timeout = float(block_timeout)
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._writer: Optional[threading.Thread] = None
+        self._start_writer()
+        if hasattr(os, "register_at_fork"):
+            # Threads do not survive fork (e.g. gunicorn --preload)
+            after_fork = weakref.WeakMethod(self._after_fork)
+            os.register_at_fork(after_in_child=lambda: (method := after_fork()) and method())
+
+    # ----------------------------------------------------------- producer side
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Freeze everything that must be evaluated on the calling thread:
+        merge message args and render the traceback. Works on a copy: other
+        handlers of the same record keep its template, args and exc_info.
+        """
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        message = record.getMessage()
+        record = copy.copy(record)
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = exc_text
+            # Keep the type for `exception_type`, drop frames/locals
+            record.exc_info = (record.exc_info[0], None, None)
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._put(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+    def _put(self, item) -> None:
+        try:
+            self.queue.put_nowait(item)
+            return
+        except queue.Full:
+            if self.policy == POLICY_DROP:
+                self.dropped += 1
+                return
+        try:
+            self.queue.put(item, timeout=self.block_timeout)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """
+        Wait (bounded) until everything enqueued so far has been written.
+        """
+        if self._writer is None or not self._writer.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=self.block_timeout)
+        except queue.Full:
+            return
+        done.wait(5.0)
+
+    def close(self) -> None:
+        """
+        Drain the queue and stop the writer thread.
+        """
+        writer = self._writer
+        if writer is not None and writer.is_alive():
+            self.queue.put(_STOP)
+            writer.join()
+        self._writer = None
+        super().close()
+
+    # ------------------------------------------------------------- writer side
+
+    def _start_writer(self) -> None:
+        self._writer = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._writer.start()
+
+    def _after_fork(self) -> None:
+        if self._writer is not None:
+            self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._start_writer()
+
+    def _run(self) -> None:
+        q = self.queue
+        while True:
+            item = q.get()
+            batch: List = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._write_batch(batch):
+                return
+
+    def _write_batch(self, batch: List) -> bool:
+        """
+        Write one batch. Return False when the stop marker was found.
+        """
+        lines: List[str] = []
+        waiters: List[threading.Event] = []
+        keep_running = True
+        for item in batch:
+            if item is _STOP:
+                keep_running = False
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            else:
+                try:
+                    lines.append(self.encoder.encode(item))
+                except Exception:
+                    self.handleError(item)
+
+        dropped = self.dropped
+        if dropped != self._reported_dropped:
+            lines.append(self._dropped_line(dropped - self._reported_dropped))
+            self._reported_dropped = dropped
+
+        if lines:
+            self._write("".join(lines))
+        for waiter in waiters:
+            waiter.set()
+        return keep_running
+
+    def _write(self, data: str) -> None:
+        try:
+            buffer = getattr(self.stream, "buffer", None)
+            if buffer is not None:
+                self.stream.flush()
+                buffer.write(data.encode("utf-8"))
+                buffer.flush()
+            else:
+                self.stream.write(data)
+                self.stream.flush()
+        except Exception:  # noqa: BLE001
+            # Never let the writer thread die on a broken stream
+            sys.stderr.write("--- Logging error in AsyncJsonHandler writer ---\n")
+
+    def _dropped_line(self, count: int) -> str:
+        record = logging.LogRecord(
+            name=__name__,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Dropped %d log records (logging queue full)",
+            args=(count,),
+            exc_info=None,
+            func="_write_batch",
+        )
+        return self.encoder.encode(record)
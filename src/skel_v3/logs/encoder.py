@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""LOGGING WITH FORMAT TO STDOUT - JSON line encoder"""
+
+__updated__ = "2026-10-19 09:02:40"
+
+"""
+Fast-path encoder shared by the sync and async JSON handlers.
+
+- service/env are serialized once per encoder, not once per record.
+- The "YYYY-mm-ddTHH:MM:SS" part of the timestamp is cached per second.
+- The ANSI-stripping regex only runs when the message contains ESC.
+- Context fields come from a registry (`register_context_fields`) instead of
+  a hardcoded tuple.
+- orjson is used when installed; output is byte-identical to the stdlib
+  encoder (compact separators, non-ASCII kept as UTF-8). Objects orjson
+  would write differently (floats in exponent form: `1e20` vs `1e+20`;
+  NaN/Infinity, which it turns into null; datetime, Enum, UUID or dataclass
+  values, which the stdlib renders with `str()`) or refuses (ints beyond 64
+  bits) go through the stdlib encoder.
+"""
+
+import json
+import logging
+import math
+import re
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+WERKZEUG_REQUEST_RE = re.compile(r"\"([A-Z]+ .+?)\"")
+
+# Record attributes copied to the JSON line when present (set via logger.extra)
+DEFAULT_CONTEXT_FIELDS: Tuple[str, ...] = (
+    # request_id (if provided via logger.extra)
+    "request_id",
+    # Additional HTTP / MQTT context when available
+    "http_method",
+    "http_path",
+    "remote_ip",
+    "client_id",
+    "auth_result",
+    "reason",
+    "callsign",
+    "canonical_cid",
+    "pg_status",
+    "redis_status",
+    "duration_ms",
+)
+
+_context_fields: Tuple[str, ...] = DEFAULT_CONTEXT_FIELDS
+
+
+def register_context_fields(*names: str) -> None:
+    """
+    Add record attributes to be carried into every JSON line when present.
+    """
+    global _context_fields  # pylint: disable=global-statement
+    _context_fields = _context_fields + tuple(n for n in names if n not in _context_fields)
+
+
+def context_fields() -> Tuple[str, ...]:
+    return _context_fields
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+_NATIVE = (str, int, bool, type(None))
+
+
+def _needs_stdlib(obj: Any) -> bool:
+    """
+    True if orjson could render `obj` differently from the stdlib: anything
+    but plain str/int/bool/None/dict/list/tuple (datetime, Enum, UUID,
+    dataclasses and subclasses are encoded natively by orjson but through
+    `str()` here), or a float that is non-finite or in exponent form (repr
+    switches at 1e16 and 1e-4).
+    """
+    kind = type(obj)
+    if kind in _NATIVE:
+        return False
+    if kind is float:
+        return not math.isfinite(obj) or (obj != 0.0 and not 1e-4 <= abs(obj) < 1e16)
+    if kind is dict:
+        return any(_needs_stdlib(v) for v in obj.values())
+    if kind is list or kind is tuple:
+        return any(_needs_stdlib(v) for v in obj)
+    return True
+
+
+if orjson is not None:
+
+    def _orjson_dumps(obj: Any) -> str:
+        if _needs_stdlib(obj):
+            return _stdlib_dumps(obj)
+        try:
+            return orjson.dumps(obj, default=str).decode("utf-8")
+        except (orjson.JSONEncodeError, TypeError):
+            return _stdlib_dumps(obj)
+
+else:  # pragma: no cover - optional dependency
+    _orjson_dumps = _stdlib_dumps
+
+
+class JsonLogEncoder:
+    """
+    Render log records as JSON lines (newline included).
+    """
+
+    def __init__(
+        self,
+        service_name: Optional[str] = None,
+        environment: Optional[str] = None,
+        *,
+        use_orjson: Optional[bool] = None,
+    ) -> None:
+        if use_orjson is None:
+            use_orjson = orjson is not None
+        self.dumps: Callable[[Any], str] = _orjson_dumps if use_orjson and orjson is not None else _stdlib_dumps
+        self.service_name = service_name
+        self.environment = environment
+
+        # Service context, pre-serialized: ',"service":"...","env":"..."'
+        static = self.dumps({"service": service_name, "env": environment})
+        self._static_fragment = "," + static[1:-1]
+        self._ts_cache: Tuple[float, str] = (-1.0, "")
+
+    def timestamp(self, created: float) -> str:
+        """
+        ISO8601 UTC timestamp, same output as
+        datetime.fromtimestamp(created, tz=utc).isoformat().replace("+00:00", "Z").
+        """
+        frac, seconds = math.modf(created)
+        micros = round(frac * 1e6)
+        if micros >= 1000000:
+            seconds += 1
+            micros -= 1000000
+        elif micros < 0:
+            seconds -= 1
+            micros += 1000000
+
+        cached_second, prefix = self._ts_cache
+        if cached_second != seconds:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds))
+            self._ts_cache = (seconds, prefix)
+
+        if micros:
+            return f"{prefix}.{micros:06d}Z"
+        return f"{prefix}Z"
+
+    def encode(self, record: logging.LogRecord) -> str:
+        raw_message = message = record.getMessage()
+        # Strip ANSI color codes if present
+        if "\x1b" in message:
+            message = ANSI_ESCAPE_RE.sub("", message)
+        # Adjust Werkzeug request line to look cleaner
+        if record.name == "werkzeug":
+            message = WERKZEUG_REQUEST_RE.sub(r"[\1] ", message)
+
+        head = {
+            "timestamp": self.timestamp(record.created),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": message,
+        }
+        # Code location (useful for debugging)
+        tail: Dict[str, Any] = {
+            "file": record.pathname,
+            "line": record.lineno,
+            "function": record.funcName,
+        }
+
+        attrs = record.__dict__
+        for field in _context_fields:
+            value = attrs.get(field)
+            if value is not None:
+                tail[field] = value
+
+        # Exception details when present (exc_text is pre-rendered by queued handlers)
+        if record.exc_info:
+            exc_type = record.exc_info[0].__name__ if record.exc_info[0] else None
+            tail["exception_type"] = exc_type
+            tail["exception_message"] = raw_message
+            tail["stacktrace"] = record.exc_text or logging.Formatter().formatException(record.exc_info)
+
+        dumps = self.dumps
+        return dumps(head)[:-1] + self._static_fragment + "," + dumps(tail)[1:] + "\n"
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""LOGGING WITH FORMAT TO STDOUT - sampling and rate caps"""
+
+__updated__ = "2026-10-18 13:20:55"
+
+"""
+Handler filter that thins out high-volume records.
+
+- Sampling ratios per logger (dotted prefixes apply to children, `root`
+  applies to everything else) and per message template (`record.msg`
+  before formatting), e.g.:
+
+  LOG_SAMPLE_RATES="util.decorators=0.1;util.decorators:Invalid or disabled API key=0.01"
+
+- A per-second cap per (logger, template). Records over the cap are
+  dropped and, when that key logs again in a later second, a single
+  "Suppressed N similar records" line is written first.
+- Records with `exc_info` or at/above `pass_level` (ERROR by default) are
+  never sampled nor capped.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+TemplateKey = Tuple[str, str]
+
+
+class _KeyState:
+    __slots__ = ("credit", "window", "count", "suppressed")
+
+    def __init__(self) -> None:
+        self.credit = 0.0
+        self.window = -1
+        self.count = 0
+        self.suppressed = 0
+
+
+def parse_sample_rates(spec: Optional[str]) -> Tuple[Dict[str, float], Dict[TemplateKey, float]]:
+    """
+    Parse "logger=ratio;logger:template=ratio;..." into per-logger and
+    per-template ratio maps. Invalid entries are ignored.
+    """
+    logger_rates: Dict[str, float] = {}
+    template_rates: Dict[TemplateKey, float] = {}
+    for entry in (spec or "").split(";"):
+        target, sep, ratio_text = entry.strip().rpartition("=")
+        if not sep or not target:
+            continue
+        try:
+            ratio = min(max(float(ratio_text), 0.0), 1.0)
+        except ValueError:
+            continue
+        name, sep, template = target.partition(":")
+        if sep:
+            template_rates[(name.strip(), template)] = ratio
+        else:
+            logger_rates[name.strip()] = ratio
+    return logger_rates, template_rates
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Deterministic sampling (a 0.1 ratio keeps exactly 1 record in 10 per
+    template) plus per-second caps with summaries of what was suppressed.
+    `sink` receives the summary records, normally the handler's `handle`.
+    """
+
+    def __init__(
+        self,
+        logger_rates: Optional[Dict[str, float]] = None,
+        template_rates: Optional[Dict[TemplateKey, float]] = None,
+        *,
+        cap_per_second: int = 0,
+        pass_level: int = logging.ERROR,
+        sink: Optional[Callable[[logging.LogRecord], object]] = None,
+        max_keys: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self.logger_rates = dict(logger_rates or {})
+        self.template_rates = dict(template_rates or {})
+        self.cap_per_second = max(0, int(cap_per_second))
+        self.pass_level = pass_level
+        self.sink = sink
+        self.max_keys = max(1, int(max_keys))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states: "OrderedDict[TemplateKey, _KeyState]" = OrderedDict()
+        self._resolved_rates: Dict[str, float] = {}
+        self.sampled_out = 0
+        self.suppressed = 0
+
+    def _logger_rate(self, name: str) -> float:
+        rate = self._resolved_rates.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.logger_rates:
+                    rate = self.logger_rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            else:
+                rate = self.logger_rates.get("root", 1.0)
+            self._resolved_rates[name] = rate
+        return rate
+
+    def _state(self, key: TemplateKey) -> _KeyState:
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState()
+            if len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+        return state
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.exc_info or record.levelno >= self.pass_level or getattr(record, "sampling_summary", False):
+            return True
+
+        template = record.msg if isinstance(record.msg, str) else str(record.msg)
+        key = (record.name, template)
+        summary = 0
+        with self._lock:
+            ratio = self.template_rates.get(key)
+            if ratio is None:
+                ratio = self._logger_rate(record.name)
+            if ratio < 1.0 or self.cap_per_second:
+                state = self._state(key)
+
+                if ratio < 1.0:
+                    state.credit += ratio
+                    if state.credit < 1.0:
+                        self.sampled_out += 1
+                        return False
+                    state.credit -= 1.0
+
+                if self.cap_per_second:
+                    window = int(self._clock())
+                    if window != state.window:
+                        summary = state.suppressed
+                        state.window = window
+                        state.count = 0
+                        state.suppressed = 0
+                    state.count += 1
+                    if state.count > self.cap_per_second:
+                        state.suppressed += 1
+                        self.suppressed += 1
+                        return False
+
+        if summary and self.sink is not None:
+            self.sink(self._summary_record(record, template, summary))
+        return True
+
+    def _summary_record(self, record: logging.LogRecord, template: str, count: int) -> logging.LogRecord:
+        summary = logging.LogRecord(
+            name=record.name,
+            level=record.levelno,
+            pathname=record.pathname,
+            lineno=record.lineno,
+            msg="Suppressed %d similar records: %s",
+            args=(count, template),
+            exc_info=None,
+            func=record.funcName,
+        )
+        summary.sampling_summary = True
+        summary.reason = "rate_capped"
+        return summary
+
+    @classmethod
+    def from_config(cls, config: dict, sink: Optional[Callable[[logging.LogRecord], object]] = None):
+        logger_rates, template_rates = parse_sample_rates(config.get("LOG_SAMPLE_RATES"))
+        pass_level = logging.getLevelName(str(config.get("LOG_SAMPLING_PASS_LEVEL", "ERROR")).upper())
+        return cls(
+            logger_rates,
+            template_rates,
+            cap_per_second=int(config.get("LOG_RATE_CAP_PER_SEC", 0)),
+            pass_level=pass_level if isinstance(pass_level, int) else logging.ERROR,
+            sink=sink,
+        )
@@ -5,22 +5,29 @@
 
 """LOGGING WITH FORMAT TO STDOUT"""
 
-__updated__ = "2026-02-07 07:16:21"
+__updated__ = "2026-10-18 13:27:40"
 
 import logging
 
+from .async_handler import AsyncJsonHandler
 from .formatter import JsonStdoutHandler
+from .sampling import SamplingFilter
 
 
 def init_logging(config: dict) -> None:
     """
     Configure global logging:
     - Log level taken from config["LOG_LEVEL"]
-    - Single JsonStdoutHandler writing to STDOUT
+    - Single JSON handler writing to STDOUT:
+      - LOG_MODE=sync: JsonStdoutHandler, written on the calling thread
+      - LOG_MODE=async: AsyncJsonHandler, queued and written in batches
+    - Optional sampling / per-second caps (LOG_SAMPLING_ENABLED)
     """
     level_name = config.get("LOG_LEVEL", "INFO").upper()
     service_name = config.get("SERVICE_NAME", "micro-service")
     environment = config.get("SERVICE_ENV", "local")
+    # auto: orjson when installed, json: always the stdlib encoder
+    use_orjson = None if config.get("LOG_ENCODER", "auto").lower() == "auto" else False
 
     root = logging.getLogger()
     root.setLevel(level_name)
@@ -28,6 +35,20 @@ def init_logging(config: dict) -> None:
     # Avoid duplicates if this function is called more than once
     for h in list(root.handlers):
         root.removeHandler(h)
-
-    handler = JsonStdoutHandler(service_name=service_name, environment=environment)
+        h.close()
+
+    if config.get("LOG_MODE", "sync").lower() == "async":
+        handler = AsyncJsonHandler(
+            service_name=service_name,
+            environment=environment,
+            queue_size=int(config.get("LOG_QUEUE_SIZE", 10000)),
+            policy=config.get("LOG_QUEUE_POLICY", "drop").lower(),
+            batch_size=int(config.get("LOG_BATCH_SIZE", 256)),
+            use_orjson=use_orjson,
+        )
+    else:
+        handler = JsonStdoutHandler(service_name=service_name, environment=environment, use_orjson=use_orjson)
+
+    if config.get("LOG_SAMPLING_ENABLED", False):
+        handler.addFilter(SamplingFilter.from_config(config, sink=handler.handle))
     root.addHandler(handler)
@@ -5,30 +5,39 @@
 
 """PACKAGE UTILS"""
 
-__updated__ = "2025-12-16 02:42:57"
+__updated__ = "2026-10-19 04:00:44"
 
 import time
 import logging
 import redis.exceptions
 from functools import wraps
 
-from flask import request, jsonify, g
+from flask import request, jsonify, g, make_response
 
 from db.redis_apikeys import get_apikey_metadata
+from util.metrics import REGISTRY
 from util.request_id import get_or_create_request_id
+from util.tracing import span
 
 logger = logging.getLogger(__name__)
 
+FUNCTION_SECONDS = REGISTRY.histogram(
+    "function_duration_seconds", "Run time of functions decorated with measure_time.", ("function",)
+)
+
 
 def measure_time(func):
+    histogram = FUNCTION_SECONDS.labels(func.__qualname__)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         start = time.perf_counter()
         try:
             return func(*args, **kwargs)
         finally:
-            elapsed_ms = (time.perf_counter() - start) * 1000.0
-            logger.info("%s took %.2f ms", func.__name__, elapsed_ms)
+            elapsed = time.perf_counter() - start
+            histogram.observe(elapsed)
+            logger.info("%s took %.2f ms", func.__name__, elapsed * 1000.0)
 
     return wrapper
 
@@ -46,11 +55,16 @@ def handle_errors(func):
 
 
 def require_apikey(stores: dict | None):
-    redis_client = stores.get("redis") if stores else None
+    # Clients are looked up per request: under gunicorn --preload the stores
+    # dict is filled after fork, once routes are already decorated.
+    stores = stores if stores is not None else {}
 
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
+            redis_client = stores.get("redis")
+            apikey_cache = stores.get("apikey_cache")
+            rate_limiter = stores.get("rate_limiter")
             base_extra = {
                 "request_id": get_or_create_request_id(),
                 "http_method": request.method,
@@ -75,8 +89,16 @@ def require_apikey(stores: dict | None):
             apikey = request.headers.get("X-API-Key")
             log(logging.DEBUG, "Validating API key via Redis", redis_status="query", has_apikey=bool(apikey))
 
+            decision = None
             try:
-                metadata = get_apikey_metadata(redis_client, apikey)
+                with span("auth"):
+                    if rate_limiter is not None:
+                        decision = rate_limiter.check(apikey)
+                        metadata = decision.metadata
+                    elif apikey_cache is not None:
+                        metadata = apikey_cache.get(apikey)
+                    else:
+                        metadata = get_apikey_metadata(redis_client, apikey)
             except redis.exceptions.AuthenticationError as exc:
                 log(
                     logging.ERROR,
@@ -98,6 +120,11 @@ def require_apikey(stores: dict | None):
                     500,
                 )
 
+            if decision is not None and decision.limited:
+                log(logging.INFO, "API key over its limit", redis_status="ok", reason=decision.reason)
+                error = "Daily quota exceeded" if decision.reason == "quota_exceeded" else "Rate limit exceeded"
+                return jsonify({"ok": False, "error": error}), 429, decision.headers()
+
             if metadata is None:
                 log(logging.INFO, "Invalid or disabled API key", redis_status="ok", reason="invalid_or_disabled")
                 return jsonify({"ok": False, "error": "Unauthorized"}), 401
@@ -105,7 +132,12 @@ def require_apikey(stores: dict | None):
             g.customer = metadata
             log(logging.DEBUG, "API key validated", redis_status="ok")
 
-            return func(*args, **kwargs)
+            if decision is None:
+                return func(*args, **kwargs)
+
+            response = make_response(func(*args, **kwargs))
+            response.headers.update(decision.headers())
+            return response
 
         return wrapper
 
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""PACKAGE UTILS - metric primitives and Prometheus registry"""
+
+__updated__ = "2026-10-18 23:06:52"
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .metrics_store import LocalStore, MmapStore, pid_alive, process_files, read_file
+
+LOGGER = logging.getLogger(__name__)
+
+# Seconds; suited to pool waits and datastore round trips
+DEFAULT_LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram (Prometheus semantics: cumulative
+    `le` buckets plus sum and count).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        {"buckets": {le: cumulative count, ..., "+Inf": n}, "sum": s, "count": n}
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, count in zip(self.buckets, counts):
+            running += count
+            cumulative[repr(bound)] = running
+        running += counts[-1]
+        cumulative["+Inf"] = running
+        return {"buckets": cumulative, "sum": total, "count": running}
+
+
+# ---------------------------------------------------------------------------
+# Registry with labelled counters, gauges and histograms, rendered in the
+# Prometheus text format. Values live in a store (util.metrics_store): a dict
+# in this process, or a per-process mmap file aggregated across gunicorn
+# workers when METRICS_MULTIPROC_DIR is set.
+# ---------------------------------------------------------------------------
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+# How the gauges of several processes are combined in multiprocess mode
+GAUGE_LIVESUM = "livesum"  # sum over live processes
+GAUGE_MAX = "max"
+GAUGE_MIN = "min"
+GAUGE_ALL = "all"  # one series per process, with a `pid` label
+
+
+def _sample_key(kind: str, family: str, sample: str, labels: Sequence[Tuple[str, str]]) -> str:
+    return json.dumps([kind, family, sample, [list(pair) for pair in labels]], separators=(",", ":"))
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class _Counter:
+    __slots__ = ("_registry", "_key")
+
+    def __init__(self, registry: "MetricsRegistry", family: "_Family", labels: Tuple[Tuple[str, str], ...]) -> None:
+        self._registry = registry
+        self._key = _sample_key(COUNTER, family.name, family.name, labels)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._registry.store.inc(self._key, amount)
+
+
+class _Gauge:
+    __slots__ = ("_registry", "_key")
+
+    def __init__(self, registry: "MetricsRegistry", family: "_Family", labels: Tuple[Tuple[str, str], ...]) -> None:
+        self._registry = registry
+        self._key = _sample_key(GAUGE, family.name, family.name, labels)
+
+    def set(self, value: float) -> None:
+        self._registry.store.set(self._key, value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._registry.store.inc(self._key, amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._registry.store.inc(self._key, -amount)
+
+
+class _Histogram:
+    __slots__ = ("_registry", "_bounds", "_bucket_keys", "_sum_key")
+
+    def __init__(self, registry: "MetricsRegistry", family: "_Family", labels: Tuple[Tuple[str, str], ...]) -> None:
+        self._registry = registry
+        self._bounds = family.buckets
+        # Stored per bucket (not cumulative); the last one is +Inf
+        self._bucket_keys = [
+            _sample_key(HISTOGRAM, family.name, f"{family.name}_bucket", labels + (("le", _format_value(bound)),))
+            for bound in (*family.buckets, math.inf)
+        ]
+        self._sum_key = _sample_key(HISTOGRAM, family.name, f"{family.name}_sum", labels)
+
+    def observe(self, value: float) -> None:
+        store = self._registry.store
+        store.inc(self._bucket_keys[bisect.bisect_left(self._bounds, value)], 1.0)
+        store.inc(self._sum_key, value)
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+_CHILD_TYPES = {COUNTER: _Counter, GAUGE: _Gauge, HISTOGRAM: _Histogram}
+
+
+class _Family:
+    """
+    A metric and its labelled children. Without label names the family
+    itself behaves like its only child (`inc`, `set`, `observe`, ...).
+    """
+
+    def __init__(
+        self,
+        registry: "MetricsRegistry",
+        kind: str,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        *,
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+        multiprocess_mode: str = GAUGE_LIVESUM,
+    ) -> None:
+        self.registry = registry
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        self.multiprocess_mode = multiprocess_mode
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any, **kwargs: Any) -> Any:
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = _CHILD_TYPES[self.kind](self.registry, self, tuple(zip(self.labelnames, key)))
+                    self._children[key] = child
+        return child
+
+    def __getattr__(self, name: str) -> Any:
+        # Unlabelled metrics: family.inc() == family.labels().inc()
+        if name in ("inc", "dec", "set", "observe", "time") and not self.__dict__.get("labelnames", True):
+            return getattr(self.labels(), name)
+        raise AttributeError(name)
+
+
+class MetricsRegistry:
+    """
+    Metric definitions plus the store holding their values. Definitions are
+    idempotent: asking again for a name returns the existing family.
+    """
+
+    def __init__(self) -> None:
+        self.store: Any = LocalStore()
+        self._families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()
+        self._callbacks: Dict[str, Callable[[], None]] = {}
+        self._callbacks_at = 0.0
+
+    def configure(self, multiproc_dir: Optional[str] = None) -> None:
+        """
+        Switch the value store: per-process mmap files in `multiproc_dir`,
+        or in-process values when empty. Values recorded so far are dropped.
+        """
+        if multiproc_dir:
+            os.makedirs(multiproc_dir, exist_ok=True)
+            self.store = MmapStore(multiproc_dir)
+        else:
+            self.store = LocalStore()
+
+    def _family(self, kind: str, name: str, documentation: str, labelnames: Sequence[str], **kwargs: Any) -> _Family:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = _Family(self, kind, name, documentation, labelnames, **kwargs)
+                self._families[name] = family
+            elif family.kind != kind:
+                raise ValueError(f"metric {name} already registered as a {family.kind}")
+            return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> _Family:
+        return self._family(COUNTER, name, documentation, labelnames)
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        multiprocess_mode: str = GAUGE_LIVESUM,
+    ) -> _Family:
+        return self._family(GAUGE, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> _Family:
+        return self._family(HISTOGRAM, name, documentation, labelnames, buckets=buckets)
+
+    # ---------------------------------------------------------- collection
+
+    def set_callback(self, name: str, callback: Callable[[], None]) -> None:
+        """
+        `callback` sets gauges from state sampled on demand (pool sizes, ...);
+        it replaces any callback previously set under `name`.
+        """
+        with self._lock:
+            self._callbacks[name] = callback
+
+    def run_callbacks(self, min_interval: float = 0.0) -> None:
+        """
+        Run the callbacks unless they ran less than `min_interval` seconds ago.
+        Each worker calls this on its own, so in multiprocess mode every
+        worker's sampled gauges stay fresh, not only the one scraped.
+        """
+        now = time.monotonic()
+        if min_interval and now - self._callbacks_at < min_interval:
+            return  # lock-free fast path for the per-request call
+        with self._lock:
+            if min_interval and now - self._callbacks_at < min_interval:
+                return
+            self._callbacks_at = now
+            callbacks = list(self._callbacks.values())
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:  # noqa: BLE001
+                LOGGER.warning("Metrics callback failed", exc_info=True)
+
+    def _values(self) -> List[Tuple[Optional[int], str, float]]:
+        """
+        (pid or None, sample key, value) for this process or every process file.
+        """
+        if not self.store.multiprocess:
+            return [(None, key, value) for key, value in self.store.items()]
+        values: List[Tuple[Optional[int], str, float]] = []
+        for pid, path in process_files(self.store.directory):
+            try:
+                values.extend((pid, key, value) for key, value in read_file(path))
+            except (OSError, ValueError):
+                LOGGER.warning("Unreadable metrics file %s", path)
+        return values
+
+    def collect(self) -> Dict[str, Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]]:
+        """
+        {family: {(sample name, labels): value}} merged across processes.
+        """
+        alive: Dict[int, bool] = {}
+        merged: Dict[str, Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float]] = {}
+        extremes: Dict[Tuple[str, str, Tuple[Tuple[str, str], ...]], float] = {}
+        for pid, key, value in self._values():
+            kind, family_name, sample, labels = json.loads(key)
+            family = self._families.get(family_name)
+            if family is None:
+                continue
+            labels = tuple((name, value_) for name, value_ in labels)
+            samples = merged.setdefault(family_name, {})
+            if kind != GAUGE or pid is None:
+                samples[(sample, labels)] = samples.get((sample, labels), 0.0) + value
+                continue
+
+            if pid not in alive:
+                alive[pid] = pid_alive(pid)
+            mode = family.multiprocess_mode
+            if mode == GAUGE_ALL:
+                samples[(sample, labels + (("pid", str(pid)),))] = value
+            elif not alive[pid]:
+                continue
+            elif mode == GAUGE_LIVESUM:
+                samples[(sample, labels)] = samples.get((sample, labels), 0.0) + value
+            else:
+                pick = max if mode == GAUGE_MAX else min
+                slot = (family_name, sample, labels)
+                extremes[slot] = pick(extremes[slot], value) if slot in extremes else value
+                samples[(sample, labels)] = extremes[slot]
+        return merged
+
+    def render(self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        merged = self.collect()
+        lines: List[str] = []
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda f: f.name)
+        for family in families:
+            samples = merged.get(family.name)
+            lines.append(f"# HELP {family.name} {_escape(family.documentation)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            if not samples:
+                continue
+            if family.kind == HISTOGRAM:
+                lines.extend(self._render_histogram(family, samples))
+                continue
+            for (sample, labels), value in sorted(samples.items()):
+                lines.append(f"{sample}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(family: _Family, samples: Dict) -> List[str]:
+        bounds = [_format_value(b) for b in (*family.buckets, math.inf)]
+        series: Dict[Tuple[Tuple[str, str], ...], Dict[str, float]] = {}
+        sums: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        for (sample, labels), value in samples.items():
+            if sample.endswith("_sum"):
+                sums[labels] = value
+                continue
+            base = tuple(pair for pair in labels if pair[0] != "le")
+            series.setdefault(base, {})[dict(labels)["le"]] = value
+
+        lines = []
+        for labels in sorted(series):
+            running = 0.0
+            for bound in bounds:
+                running += series[labels].get(bound, 0.0)
+                lines.append(f"{family.name}_bucket{_format_labels(labels + (('le', bound),))} {_format_value(running)}")
+            lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(sums.get(labels, 0.0))}")
+            lines.append(f"{family.name}_count{_format_labels(labels)} {_format_value(running)}")
+        return lines
+
+
+# Process-wide registry used by the instrumented modules
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""PACKAGE UTILS - metric value stores (in-process and mmap multiprocess)"""
+
+__updated__ = "2026-10-18 22:48:10"
+
+"""
+Metric values are floats addressed by a sample key (see util.metrics).
+
+- `LocalStore`: a dict in this process.
+- `MmapStore`: one memory-mapped file per process in a shared directory
+  (METRICS_MULTIPROC_DIR), so `/metrics` served by any gunicorn worker can
+  add up every worker's values. Each process only writes its own file; it
+  reopens a new one after fork.
+
+File layout (little-endian): u32 bytes used (padded to 8), then entries of
+u32 key length, key (UTF-8, padded to 8), f64 value. Entries are appended
+and the used counter is bumped last, so readers never see half an entry.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, Iterator, List, Tuple
+
+_USED = struct.Struct("<I")
+_KEY_LEN = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+_HEADER_SIZE = 8
+_INITIAL_SIZE = 1 << 16
+FILE_PREFIX = "metrics_"
+FILE_SUFFIX = ".db"
+# Sample keys of gauges start with this (see util.metrics)
+GAUGE_KEY_PREFIX = '["gauge",'
+
+
+def _padded(length: int) -> int:
+    return (length + 7) & ~7
+
+
+class LocalStore:
+    """
+    Values of this process only.
+    """
+
+    multiprocess = False
+
+    def __init__(self) -> None:
+        self._values: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key: str, amount: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            self._values[key] = value
+
+    def items(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class MmapStore:
+    """
+    Values of this process in `<directory>/metrics_<pid>.db`.
+    """
+
+    multiprocess = True
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._pid = -1
+        self._file = None
+        self._mmap: mmap.mmap | None = None
+        self._positions: Dict[str, int] = {}
+        self._used = _HEADER_SIZE
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{FILE_PREFIX}{os.getpid()}{FILE_SUFFIX}")
+
+    def _ensure_open(self) -> mmap.mmap:
+        """
+        Under the lock: (re)open this process's file, e.g. after fork.
+        """
+        pid = os.getpid()
+        if self._mmap is not None and self._pid == pid:
+            return self._mmap
+        self._pid = pid
+        self._file = open(self.path, "a+b")  # pylint: disable=consider-using-with
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._positions = {}
+        self._used = _USED.unpack_from(self._mmap, 0)[0] or _HEADER_SIZE
+        for key, position in _entries(self._mmap, self._used):
+            self._positions[key] = position
+            if key.startswith(GAUGE_KEY_PREFIX):
+                # File left by a dead process with the same pid: its gauges are stale
+                _VALUE.pack_into(self._mmap, position, 0.0)
+        return self._mmap
+
+    def _position(self, key: str) -> int:
+        position = self._positions.get(key)
+        if position is not None:
+            return position
+        data = key.encode()
+        needed = _KEY_LEN.size + _padded(len(data)) + _VALUE.size
+        mm = self._mmap
+        if self._used + needed > len(mm):
+            new_size = len(mm) * 2
+            while self._used + needed > new_size:
+                new_size *= 2
+            self._file.truncate(new_size)
+            mm.resize(new_size)
+        start = self._used
+        _KEY_LEN.pack_into(mm, start, len(data))
+        mm[start + _KEY_LEN.size : start + _KEY_LEN.size + len(data)] = data
+        position = start + _KEY_LEN.size + _padded(len(data))
+        _VALUE.pack_into(mm, position, 0.0)
+        self._used = start + needed
+        _USED.pack_into(mm, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def inc(self, key: str, amount: float) -> None:
+        with self._lock:
+            mm = self._ensure_open()
+            position = self._position(key)
+            _VALUE.pack_into(mm, position, _VALUE.unpack_from(mm, position)[0] + amount)
+
+    def set(self, key: str, value: float) -> None:
+        with self._lock:
+            mm = self._ensure_open()
+            _VALUE.pack_into(mm, self._position(key), value)
+
+    def items(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            mm = self._ensure_open()
+            return [(key, _VALUE.unpack_from(mm, pos)[0]) for key, pos in self._positions.items()]
+
+
+def _entries(buffer, used: int) -> Iterator[Tuple[str, int]]:
+    """
+    Yield (key, value position) for each complete entry.
+    """
+    position = _HEADER_SIZE
+    while position + _KEY_LEN.size <= used:
+        (length,) = _KEY_LEN.unpack_from(buffer, position)
+        key_start = position + _KEY_LEN.size
+        value_position = key_start + _padded(length)
+        if value_position + _VALUE.size > used:
+            return
+        yield bytes(buffer[key_start : key_start + length]).decode(), value_position
+        position = value_position + _VALUE.size
+
+
+def read_file(path: str) -> List[Tuple[str, float]]:
+    """
+    (key, value) pairs of one process file, read without mapping it.
+    """
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if len(data) < _HEADER_SIZE:
+        return []
+    used = min(_USED.unpack_from(data, 0)[0], len(data))
+    return [(key, _VALUE.unpack_from(data, pos)[0]) for key, pos in _entries(data, used)]
+
+
+def process_files(directory: str) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (pid, path) for every process file in `directory`.
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX):
+            pid = name[len(FILE_PREFIX) : -len(FILE_SUFFIX)]
+            if pid.isdigit():
+                yield int(pid), os.path.join(directory, name)
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def clear_directory(directory: str) -> None:
+    """
+    Remove every process file (call once in the master before forking).
+    """
+    os.makedirs(directory, exist_ok=True)
+    for _, path in process_files(directory):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
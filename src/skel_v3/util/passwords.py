@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""PACKAGE UTILS - bcrypt password verification off the request thread"""
+
+__updated__ = "2026-10-19 09:34:20"
+
+"""
+bcrypt is slow on purpose (tens to hundreds of ms per check). Run inline it
+would pin a sync worker, and hold the GIL of a threaded one, for the whole
+check. `PasswordVerifier` instead:
+
+- runs `bcrypt.checkpw` / `bcrypt.hashpw` in a process pool of
+  AUTH_VERIFY_WORKERS processes, started on first use in the process that
+  uses it (so after fork under gunicorn --preload). The request thread only
+  waits on a future;
+- admits at most AUTH_VERIFY_MAX_PENDING checks at once (running plus
+  queued); beyond that `verify()` raises `VerifierBusy` at once, which the
+  API answers with 429 and Retry-After (see api.auth) instead of queueing
+  logins until they time out. A check that takes longer than
+  AUTH_VERIFY_TIMEOUT raises `VerifierTimeout` (a `TimeoutError`), answered
+  with 503 and Retry-After;
+- keeps successful verifications for AUTH_CACHE_TTL seconds, keyed by an
+  HMAC (per-process random key) of username, password and stored hash, so
+  retried or repeated logins skip bcrypt and a password change misses.
+  Failures are never cached;
+- after a successful check of a hash with a lower cost than
+  AUTH_BCRYPT_ROUNDS, rehashes the password in the pool without delaying the
+  response and hands the new hash to `on_rehash(username, new_hash)` to be
+  stored. Rehashes only use spare pool capacity.
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Optional
+
+import bcrypt
+
+from util.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+AUTH_VERIFICATIONS = REGISTRY.counter(
+    "auth_verifications_total", "Password verifications by result.", ("result",)
+)
+
+RESULT_CACHE_HIT = "cache_hit"
+RESULT_OK = "ok"
+RESULT_INVALID = "invalid"
+RESULT_REJECTED = "rejected"
+RESULT_TIMEOUT = "timeout"
+
+RehashCallback = Callable[[str, str], None]
+
+
+class VerifierBusy(Exception):
+    """
+    Raised instead of queueing when AUTH_VERIFY_MAX_PENDING checks are
+    already pending; `retry_after` is a hint in seconds.
+    """
+
+    def __init__(self, retry_after: int = 1) -> None:
+        super().__init__("password verification pool is full")
+        self.retry_after = retry_after
+
+
+class VerifierTimeout(TimeoutError):
+    """
+    Raised when a check or hash takes longer than AUTH_VERIFY_TIMEOUT;
+    `retry_after` is a hint in seconds.
+    """
+
+    def __init__(self, retry_after: int = 1) -> None:
+        super().__init__("password verification timed out")
+        self.retry_after = retry_after
+
+
+# Run in the pool processes (module-level so they can be pickled)
+
+
+def _checkpw(password: bytes, stored_hash: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(password, stored_hash)
+    except ValueError:  # malformed stored hash
+        return False
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def hash_cost(stored_hash: bytes) -> int:
+    """
+    Cost factor of a `$2b$12$...` hash (0 if it cannot be read).
+    """
+    parts = stored_hash.split(b"$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else 0
+
+
+def _to_bytes(value: str | bytes) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+class PasswordVerifier:
+    """
+    Thread-safe; one per process.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 2,
+        max_pending: int = 0,
+        timeout: float = 5.0,
+        rounds: int = 12,
+        cache_ttl: float = 30.0,
+        cache_max_size: int = 10000,
+        on_rehash: Optional[RehashCallback] = None,
+        executor_factory: Optional[Callable[[int], Executor]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.max_pending = max_pending or 4 * self.workers
+        self.timeout = float(timeout)
+        self.rounds = int(rounds)
+        self.cache_ttl = float(cache_ttl)
+        self.cache_max_size = max(1, int(cache_max_size))
+        self.on_rehash = on_rehash
+        self._executor_factory = executor_factory or _process_pool
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor: Optional[Executor] = None
+        self._pid = -1
+        self._secret = os.urandom(32)
+        self._cache: "OrderedDict[bytes, float]" = OrderedDict()
+        self._counters: Dict[str, int] = {RESULT_CACHE_HIT: 0, RESULT_OK: 0, RESULT_INVALID: 0, RESULT_REJECTED: 0}
+        self._counters[RESULT_TIMEOUT] = 0
+        self._counters["rehashes"] = 0
+
+    # ------------------------------------------------------------------ pool
+
+    def _pool(self) -> Executor:
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # A pool inherited through fork belongs to the parent
+                self._executor = self._executor_factory(self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _submit(self, func: Callable, *args, blocking_error: bool = True) -> Optional[Future]:
+        """
+        Run `func` in the pool if a slot is free; otherwise raise
+        `VerifierBusy` (or return None with `blocking_error=False`).
+        """
+        if not self._slots.acquire(blocking=False):
+            if not blocking_error:
+                return None
+            self._count(RESULT_REJECTED)
+            raise VerifierBusy(retry_after=max(1, round(self.timeout)))
+        try:
+            future = self._pool().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def close(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ----------------------------------------------------------------- cache
+
+    def _cache_key(self, username: str, password: bytes, stored_hash: bytes) -> bytes:
+        message = b"\0".join((username.encode("utf-8"), password, stored_hash))
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def _cached(self, key: bytes) -> bool:
+        with self._lock:
+            expires_at = self._cache.get(key)
+            if expires_at is None:
+                return False
+            if expires_at <= self._clock():
+                del self._cache[key]
+                return False
+            self._cache.move_to_end(key)
+            return True
+
+    def _remember(self, key: bytes) -> None:
+        if self.cache_ttl <= 0:
+            return
+        with self._lock:
+            self._cache[key] = self._clock() + self.cache_ttl
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_max_size:
+                self._cache.popitem(last=False)
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            self._counters[result] += 1
+        AUTH_VERIFICATIONS.labels(result).inc()
+
+    # ---------------------------------------------------------------- verify
+
+    def verify(self, username: str, password: str | bytes, stored_hash: str | bytes) -> bool:
+        """
+        True if `password` matches `stored_hash`. Blocks the calling thread
+        (not the GIL) for at most `timeout` seconds; raises `VerifierBusy`
+        when the pool is saturated and `VerifierTimeout` on timeout.
+        """
+        password, stored_hash = _to_bytes(password), _to_bytes(stored_hash)
+        key = self._cache_key(username, password, stored_hash)
+        if self._cached(key):
+            self._count(RESULT_CACHE_HIT)
+            return True
+        future = self._submit(_checkpw, password, stored_hash)
+        return self._finish(self._result(future), key, username, password, stored_hash)
+
+    async def verify_async(self, username: str, password: str | bytes, stored_hash: str | bytes) -> bool:
+        """
+        `verify()` for asyncio callers: awaits the pool without blocking the
+        event loop.
+        """
+        password, stored_hash = _to_bytes(password), _to_bytes(stored_hash)
+        key = self._cache_key(username, password, stored_hash)
+        if self._cached(key):
+            self._count(RESULT_CACHE_HIT)
+            return True
+        import asyncio  # pylint: disable=import-outside-toplevel
+
+        future = self._submit(_checkpw, password, stored_hash)
+        try:
+            ok = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except TimeoutError:
+            raise self._timed_out() from None
+        return self._finish(ok, key, username, password, stored_hash)
+
+    def _result(self, future: Future):
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise self._timed_out() from None
+
+    def _timed_out(self) -> VerifierTimeout:
+        self._count(RESULT_TIMEOUT)
+        return VerifierTimeout(retry_after=max(1, round(self.timeout)))
+
+    def _finish(self, ok: bool, key: bytes, username: str, password: bytes, stored_hash: bytes) -> bool:
+        if not ok:
+            self._count(RESULT_INVALID)
+            return False
+        self._count(RESULT_OK)
+        self._remember(key)
+        if self.on_rehash is not None and hash_cost(stored_hash) < self.rounds:
+            self._rehash(username, password)
+        return True
+
+    def _rehash(self, username: str, password: bytes) -> None:
+        future = self._submit(_hashpw, password, self.rounds, blocking_error=False)
+        if future is None:
+            return  # pool busy: the next login will try again
+
+        def _done(done: Future) -> None:
+            try:
+                new_hash = done.result().decode("ascii")
+                self.on_rehash(username, new_hash)
+            except Exception:  # noqa: BLE001
+                logger.exception("Password rehash failed", extra={"username": username})
+                return
+            with self._lock:
+                self._counters["rehashes"] += 1
+
+        future.add_done_callback(_done)
+
+    def hash_password(self, password: str | bytes) -> str:
+        """
+        bcrypt hash (AUTH_BCRYPT_ROUNDS) computed in the pool, e.g. for sign-up.
+        """
+        future = self._submit(_hashpw, _to_bytes(password), self.rounds)
+        return self._result(future).decode("ascii")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["cache_size"] = len(self._cache)
+        stats["workers"] = self.workers
+        stats["max_pending"] = self.max_pending
+        return stats
+
+
+def _process_pool(workers: int) -> Executor:
+    # Imported here: multiprocessing is not needed until the first login.
+    # "spawn": forking a process with running threads (health checks, cache
+    # listener) can copy a held lock into the child.
+    import multiprocessing  # pylint: disable=import-outside-toplevel
+    from concurrent.futures import ProcessPoolExecutor  # pylint: disable=import-outside-toplevel
+
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def create_password_verifier(config: dict, on_rehash: Optional[RehashCallback] = None) -> PasswordVerifier:
+    return PasswordVerifier(
+        workers=int(config.get("AUTH_VERIFY_WORKERS", 2)),
+        max_pending=int(config.get("AUTH_VERIFY_MAX_PENDING", 0)),
+        timeout=float(config.get("AUTH_VERIFY_TIMEOUT", 5)),
+        rounds=int(config.get("AUTH_BCRYPT_ROUNDS", 12)),
+        cache_ttl=float(config.get("AUTH_CACHE_TTL", 30)),
+        cache_max_size=int(config.get("AUTH_CACHE_MAX_SIZE", 10000)),
+        on_rehash=on_rehash,
+    )
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""PACKAGE UTILS - startup gate and dependency checks for probes"""
+
+__updated__ = "2026-10-19 03:41:10"
+
+"""
+Startup tasks (cache warm-up, ...) register themselves on the gate and mark
+themselves done when finished; `/ready` answers 503 while any is pending.
+A task that fails is still marked done (with the error recorded) so the
+service starts degraded rather than never becoming ready.
+
+`DependencyMonitor` keeps cached results of datastore checks for `/ready`.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class ReadinessGate:
+    """
+    Thread-safe set of pending startup tasks.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._cond = threading.Condition(threading.Lock())
+        self._pending: Dict[str, float] = {}
+        self._finished: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str) -> None:
+        with self._cond:
+            self._finished.pop(name, None)
+            self._pending[name] = self._clock()
+
+    def done(self, name: str, **info: Any) -> None:
+        """
+        Mark `name` finished; `info` (keys loaded, error, ...) shows up in `status()`.
+        """
+        with self._cond:
+            started = self._pending.pop(name, None)
+            if started is not None:
+                info["duration_ms"] = round((self._clock() - started) * 1000.0, 1)
+            self._finished[name] = info
+            self._cond.notify_all()
+
+    @property
+    def ready(self) -> bool:
+        with self._cond:
+            return not self._pending
+
+    def pending(self) -> List[str]:
+        with self._cond:
+            return sorted(self._pending)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Block until nothing is pending; return False on timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "ready": not self._pending,
+                "pending": sorted(self._pending),
+                "startup": {name: dict(info) for name, info in self._finished.items()},
+            }
+
+
+CHECK_OK = "ok"
+CHECK_ERROR = "error"
+CHECK_TIMEOUT = "timeout"
+
+STARTUP_CHECKS = "dependency_checks"
+
+
+class DependencyMonitor:
+    """
+    Run named dependency checks (callables that raise on failure) in the
+    background, all at once, each bounded by `timeout` seconds, every
+    `interval` seconds. Probes read the cached results and never wait on a
+    dependency.
+
+    A check still running from a previous round is reported as a timeout
+    and not started again, so a hung dependency cannot pile up threads.
+    Results older than three intervals (refresher stuck or dead) count as
+    failing.
+    """
+
+    def __init__(
+        self,
+        checks: Dict[str, Callable[[], Any]],
+        *,
+        critical: Iterable[str] = (),
+        interval: float = 5.0,
+        timeout: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = max(0.1, float(interval))
+        self.timeout = max(0.001, float(timeout))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._wanted_critical = list(critical)
+        self.set_checks(checks)
+
+    def set_checks(self, checks: Dict[str, Callable[[], Any]]) -> None:
+        """
+        Replace the checks (e.g. once the datastores exist) and forget
+        previous results. Call before `start()`.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self.checks = dict(checks)
+        self.critical = {name for name in self._wanted_critical if name in self.checks}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.checks)), thread_name_prefix="health-check")
+        self._running: Dict[str, Future] = {}
+        with self._lock:
+            self._results: Dict[str, Dict[str, Any]] = {}
+            self._refreshed_at: Optional[float] = None
+
+    def _timed(self, check: Callable[[], Any]) -> float:
+        started = time.perf_counter()
+        check()
+        return time.perf_counter() - started
+
+    def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Run every check once (concurrently) and return the new results.
+        """
+        started = self._clock()
+        for name, check in self.checks.items():
+            future = self._running.get(name)
+            if future is None or future.done():
+                self._running[name] = self._executor.submit(self._timed, check)
+        wait(list(self._running.values()), timeout=self.timeout)
+
+        results: Dict[str, Dict[str, Any]] = {}
+        for name, future in self._running.items():
+            result: Dict[str, Any] = {"critical": name in self.critical}
+            if not future.done():
+                result.update(status=CHECK_TIMEOUT, latency_ms=round(self.timeout * 1000.0, 1))
+            elif future.exception() is not None:
+                result.update(status=CHECK_ERROR, error=str(future.exception()) or type(future.exception()).__name__)
+            else:
+                result.update(status=CHECK_OK, latency_ms=round(future.result() * 1000.0, 3))
+            results[name] = result
+
+        with self._lock:
+            self._results = results
+            self._refreshed_at = started
+        return results
+
+    @property
+    def healthy(self) -> bool:
+        """
+        True if every critical check passed in a recent round.
+        """
+        with self._lock:
+            if not self.checks:
+                return True
+            if self._refreshed_at is None or self._clock() - self._refreshed_at > 3 * self.interval + self.timeout:
+                return False
+            return all(self._results[name]["status"] == CHECK_OK for name in self.critical)
+
+    def results(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(result) for name, result in self._results.items()}
+
+    def start(self, gate: Optional[ReadinessGate] = None) -> None:
+        """
+        Start the refresher thread. With `gate`, startup stays pending until
+        the first round completes.
+        """
+        if not self.checks or (self._thread is not None and self._thread.is_alive()):
+            return
+        if gate is not None:
+            gate.add(STARTUP_CHECKS)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(gate,), name="health-refresher", daemon=True)
+        self._thread.start()
+
+    def _loop(self, gate: Optional[ReadinessGate]) -> None:
+        while not self._stop.is_set():
+            results = self.refresh()
+            if gate is not None:
+                gate.done(STARTUP_CHECKS, failing=sorted(n for n, r in results.items() if r["status"] != CHECK_OK))
+                gate = None
+            self._stop.wait(self.interval)
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def create_dependency_monitor(config: dict, checks: Dict[str, Callable[[], Any]]) -> DependencyMonitor:
+    critical = str(config.get("HEALTH_CHECK_CRITICAL", "postgres,redis"))
+    return DependencyMonitor(
+        checks,
+        critical=[name.strip() for name in critical.split(",") if name.strip()],
+        interval=float(config.get("HEALTH_CHECK_INTERVAL", 5)),
+        timeout=float(config.get("HEALTH_CHECK_TIMEOUT", 1)),
+    )
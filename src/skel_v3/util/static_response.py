@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""PACKAGE UTILS - precomputed responses with ETag / conditional GET"""
+
+__updated__ = "2026-10-19 05:02:37"
+
+"""
+For routes whose output does not change after startup (discovery document,
+liveness body): the body is serialized to bytes once, with a strong `ETag`
+(hash of the bytes) and a `Cache-Control` value. A request whose
+`If-None-Match` names that ETag gets a bodiless 304.
+
+- `StaticResponse`: the precomputed body and headers; `flask_response()`
+  builds the (200 or 304) Flask response, `not_modified()` does the header
+  check for other servers (api.asgi).
+- `cached_response`: decorator for Flask views; the view runs on the first
+  request (per cache key) and again only after `ttl` seconds.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from flask import current_app, request
+
+JSON_MIMETYPE = "application/json"
+# Revalidate every time (a 304 costs no body); probes see a live server
+NO_CACHE = "no-cache"
+
+
+class StaticResponse:
+    """
+    A 200 response computed once: body bytes, content type, ETag.
+    """
+
+    __slots__ = ("body", "content_type", "etag", "cache_control", "expires_at", "headers")
+
+    def __init__(
+        self,
+        body: bytes,
+        *,
+        content_type: str = JSON_MIMETYPE,
+        cache_control: str = NO_CACHE,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.body = body
+        self.content_type = content_type
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.cache_control = cache_control
+        self.expires_at = time.monotonic() + ttl if ttl is not None else None
+        # Sent with both the 200 and the 304
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control}
+
+    @classmethod
+    def json(cls, data: Any, **kwargs: Any) -> "StaticResponse":
+        return cls(json.dumps(data, separators=(",", ":")).encode(), **kwargs)
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires_at is None or time.monotonic() < self.expires_at
+
+    def not_modified(self, if_none_match: Optional[str]) -> bool:
+        """
+        True if an `If-None-Match` header value matches this ETag (weak
+        comparison, as RFC 9110 requires for this header).
+        """
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == self.etag:
+                return True
+        return False
+
+    def flask_response(self, if_none_match: Optional[str] = None):
+        if self.not_modified(if_none_match):
+            return current_app.response_class(status=304, headers=self.headers)
+        return current_app.response_class(self.body, headers=self.headers, content_type=self.content_type)
+
+
+def cached_response(
+    ttl: Optional[float] = None,
+    key: Optional[Callable[..., Hashable]] = None,
+    cache_control: str = NO_CACHE,
+    max_entries: int = 256,
+):
+    """
+    Serve a Flask view from a `StaticResponse` built from its first 200
+    response. `key` (called with the view arguments) selects one cached
+    response per value, e.g. per query parameter; `ttl` seconds bounds how
+    long one is reused (None: for the life of the process). Other statuses
+    and streamed responses are passed through uncached.
+    """
+
+    def decorator(func):
+        entries: Dict[Hashable, StaticResponse] = {}
+        lock = threading.Lock()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = key(*args, **kwargs) if key is not None else None
+            entry = entries.get(cache_key)
+            if entry is None or not entry.fresh:
+                response = current_app.make_response(func(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = StaticResponse(
+                    response.get_data(),
+                    content_type=response.content_type,
+                    cache_control=cache_control,
+                    ttl=ttl,
+                )
+                with lock:
+                    if cache_key not in entries and len(entries) >= max_entries:
+                        entries.pop(next(iter(entries)))
+                    entries[cache_key] = entry
+            return entry.flask_response(request.headers.get("If-None-Match"))
+
+        wrapper.cache_entries = entries
+        return wrapper
+
+    return decorator
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""PACKAGE UTILS - in-process request tracing"""
+
+__updated__ = "2026-10-18 23:58:20"
+
+"""
+Lightweight spans for breaking a request's latency down into phases
+(auth, Redis, Postgres acquire/query, handler).
+
+- A trace is started per request (see api.tracing) and kept in a context
+  variable; `span(name)` / `@traced(name)` record a phase of the current
+  trace. With no trace running (tracing disabled or request not sampled)
+  `span()` is one context variable read returning a shared no-op.
+- Per span name the trace keeps the total time and call count (used for the
+  `Server-Timing` header and the summary log line). Individual spans, for
+  export, are kept up to `max_spans` per trace.
+- `OtlpExporter` sends finished traces as OTLP/HTTP JSON to a collector
+  (`POST <endpoint>/v1/traces`) from a background thread; traces are
+  dropped when its queue is full so requests never wait on it.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+
+class Trace:
+    """
+    Spans of one request. Only used from the thread serving the request.
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "parent_span_id",
+        "request_id",
+        "attributes",
+        "wall_start_ns",
+        "start",
+        "end",
+        "spans",
+        "totals",
+        "max_spans",
+        "_stack",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        trace_id: Optional[str] = None,
+        parent_span_id: Optional[str] = None,
+        request_id: Optional[str] = None,
+        max_spans: int = 256,
+        start: Optional[float] = None,
+    ) -> None:
+        self.name = name
+        self.trace_id = trace_id or f"{random.getrandbits(128):032x}"
+        self.parent_span_id = parent_span_id
+        self.request_id = request_id
+        self.attributes: Dict[str, Any] = {}
+        now = time.perf_counter()
+        # `start` (a perf_counter value) backdates the trace, e.g. to the request start
+        self.start = now if start is None else start
+        self.wall_start_ns = time.time_ns() - int((now - self.start) * 1e9)
+        self.end: Optional[float] = None
+        # (name, start, end, parent index or -1, attributes)
+        self.spans: List[Tuple[str, float, float, int, Dict[str, Any]]] = []
+        self.totals: Dict[str, List[float]] = {}
+        self.max_spans = max_spans
+        self._stack: List[int] = []
+
+    def record(self, name: str, seconds: float) -> None:
+        total = self.totals.get(name)
+        if total is None:
+            self.totals[name] = [seconds, 1]
+        else:
+            total[0] += seconds
+            total[1] += 1
+
+    def finish(self) -> float:
+        """
+        Close the trace; return its duration in seconds.
+        """
+        if self.end is None:
+            self.end = time.perf_counter()
+        return self.end - self.start
+
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000.0
+
+    def phases_ms(self) -> Dict[str, float]:
+        """
+        {span name: total milliseconds}
+        """
+        return {name: round(total[0] * 1000.0, 3) for name, total in self.totals.items()}
+
+    def server_timing(self) -> str:
+        """
+        `Server-Timing` header value: one metric per span name plus `total`.
+        """
+        parts = []
+        for name, (seconds, count) in self.totals.items():
+            part = f"{name};dur={seconds * 1000.0:.3f}"
+            if count > 1:
+                part += f';desc="{int(count)} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={self.duration_ms():.3f}")
+        return ", ".join(parts)
+
+
+class Span:
+    """
+    One timed phase of a trace; use `span()` rather than building it.
+    """
+
+    __slots__ = ("trace", "name", "attributes", "start", "index", "parent")
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> "Span":
+        trace = self.trace
+        self.parent = trace._stack[-1] if trace._stack else -1  # pylint: disable=protected-access
+        self.index = -1
+        if len(trace.spans) < trace.max_spans:
+            self.index = len(trace.spans)
+            trace.spans.append((self.name, 0.0, 0.0, self.parent, self.attributes))
+        trace._stack.append(self.index)  # pylint: disable=protected-access
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = time.perf_counter()
+        trace = self.trace
+        trace._stack.pop()  # pylint: disable=protected-access
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        if self.index >= 0:
+            trace.spans[self.index] = (self.name, self.start, end, self.parent, self.attributes)
+        trace.record(self.name, end - self.start)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def span(name: str, **attributes: Any):
+    """
+    `with span("redis", command="GET"):` — a phase of the current trace, or
+    a no-op when no trace is running.
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return Span(trace, name, attributes)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator form of `span()`; the span is named after the function by default.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with Span(trace, span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def start_trace(name: str, **kwargs: Any) -> Tuple[Trace, Any]:
+    """
+    Start a trace and make it current; return (trace, token for `end_trace`).
+    """
+    trace = Trace(name, **kwargs)
+    return trace, _current.set(trace)
+
+
+def end_trace(token: Any) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def trace_block(name: str, **kwargs: Any) -> Iterator[Trace]:
+    """
+    Trace a block outside of a request (a worker task, a script).
+    """
+    trace, token = start_trace(name, **kwargs)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        end_trace(token)
+
+
+def parse_traceparent(value: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (trace id, parent span id) from a W3C `traceparent` header, or (None, None).
+    """
+    if not value:
+        return None, None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    trace_id, span_id = parts[1].lower(), parts[2].lower()
+    try:
+        int(trace_id, 16)
+        int(span_id, 16)
+    except ValueError:
+        return None, None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None, None
+    return trace_id, span_id
+
+
+# ---------------------------------------------------------------------------
+# OTLP/HTTP JSON export
+# ---------------------------------------------------------------------------
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        wrapped = {"boolValue": value}
+    elif isinstance(value, int):
+        wrapped = {"intValue": str(value)}
+    elif isinstance(value, float):
+        wrapped = {"doubleValue": value}
+    else:
+        wrapped = {"stringValue": str(value)}
+    return {"key": key, "value": wrapped}
+
+
+def trace_to_otlp_spans(trace: Trace) -> List[Dict[str, Any]]:
+    """
+    The trace as OTLP JSON spans: a SERVER root span plus one INTERNAL span
+    per recorded phase.
+    """
+    end = trace.end if trace.end is not None else time.perf_counter()
+
+    def unix_ns(perf: float) -> str:
+        return str(trace.wall_start_ns + int((perf - trace.start) * 1e9))
+
+    root_id = f"{random.getrandbits(64):016x}"
+    span_ids = [f"{random.getrandbits(64):016x}" for _ in trace.spans]
+    root_attributes = dict(trace.attributes)
+    if trace.request_id:
+        root_attributes["request_id"] = trace.request_id
+    root = {
+        "traceId": trace.trace_id,
+        "spanId": root_id,
+        "name": trace.name,
+        "kind": SPAN_KIND_SERVER,
+        "startTimeUnixNano": unix_ns(trace.start),
+        "endTimeUnixNano": unix_ns(end),
+        "attributes": [_attribute(k, v) for k, v in root_attributes.items()],
+    }
+    if trace.parent_span_id:
+        root["parentSpanId"] = trace.parent_span_id
+    spans = [root]
+    for index, (name, start, stop, parent, attributes) in enumerate(trace.spans):
+        if stop == 0.0:
+            continue  # still open when the trace was exported
+        spans.append(
+            {
+                "traceId": trace.trace_id,
+                "spanId": span_ids[index],
+                "parentSpanId": span_ids[parent] if parent >= 0 else root_id,
+                "name": name,
+                "kind": SPAN_KIND_INTERNAL,
+                "startTimeUnixNano": unix_ns(start),
+                "endTimeUnixNano": unix_ns(stop),
+                "attributes": [_attribute(k, v) for k, v in attributes.items()],
+            }
+        )
+    return spans
+
+
+class OtlpExporter:
+    """
+    Batch finished traces and POST them to `endpoint` (OTLP/HTTP JSON) from a
+    background thread.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        *,
+        service_name: str = "micro-service",
+        queue_size: int = 2048,
+        batch_size: int = 256,
+        interval: float = 1.0,
+        timeout: float = 2.0,
+    ) -> None:
+        self.endpoint = endpoint.rstrip("/")
+        if not self.endpoint.endswith("/v1/traces"):
+            self.endpoint += "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = max(1, int(batch_size))
+        self.interval = float(interval)
+        self.timeout = float(timeout)
+        self._queue: "queue.Queue[Trace]" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = -1
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def export(self, trace: Trace) -> None:
+        """
+        Queue a finished trace; never blocks.
+        """
+        if self._pid != os.getpid():
+            # First use, or first use after a fork: threads do not survive fork
+            self._start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._drain(self.interval)
+            if batch:
+                self._send(batch)
+        batch = self._drain(0)
+        if batch:
+            self._send(batch)
+
+    def _drain(self, wait: float) -> List[Trace]:
+        batch: List[Trace] = []
+        try:
+            batch.append(self._queue.get(timeout=wait) if wait > 0 else self._queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def payload(self, traces: List[Trace]) -> Dict[str, Any]:
+        spans: List[Dict[str, Any]] = []
+        for trace in traces:
+            spans.extend(trace_to_otlp_spans(trace))
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+                    "scopeSpans": [{"scope": {"name": "skel_v3.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def _send(self, traces: List[Trace]) -> None:
+        body = json.dumps(self.payload(traces), separators=(",", ":")).encode()
+        req = urllib.request.Request(
+            self.endpoint, data=body, method="POST", headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+            self.exported += len(traces)
+        except OSError as exc:
+            self.failed += len(traces)
+            LOGGER.debug("OTLP export to %s failed: %s", self.endpoint, exc)
+
+    def shutdown(self, timeout: float = 2.0) -> None:
+        """
+        Flush what is queued and stop the thread.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._pid = -1
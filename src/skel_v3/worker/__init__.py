@@ -5,8 +5,9 @@
 
 """WORKER package"""
 
-__updated__ = "2026-02-07 08:03:39"
+__updated__ = "2026-10-18 17:01:02"
 
+from .async_runtime import run_async_worker_app
 from .runtime import run_worker_app
 
-__all__ = ["run_worker_app"]
+__all__ = ["run_worker_app", "run_async_worker_app"]
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Asyncio worker runtime (WORKER_ENGINE=asyncio)."""
+
+from __future__ import annotations
+
+__updated__ = "2026-10-19 08:06:40"
+
+"""
+For I/O-bound jobs: units of work are coroutines that share one event loop,
+so their Redis/Postgres waits overlap.
+
+- Datastores come from `db.init_async_datastores` (redis.asyncio, asyncpg).
+- At most WORKER_ASYNC_CONCURRENCY units run at once (semaphore); the loop
+  waits for a free slot before polling again.
+- WORKER_TASK_TIMEOUT cancels units running longer than that.
+- SIGTERM/SIGINT are handled by the event loop; in-flight units get up to
+  WORKER_DRAIN_TIMEOUT seconds, then are cancelled.
+- Polling uses the same adaptive scheduler as the sync runtime.
+"""
+
+import asyncio
+import logging
+import signal
+import time
+from typing import Any, Awaitable, Callable, Optional, Set
+
+from db import close_async_datastores, init_async_datastores
+from logs import init_logging
+
+from .scheduler import AdaptivePoller
+
+logger = logging.getLogger(__name__)
+
+ENGINE_ASYNCIO = "asyncio"
+
+# Async task signature: await task(config, stores) -> result
+AsyncTask = Callable[[dict, dict], Awaitable[Any]]
+
+
+async def _perform_work_async(config: dict, stores: dict[str, Any]) -> int:
+    """
+    Placeholder unit of work to be replaced with domain-specific logic.
+    Return the number of items processed (see worker.runtime._perform_work).
+    """
+    ############################################################################
+    #
+    # CODE SHOULD COME HERE AND/OR IN ADDITIONAL MODULES IN THIS PACKAGE FOLDER
+    #
+    ############################################################################
+    logger.info("Worker heartbeat", extra={"service": config.get("SERVICE_NAME")})
+    return 0
+
+
+async def _cleanup_async(config: dict, stores: dict[str, Any]) -> None:
+    logger.info("Worker cleanup complete", extra={"service": config.get("SERVICE_NAME")})
+
+
+class AsyncEngine:
+    """
+    Run coroutine tasks on the current event loop with at most `concurrency`
+    in flight. `submit` waits while every slot is busy (backpressure).
+    """
+
+    kind = ENGINE_ASYNCIO
+
+    def __init__(
+        self,
+        config: dict,
+        stores: dict[str, Any],
+        *,
+        concurrency: int = 100,
+        task_timeout: float = 0.0,
+    ) -> None:
+        self.config = config
+        self.stores = stores
+        self.concurrency = max(1, int(concurrency))
+        self.task_timeout = float(task_timeout)
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.on_result: Optional[Callable[[Any], None]] = None
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def submit(self, task: AsyncTask, slot_timeout: Optional[float] = None) -> bool:
+        """
+        Start `task` once a slot is free. Return False if no slot became free
+        within `slot_timeout` seconds (None waits forever).
+        """
+        try:
+            await asyncio.wait_for(self._slots.acquire(), slot_timeout)
+        except asyncio.TimeoutError:
+            return False
+        running = asyncio.create_task(self._run(task))
+        self._tasks.add(running)
+        running.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, task: AsyncTask) -> None:
+        deadline = asyncio.timeout(self.task_timeout if self.task_timeout > 0 else None)
+        result = None
+        try:
+            async with deadline:
+                result = await task(self.config, self.stores)
+            self.completed += 1
+        except TimeoutError:
+            if not deadline.expired():
+                self.failed += 1
+                logger.exception("Worker task failed")
+            else:
+                self.timed_out += 1
+                logger.warning(
+                    "Worker task exceeded timeout of %.1fs",
+                    self.task_timeout,
+                    extra={"reason": "task_timeout"},
+                )
+        except Exception:  # noqa: BLE001
+            self.failed += 1
+            logger.exception("Worker task failed")
+        finally:
+            self._slots.release()
+        # A failed or timed-out task counts as no work (the poller backs off)
+        if self.on_result is not None:
+            self.on_result(result)
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait up to `timeout` seconds for in-flight tasks, then cancel the
+        rest. Return True if everything finished.
+        """
+        if not self._tasks:
+            return True
+        _, not_done = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if not_done:
+            logger.warning(
+                "Worker drain timed out with %d task(s) still running",
+                len(not_done),
+                extra={"reason": "drain_timeout"},
+            )
+            for task in not_done:
+                task.cancel()
+            await asyncio.gather(*not_done, return_exceptions=True)
+        return not not_done
+
+
+def create_async_engine(config: dict, stores: dict[str, Any]) -> AsyncEngine:
+    return AsyncEngine(
+        config,
+        stores,
+        concurrency=int(config.get("WORKER_ASYNC_CONCURRENCY", 100)),
+        task_timeout=float(config.get("WORKER_TASK_TIMEOUT", 0)),
+    )
+
+
+async def _run(config: dict) -> None:
+    stores = await init_async_datastores(config)
+    engine = create_async_engine(config, stores)
+    drain_timeout = float(config.get("WORKER_DRAIN_TIMEOUT", 30))
+    stats_interval = float(config.get("WORKER_STATS_INTERVAL", 60))
+    poller = AdaptivePoller.from_config(config)
+    engine.on_result = poller.record
+
+    loop = asyncio.get_running_loop()
+
+    def _handle_stop(signum: int) -> None:
+        logger.info("Received signal %s, preparing to stop", signum)
+        poller.stop()
+
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, _handle_stop, signum)
+
+    logger.info(
+        "Worker starting",
+        extra={
+            "service": config.get("SERVICE_NAME"),
+            "env": config.get("SERVICE_ENV"),
+            "poll_interval": poller.max_interval,
+            "engine": engine.kind,
+            "source": "poll",
+        },
+    )
+    next_stats = time.monotonic() + stats_interval
+    try:
+        while not poller.stopping:
+            if stats_interval > 0 and time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + stats_interval
+                logger.info("Worker loop stats", extra=poller.stats())
+            # Waits while every slot is busy; re-check `stopping` every second
+            if await engine.submit(_perform_work_async, slot_timeout=1.0):
+                await poller.sleep_async(poller.next_delay())
+    finally:
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.remove_signal_handler(signum)
+        logger.info("Draining in-flight work", extra={"service": config.get("SERVICE_NAME")})
+        await engine.drain(drain_timeout)
+        logger.info("Worker loop stats", extra=poller.stats())
+        poller.close()
+        await _cleanup_async(config, stores)
+        await close_async_datastores(stores)
+
+
+def run_async_worker_app(config: dict) -> None:
+    """
+    Initialize logging and run the asyncio worker loop until SIGTERM/SIGINT.
+    Only WORKER_SOURCE=poll is supported here; the stream source uses the
+    synchronous Redis client.
+    """
+    init_logging(config)
+    if str(config.get("WORKER_SOURCE", "poll")).lower() != "poll":
+        raise RuntimeError("WORKER_ENGINE=asyncio only supports WORKER_SOURCE=poll")
+    asyncio.run(_run(config))
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Worker execution engines (inline, thread pool, process pool)."""
+
+from __future__ import annotations
+
+__updated__ = "2026-10-19 09:24:37"
+
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Optional
+
+from db import init_datastores
+from logs import init_logging
+
+logger = logging.getLogger(__name__)
+
+ENGINE_INLINE = "inline"
+ENGINE_THREAD = "thread"
+ENGINE_PROCESS = "process"
+
+# Task signature shared by every engine: task(config, stores) -> result
+Task = Callable[[dict, dict], Any]
+# Called with the result of every task, None when it failed (e.g.
+# AdaptivePoller.record: a failed poll counts as no work, so it backs off)
+ResultCallback = Callable[[Any], None]
+
+# Datastores of a process-pool child, created once by its initializer
+_process_stores: Optional[dict] = None
+
+
+def _init_process(config: dict) -> None:
+    """
+    Process-pool initializer: one logging setup and one set of datastores per
+    child process. Pools inherited through fork must not be reused.
+    """
+    global _process_stores  # pylint: disable=global-statement
+    # The parent coordinates shutdown; Ctrl+C must not kill tasks mid-flight
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    init_logging(config)
+    _process_stores = init_datastores(config)
+
+
+def _run_in_process(task: Task, config: dict) -> Any:
+    return task(config, _process_stores or {})
+
+
+class InlineEngine:
+    """
+    Run each task on the calling thread (historical behaviour).
+    """
+
+    kind = ENGINE_INLINE
+
+    def __init__(self, config: dict, stores: dict[str, Any]) -> None:
+        self.config = config
+        self.stores = stores
+        self.completed = 0
+        self.failed = 0
+        self.on_result: Optional[ResultCallback] = None
+
+    @property
+    def in_flight(self) -> int:
+        return 0
+
+    def wait_for_slot(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+    def submit(self, task: Task, slot_timeout: Optional[float] = None) -> bool:
+        try:
+            result = task(self.config, self.stores)
+            self.completed += 1
+        except Exception:  # noqa: BLE001
+            self.failed += 1
+            logger.exception("Worker task failed")
+            result = None
+        if self.on_result is not None:
+            self.on_result(result)
+        return True
+
+    def check_timeouts(self) -> None:
+        return None
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        return True
+
+
+class PoolEngine:
+    """
+    Run tasks on a thread or process pool with at most `concurrency` tasks
+    in flight. `submit` blocks while every slot is busy (backpressure).
+
+    Tasks running longer than `task_timeout` are abandoned: counted as timed
+    out, reported as failed to `on_result` and their slot is released.
+    Python cannot stop a thread, so a thread pool is replaced and the stuck
+    thread left to finish on its own (its result is ignored). A process pool
+    is replaced and its children killed; other tasks in flight on it fail.
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        stores: dict[str, Any],
+        *,
+        kind: str = ENGINE_THREAD,
+        concurrency: int = 1,
+        task_timeout: float = 0.0,
+    ) -> None:
+        self.config = config
+        self.stores = stores
+        self.kind = kind
+        self.concurrency = max(1, int(concurrency))
+        self.task_timeout = float(task_timeout)
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.on_result: Optional[ResultCallback] = None
+
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._lock = threading.Lock()
+        self._pending: dict[Future, float] = {}
+        self._executor: Any = self._new_executor()
+
+    def _new_executor(self) -> Any:
+        if self.kind == ENGINE_PROCESS:
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency,
+                initializer=_init_process,
+                initargs=(self.config,),
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="worker-task")
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def wait_for_slot(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until at least one slot is free, without taking it. Used to avoid
+        pulling jobs from a source while they could not run.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            return False
+        self._slots.release()
+        return True
+
+    def submit(self, task: Task, slot_timeout: Optional[float] = None) -> bool:
+        """
+        Submit `task` once a slot is free. Return False if no slot became
+        free within `slot_timeout` seconds (None waits forever).
+        """
+        if not self._slots.acquire(timeout=slot_timeout):
+            return False
+        try:
+            if self.kind == ENGINE_PROCESS:
+                future = self._executor.submit(_run_in_process, task, self.config)
+            else:
+                future = self._executor.submit(task, self.config, self.stores)
+        except Exception:
+            self._slots.release()
+            raise
+
+        deadline = time.monotonic() + self.task_timeout if self.task_timeout > 0 else 0.0
+        with self._lock:
+            self._pending[future] = deadline
+        future.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, future: Future) -> None:
+        with self._lock:
+            if self._pending.pop(future, None) is None:
+                return  # abandoned by check_timeouts: slot and result handled
+        self._slots.release()
+        if future.cancelled():
+            return
+        exc = future.exception()
+        with self._lock:
+            if exc is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if exc is not None:
+            logger.error("Worker task failed: %s", exc, exc_info=(type(exc), exc, exc.__traceback__))
+        if self.on_result is not None:
+            self.on_result(None if exc is not None else future.result())
+
+    def check_timeouts(self) -> None:
+        """
+        Abandon tasks running past their deadline and free their slots.
+        """
+        if self.task_timeout <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            overdue = [f for f, deadline in self._pending.items() if deadline and deadline < now]
+            for future in overdue:
+                del self._pending[future]
+            self.timed_out += len(overdue)
+        if not overdue:
+            return
+        logger.warning(
+            "Abandoned %d worker task(s) past the timeout of %.1fs",
+            len(overdue),
+            self.task_timeout,
+            extra={"reason": "task_timeout"},
+        )
+        # The stuck workers keep their executor: new tasks get a fresh one
+        stale, self._executor = self._executor, self._new_executor()
+        if self.kind == ENGINE_PROCESS:
+            for process in list((getattr(stale, "_processes", None) or {}).values()):
+                process.kill()
+        stale.shutdown(wait=False, cancel_futures=self.kind == ENGINE_PROCESS)
+        for _ in overdue:
+            self._slots.release()
+            if self.on_result is not None:
+                self.on_result(None)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting work and wait up to `timeout` seconds for in-flight
+        tasks. Return True if everything finished.
+        """
+        with self._lock:
+            pending = list(self._pending)
+        _, not_done = wait(pending, timeout=timeout)
+        if not_done:
+            logger.warning(
+                "Worker drain timed out with %d task(s) still running",
+                len(not_done),
+                extra={"reason": "drain_timeout"},
+            )
+        self._executor.shutdown(wait=not not_done, cancel_futures=True)
+        return not not_done
+
+
+def create_engine(config: dict, stores: dict[str, Any]) -> InlineEngine | PoolEngine:
+    """
+    Build the execution engine selected by WORKER_ENGINE.
+    """
+    kind = str(config.get("WORKER_ENGINE", ENGINE_INLINE)).lower()
+    if kind not in (ENGINE_THREAD, ENGINE_PROCESS):
+        return InlineEngine(config, stores)
+
+    concurrency = int(config.get("WORKER_CONCURRENCY", 0)) or (os.cpu_count() or 1)
+    return PoolEngine(
+        config,
+        stores,
+        kind=kind,
+        concurrency=concurrency,
+        task_timeout=float(config.get("WORKER_TASK_TIMEOUT", 0)),
+    )
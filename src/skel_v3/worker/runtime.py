@@ -7,22 +7,46 @@
 
 from __future__ import annotations
 
-__updated__ = "2026-02-07 08:02:35"
+__updated__ = "2026-10-19 09:53:14"
 
 import logging
 import signal
 import time
+from functools import partial
 from typing import Any
 
+import redis
+
 from db import init_datastores
-from logs import init_logging
+from logs import init_logging, register_context_fields
+
+from .async_runtime import ENGINE_ASYNCIO, run_async_worker_app
+from .engine import create_engine
+from .scheduler import AdaptivePoller
+from .streams import StreamConsumer
 
 logger = logging.getLogger(__name__)
 
+# Key of the process's StreamConsumer in its stores dict
+STREAM_CONSUMER = "stream_consumer"
+
+register_context_fields(
+    "engine",
+    "source",
+    "busy_ratio",
+    "polls",
+    "productive_polls",
+    "loop_lag_ms",
+    "loop_lag_max_ms",
+    "loop_lag_avg_ms",
+)
+
 
-def _perform_work(config: dict, stores: dict[str, Any]) -> None:
+def _perform_work(config: dict, stores: dict[str, Any]) -> int:
     """
     Placeholder unit of work to be replaced with domain-specific logic.
+    Return the number of items processed: the loop polls again at once
+    while work is found and backs off while idle (see worker.scheduler).
     """
     ############################################################################
     #
@@ -30,6 +54,40 @@ def _perform_work(config: dict, stores: dict[str, Any]) -> None:
     #
     ############################################################################
     logger.info("Worker heartbeat", extra={"service": config.get("SERVICE_NAME")})
+    return 0
+
+
+def _handle_message(config: dict, stores: dict[str, Any], message_id: bytes, fields: dict[bytes, bytes]) -> None:
+    """
+    Placeholder handler for one Redis Streams job (WORKER_SOURCE=stream).
+    Raising leaves the message pending so it is retried, and eventually
+    dead-lettered after WORKER_STREAM_MAX_DELIVERIES attempts.
+    """
+    ############################################################################
+    #
+    # CODE SHOULD COME HERE AND/OR IN ADDITIONAL MODULES IN THIS PACKAGE FOLDER
+    #
+    ############################################################################
+    logger.debug("Stream message %s received", message_id.decode(), extra={"service": config.get("SERVICE_NAME")})
+
+
+def _stream_consumer(config: dict, stores: dict[str, Any]) -> StreamConsumer:
+    """
+    The StreamConsumer of this process, created once next to its stores (the
+    worker's own, or a process-pool child's) and reused for every batch.
+    """
+    consumer = stores.get(STREAM_CONSUMER)
+    if consumer is None:
+        consumer = stores.setdefault(STREAM_CONSUMER, StreamConsumer.from_config(config, stores["redis"]))
+    return consumer
+
+
+def _process_stream_batch(messages: list, config: dict, stores: dict[str, Any]) -> int:
+    """
+    Engine task: handle a batch of stream messages and acknowledge them.
+    """
+    consumer = _stream_consumer(config, stores)
+    return consumer.process(messages, lambda mid, fields: _handle_message(config, stores, mid, fields))
 
 
 def _cleanup(config: dict, stores: dict[str, Any]) -> None:
@@ -39,16 +97,39 @@ def _cleanup(config: dict, stores: dict[str, Any]) -> None:
 def run_worker_app(config: dict) -> None:
     """
     Initialize logging/datastores and run the worker loop.
+    Units of work run on the engine selected by WORKER_ENGINE
+    (inline, thread or process pool, see worker.engine).
+
+    WORKER_SOURCE selects where work comes from:
+    - poll: call `_perform_work`, immediately again while it finds work,
+      backing off up to WORKER_POLL_INTERVAL seconds while idle
+    - stream: consume Redis Streams jobs with `_handle_message` (see worker.streams)
+
+    WORKER_ENGINE=asyncio runs coroutine units instead (see worker.async_runtime).
     """
+    if str(config.get("WORKER_ENGINE", "")).lower() == ENGINE_ASYNCIO:
+        run_async_worker_app(config)
+        return
+
     init_logging(config)
     stores = init_datastores(config)
-    poll_interval = int(config.get("WORKER_POLL_INTERVAL", 5))
-    stopping = False
+    engine = create_engine(config, stores)
+
+    consumer = None
+    if str(config.get("WORKER_SOURCE", "poll")).lower() == "stream":
+        if stores.get("redis") is None:
+            raise RuntimeError("WORKER_SOURCE=stream requires REDIS_ENABLED=true")
+        consumer = _stream_consumer(config, stores)
+        consumer.ensure_group()
+
+    drain_timeout = float(config.get("WORKER_DRAIN_TIMEOUT", 30))
+    stats_interval = float(config.get("WORKER_STATS_INTERVAL", 60))
+    poller = AdaptivePoller.from_config(config)
+    engine.on_result = poller.record
 
     def _handle_stop(signum, _frame):
-        nonlocal stopping
         logger.info("Received signal %s, preparing to stop", signum)
-        stopping = True
+        poller.stop()
 
     signal.signal(signal.SIGTERM, _handle_stop)
     signal.signal(signal.SIGINT, _handle_stop)
@@ -58,14 +139,53 @@ def run_worker_app(config: dict) -> None:
         extra={
             "service": config.get("SERVICE_NAME"),
             "env": config.get("SERVICE_ENV"),
-            "poll_interval": poll_interval,
+            "poll_interval": poller.max_interval,
+            "engine": engine.kind,
+            "source": "stream" if consumer else "poll",
         },
     )
+    next_stats = time.monotonic() + stats_interval
     try:
-        while not stopping:
-            _perform_work(config, stores)
-            time.sleep(poll_interval)
+        while not poller.stopping:
+            engine.check_timeouts()
+            if stats_interval > 0 and time.monotonic() >= next_stats:
+                next_stats = time.monotonic() + stats_interval
+                logger.info("Worker loop stats", extra=poller.stats())
+            if consumer is not None:
+                _poll_stream(consumer, engine, poller)
+            # Blocks while every slot is busy; re-check `stopping` every second
+            elif engine.submit(_perform_work, slot_timeout=1.0):
+                poller.sleep(poller.next_delay())
     except (KeyboardInterrupt, SystemExit):
         logger.info("Worker interrupted, shutting down")
     finally:
+        logger.info("Draining in-flight work", extra={"service": config.get("SERVICE_NAME")})
+        engine.drain(drain_timeout)
+        if consumer is not None:
+            try:
+                consumer.release()
+            except redis.exceptions.RedisError:
+                pass
+        logger.info("Worker loop stats", extra=poller.stats())
+        poller.close()
         _cleanup(config, stores)
+
+
+def _poll_stream(consumer: StreamConsumer, engine, poller: AdaptivePoller) -> None:
+    """
+    One iteration of the stream source: reclaim stale messages or block on
+    new ones, then hand the batch to the engine. XREADGROUP BLOCK does the
+    waiting; the poller only paces retries after Redis errors.
+    """
+    # Do not pull messages that could not start running
+    if not engine.wait_for_slot(timeout=1.0):
+        return
+    try:
+        messages = consumer.claim_stale() or consumer.read_batch()
+    except redis.exceptions.RedisError as exc:
+        logger.error("Redis error while reading jobs: %s", exc, extra={"redis_status": "error"})
+        poller.record(0)
+        poller.sleep(poller.next_delay())
+        return
+    if messages:
+        engine.submit(partial(_process_stream_batch, messages))
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Adaptive poll scheduling for the worker loop."""
+
+from __future__ import annotations
+
+__updated__ = "2026-10-18 16:31:08"
+
+"""
+- Units of work report how much they did (`record`). While the latest
+  report found work, the loop polls again immediately.
+- When idle, the delay grows from WORKER_POLL_MIN_INTERVAL by
+  WORKER_POLL_BACKOFF per empty poll up to WORKER_POLL_INTERVAL, with
+  +/- WORKER_POLL_JITTER randomization so that replicas spread out.
+- Sleeps wait on a socket pair: `stop()` (safe to call from a signal
+  handler) and reports of new work from pool threads end them at once.
+- `stats()` exposes the busy/idle ratio and the loop lag (how late the
+  loop woke up compared to the planned delay).
+"""
+
+import asyncio
+import random
+import select
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict
+
+
+class AdaptivePoller:
+    """
+    Decide how long the worker loop waits between polls, and wait.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_interval: float = 0.1,
+        max_interval: float = 5.0,
+        backoff: float = 2.0,
+        jitter: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        self.max_interval = max(0.0, float(max_interval))
+        self.min_interval = min(max(0.0, float(min_interval)), self.max_interval)
+        self.backoff = max(1.0, float(backoff))
+        self.jitter = min(max(0.0, float(jitter)), 1.0)
+        self._clock = clock
+        self._rand = rand
+        self._lock = threading.Lock()
+        self._stopping = False
+        self._last_work = 0
+        self._idle_streak = 0
+
+        # Wake-up channel: writing one byte is async-signal-safe and takes no lock
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+
+        # Metrics
+        self._started = self._mark = clock()
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.polls = 0
+        self.productive_polls = 0
+        self.sleeps = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self._lag_total = 0.0
+
+    @classmethod
+    def from_config(cls, config: dict) -> "AdaptivePoller":
+        return cls(
+            min_interval=float(config.get("WORKER_POLL_MIN_INTERVAL", 0.1)),
+            max_interval=float(config.get("WORKER_POLL_INTERVAL", 5)),
+            backoff=float(config.get("WORKER_POLL_BACKOFF", 2.0)),
+            jitter=float(config.get("WORKER_POLL_JITTER", 0.2)),
+        )
+
+    # ----------------------------------------------------------------- control
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping
+
+    def stop(self) -> None:
+        """
+        Request the loop to stop and end the current sleep.
+        """
+        self._stopping = True
+        self.wake()
+
+    def wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            # Buffer full (a wake-up is already pending) or closed
+            pass
+
+    def close(self) -> None:
+        self._wake_r.close()
+        self._wake_w.close()
+
+    # -------------------------------------------------------------- scheduling
+
+    def record(self, work: Any) -> None:
+        """
+        Report the outcome of one poll. `work` is the amount of work done
+        (None counts as none). Thread-safe; may be called from pool threads.
+        """
+        amount = work if isinstance(work, int) and not isinstance(work, bool) else int(bool(work))
+        with self._lock:
+            self.polls += 1
+            self._last_work = amount
+            if amount > 0:
+                self.productive_polls += 1
+                self._idle_streak = 0
+        if amount > 0:
+            self.wake()
+
+    def next_delay(self) -> float:
+        """
+        0 while the latest poll found work, otherwise the next jittered
+        exponential backoff step.
+        """
+        with self._lock:
+            if self._last_work > 0:
+                return 0.0
+            streak = self._idle_streak
+            self._idle_streak += 1
+        delay = min(self.max_interval, self.min_interval * self.backoff**streak)
+        if self.jitter:
+            delay *= 1.0 + self.jitter * (2.0 * self._rand() - 1.0)
+        return min(max(0.0, delay), self.max_interval)
+
+    def sleep(self, delay: float) -> bool:
+        """
+        Wait up to `delay` seconds, ending early on `stop()` or new work.
+        Return False once the loop should stop.
+        """
+        started = self._begin_wait()
+        interrupted = False
+        if delay > 0 and not self._stopping:
+            readable, _, _ = select.select([self._wake_r], [], [], delay)
+            interrupted = bool(readable)
+            if interrupted:
+                self._drain_wakeups()
+        self._end_wait(started, delay, interrupted)
+        return not self._stopping
+
+    async def sleep_async(self, delay: float) -> bool:
+        """
+        Same as `sleep`, awaiting the wake-up socket on the running event loop.
+        """
+        started = self._begin_wait()
+        interrupted = False
+        if delay > 0 and not self._stopping:
+            loop = asyncio.get_running_loop()
+            try:
+                await asyncio.wait_for(loop.sock_recv(self._wake_r, 4096), delay)
+                interrupted = True
+                self._drain_wakeups()
+            except asyncio.TimeoutError:
+                pass
+        self._end_wait(started, delay, interrupted)
+        return not self._stopping
+
+    def _begin_wait(self) -> float:
+        now = self._clock()
+        self.busy_seconds += now - self._mark
+        self._mark = now
+        return now
+
+    def _end_wait(self, started: float, delay: float, interrupted: bool) -> None:
+        now = self._clock()
+        if delay > 0 and not interrupted and not self._stopping:
+            lag = max(0.0, now - started - delay)
+            self.lag_last = lag
+            self.lag_max = max(self.lag_max, lag)
+            self._lag_total += lag
+            self.sleeps += 1
+        self.idle_seconds += now - started
+        self._mark = now
+
+    def _drain_wakeups(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    # ----------------------------------------------------------------- metrics
+
+    def stats(self) -> Dict[str, Any]:
+        busy = self.busy_seconds + (self._clock() - self._mark)
+        total = busy + self.idle_seconds
+        return {
+            "busy_ratio": round(busy / total, 4) if total else 0.0,
+            "busy_seconds": round(busy, 3),
+            "idle_seconds": round(self.idle_seconds, 3),
+            "polls": self.polls,
+            "productive_polls": self.productive_polls,
+            "loop_lag_ms": round(self.lag_last * 1000.0, 3),
+            "loop_lag_max_ms": round(self.lag_max * 1000.0, 3),
+            "loop_lag_avg_ms": round(self._lag_total / self.sleeps * 1000.0, 3) if self.sleeps else 0.0,
+        }
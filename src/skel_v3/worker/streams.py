@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Redis Streams job source for the worker."""
+
+from __future__ import annotations
+
+__updated__ = "2026-10-18 14:58:12"
+
+"""
+Consumer-group reader used when WORKER_SOURCE=stream.
+
+- XREADGROUP with BLOCK replaces the fixed poll sleep; up to
+  WORKER_STREAM_BATCH messages are read per call.
+- Successfully handled messages are acknowledged with a single XACK per
+  batch. Failed ones stay pending and are retried.
+- Every WORKER_STREAM_CLAIM_INTERVAL seconds, XAUTOCLAIM takes over messages
+  idle for WORKER_STREAM_CLAIM_IDLE_MS (e.g. owned by a dead consumer).
+  Messages delivered more than WORKER_STREAM_MAX_DELIVERIES times are moved
+  to the dead-letter stream (XADD + XACK in one pipeline).
+
+Producing a job (Redis CLI):
+
+redis-cli XADD jobs '*' kind resize id 42
+"""
+
+import logging
+import os
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+Message = Tuple[bytes, Dict[bytes, bytes]]
+
+
+def default_consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class StreamConsumer:
+    """
+    Consumer-group reader/acknowledger for one stream.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        *,
+        stream: str,
+        group: str,
+        consumer: Optional[str] = None,
+        batch_size: int = 32,
+        block_ms: int = 2000,
+        claim_idle_ms: int = 60000,
+        claim_interval: float = 30.0,
+        max_deliveries: int = 5,
+        dead_letter_stream: Optional[str] = None,
+        dead_letter_maxlen: int = 100000,
+    ) -> None:
+        self.redis = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or default_consumer_name()
+        self.batch_size = max(1, int(batch_size))
+        self.block_ms = max(0, int(block_ms))
+        self.claim_idle_ms = max(0, int(claim_idle_ms))
+        self.claim_interval = float(claim_interval)
+        self.max_deliveries = max(1, int(max_deliveries))
+        self.dead_letter_stream = dead_letter_stream or f"{stream}:dead"
+        self.dead_letter_maxlen = int(dead_letter_maxlen)
+        self._claim_cursor = "0-0"
+        self._next_claim = 0.0
+
+    @classmethod
+    def from_config(cls, config: dict, redis_client: redis.Redis) -> "StreamConsumer":
+        return cls(
+            redis_client,
+            stream=config.get("WORKER_STREAM", "jobs"),
+            group=config.get("WORKER_STREAM_GROUP", "workers"),
+            consumer=config.get("WORKER_STREAM_CONSUMER") or None,
+            batch_size=int(config.get("WORKER_STREAM_BATCH", 32)),
+            block_ms=int(config.get("WORKER_STREAM_BLOCK_MS", 2000)),
+            claim_idle_ms=int(config.get("WORKER_STREAM_CLAIM_IDLE_MS", 60000)),
+            claim_interval=float(config.get("WORKER_STREAM_CLAIM_INTERVAL", 30)),
+            max_deliveries=int(config.get("WORKER_STREAM_MAX_DELIVERIES", 5)),
+            dead_letter_stream=config.get("WORKER_STREAM_DEADLETTER") or None,
+            dead_letter_maxlen=int(config.get("WORKER_STREAM_DEADLETTER_MAXLEN", 100000)),
+        )
+
+    def ensure_group(self) -> None:
+        """
+        Create the consumer group (and the stream) if missing.
+        """
+        try:
+            self.redis.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.exceptions.ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def read_batch(self, block_ms: Optional[int] = None) -> List[Message]:
+        """
+        Read up to `batch_size` new messages, blocking up to `block_ms`.
+        """
+        block = self.block_ms if block_ms is None else block_ms
+        reply = self.redis.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=self.batch_size,
+            block=block or None,
+        )
+        if not reply:
+            return []
+        return [m for m in reply[0][1] if m[1] is not None]
+
+    def claim_stale(self, force: bool = False) -> List[Message]:
+        """
+        Take over messages idle for longer than `claim_idle_ms` (at most
+        once per `claim_interval` unless forced). Poison messages are moved
+        to the dead-letter stream; the rest are returned for processing.
+        """
+        now = time.monotonic()
+        if not force and now < self._next_claim:
+            return []
+        self._next_claim = now + self.claim_interval
+
+        cursor, claimed, *_ = self.redis.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            start_id=self._claim_cursor,
+            count=self.batch_size,
+        )
+        self._claim_cursor = cursor
+        # Deleted entries come back as (id, None); just acknowledge them
+        gone = [mid for mid, fields in claimed if fields is None]
+        claimed = [m for m in claimed if m[1] is not None]
+        if gone:
+            self.ack(gone)
+        if not claimed:
+            return []
+
+        pending = self.redis.xpending_range(
+            self.stream,
+            self.group,
+            min=claimed[0][0],
+            max=claimed[-1][0],
+            count=len(claimed) + len(gone),
+            consumername=self.consumer,
+        )
+        deliveries = {p["message_id"]: p["times_delivered"] for p in pending}
+
+        poison = [m for m in claimed if deliveries.get(m[0], 0) > self.max_deliveries]
+        if poison:
+            self.dead_letter(poison, deliveries, reason="max_deliveries")
+        poison_ids = {m[0] for m in poison}
+        return [m for m in claimed if m[0] not in poison_ids]
+
+    def ack(self, message_ids: List[bytes]) -> int:
+        if not message_ids:
+            return 0
+        return self.redis.xack(self.stream, self.group, *message_ids)
+
+    def dead_letter(self, messages: List[Message], deliveries: Dict[bytes, int], reason: str) -> None:
+        """
+        Copy messages to the dead-letter stream and acknowledge them, in one
+        round trip.
+        """
+        pipe = self.redis.pipeline(transaction=True)
+        for message_id, fields in messages:
+            entry = dict(fields)
+            entry[b"_source_stream"] = self.stream
+            entry[b"_source_id"] = message_id
+            entry[b"_deliveries"] = deliveries.get(message_id, 0)
+            entry[b"_reason"] = reason
+            pipe.xadd(self.dead_letter_stream, entry, maxlen=self.dead_letter_maxlen, approximate=True)
+        pipe.xack(self.stream, self.group, *[m[0] for m in messages])
+        pipe.execute()
+        logger.warning(
+            "Moved %d message(s) to dead-letter stream %s",
+            len(messages),
+            self.dead_letter_stream,
+            extra={"reason": reason},
+        )
+
+    def release(self) -> None:
+        """
+        Leave the group on shutdown if this consumer holds no pending messages.
+        """
+        if not self.redis.xpending_range(self.stream, self.group, min="-", max="+", count=1, consumername=self.consumer):
+            self.redis.xgroup_delconsumer(self.stream, self.group, self.consumer)
+
+    def process(self, messages: List[Message], handler: Callable[[bytes, Dict[bytes, bytes]], Any]) -> int:
+        """
+        Run `handler` on each message and acknowledge the successful ones with
+        a single XACK. Return the number of acknowledged messages.
+        """
+        done: List[bytes] = []
+        for message_id, fields in messages:
+            try:
+                handler(message_id, fields)
+                done.append(message_id)
+            except Exception:  # noqa: BLE001
+                logger.exception("Stream message %s failed; left pending for retry", message_id)
+        self.ack(done)
+        return len(done)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-18 09:22:10"
+
+from skel_v3.db.apikey_cache import ApiKeyCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(store, **kwargs):
+    calls = []
+
+    def loader(_r, apikey):
+        calls.append(apikey)
+        return store.get(apikey)
+
+    clock = FakeClock()
+    cache = ApiKeyCache(None, loader=loader, clock=clock, **kwargs)
+    return cache, calls, clock
+
+
+def test_hits_misses_and_negative_entries():
+    cache, calls, _ = make_cache({"good": {"customer_id": "c001"}})
+
+    assert cache.get("good") == {"customer_id": "c001"}
+    assert cache.get("good") == {"customer_id": "c001"}
+    assert cache.get("bad") is None
+    assert cache.get("bad") is None
+    assert calls == ["good", "bad"]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["negative_hits"] == 1
+    assert stats["misses"] == 2
+
+
+def test_ttl_expiry_and_lru_eviction():
+    cache, calls, clock = make_cache({"a": {"id": 1}, "b": {"id": 2}, "c": {"id": 3}}, max_size=2, ttl=10)
+
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")  # "b" is now least recently used
+    cache.get("c")
+    assert cache.stats()["evictions"] == 1
+
+    cache.get("a")
+    assert calls == ["a", "b", "c"]
+
+    clock.now += 11
+    cache.get("a")
+    assert calls == ["a", "b", "c", "a"]
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidation_messages():
+    store = {"k1": {"id": 1}, "k2": {"id": 2}}
+    cache, calls, _ = make_cache(store)
+    cache.get("k1")
+    cache.get("k2")
+
+    store["k1"] = None
+    cache.handle_message({"type": "message", "channel": b"apikey:invalidate", "data": b"k1"})
+    assert cache.get("k1") is None
+
+    cache.handle_message({"type": "pmessage", "channel": b"__keyspace@0__:apikey:k2", "data": b"hset"})
+    cache.get("k2")
+    assert calls == ["k1", "k2", "k1", "k2"]
+
+    cache.handle_message({"type": "message", "channel": b"apikey:invalidate", "data": b"*"})
+    assert cache.stats()["size"] == 0
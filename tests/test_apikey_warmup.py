@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 08:18:27"
+
+import pytest
+
+from db.apikey_cache import ApiKeyCache
+from db.apikey_warmup import ApiKeySnapshot, build_snapshot, start_apikey_warmup, warm_apikey_cache, write_snapshot
+from db.redis_apikeys import ApiKeyRecord
+from util.readiness import ReadinessGate
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    r = fakeredis.FakeRedis()
+    for i in range(25):
+        r.hset(f"apikey:k{i:02d}", mapping={"customer_id": f"c{i:02d}", "rate_limit": "10", "disabled": "0"})
+    r.hset("apikey:off", mapping={"customer_id": "c99", "disabled": "1"})
+    r.set("apikey:not-a-hash", "x")
+    return r
+
+
+def test_snapshot_roundtrip_and_lookup(tmp_path):
+    records = [(f"k{i}", ApiKeyRecord(customer_id=f"c{i}", allowed_endpoints=["/hello"])) for i in range(100)]
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, build_snapshot(records, created_at=123.0))
+
+    snapshot = ApiKeySnapshot.open(path)
+    assert len(snapshot) == 100 and snapshot.created_at == 123.0
+    assert snapshot.get("k42") == {"customer_id": "c42", "allowed_endpoints": ("/hello",)}
+    assert snapshot.get("k420") is None and snapshot.get("") is None
+    assert sorted(snapshot.keys()) == sorted(k for k, _ in records)
+
+
+def test_warmup_gates_readiness_and_serves_misses(redis_client):
+    cache = ApiKeyCache(redis_client, ttl=30)
+    gate = ReadinessGate()
+    thread = start_apikey_warmup({"APIKEY_WARMUP": "scan", "APIKEY_WARMUP_BATCH": 10}, cache, gate)
+    assert thread is not None
+    thread.join(5)
+
+    assert gate.ready
+    assert gate.status()["startup"]["apikey_warmup"]["keys"] == 25
+
+    redis_client.hset("apikey:k03", "customer_id", "changed")
+    assert cache.get("k03").customer_id == "c03"  # served from the warm table
+    cache.invalidate("k03")
+    assert cache.get("k03").customer_id == "changed"
+    assert cache.get("off") is None
+    assert cache.stats()["warm_hits"] == 1
+
+
+def test_invalidation_during_scan_masks_warm_table(redis_client, monkeypatch):
+    cache = ApiKeyCache(redis_client, ttl=30)
+    scan = redis_client.scan
+    disabled = []
+
+    def scan_then_disable(*args, **kwargs):
+        cursor, keys = scan(*args, **kwargs)
+        if disabled and not disabled[1:]:
+            # A key an earlier page read is disabled before the table is attached
+            redis_client.hset(f"apikey:{disabled[0]}", "disabled", "1")
+            cache.invalidate(disabled[0])
+            disabled.append(True)
+        elif not disabled and keys:
+            disabled.append(keys[0].decode()[len("apikey:") :])
+        return cursor, keys
+
+    monkeypatch.setattr(redis_client, "scan", scan_then_disable)
+    snapshot, _ = warm_apikey_cache({"APIKEY_WARMUP": "scan", "APIKEY_WARMUP_BATCH": 5, "APIKEY_CACHE_TTL": 30}, cache)
+    assert len(disabled) == 2 and snapshot.get(disabled[0]) is not None
+    assert cache.get(disabled[0]) is None
+    assert cache.stats()["warm_size"] == len(snapshot)
+
+    # A full flush during the scan drops the table altogether
+    flushed = ApiKeyCache(redis_client, ttl=30)
+    monkeypatch.setattr(redis_client, "scan", lambda *a, **kw: (flushed.invalidate(), scan(*a, **kw))[1])
+    warm_apikey_cache({"APIKEY_WARMUP": "scan"}, flushed)
+    assert flushed.stats()["warm_size"] == 0
+
+
+def test_snapshot_mode_writes_then_reuses_file(redis_client, tmp_path):
+    config = {"APIKEY_WARMUP": "snapshot", "APIKEY_SNAPSHOT_PATH": str(tmp_path / "keys.bin")}
+    first = ReadinessGate()
+    start_apikey_warmup(config, ApiKeyCache(redis_client), first).join(5)
+    assert first.status()["startup"]["apikey_warmup"]["source"] == "scan"
+
+    second = ReadinessGate()
+    start_apikey_warmup(config, ApiKeyCache(redis_client), second).join(5)
+    assert second.status()["startup"]["apikey_warmup"] == {
+        "keys": 25,
+        "source": "snapshot",
+        "duration_ms": second.status()["startup"]["apikey_warmup"]["duration_ms"],
+    }
+
+
+def test_readiness_gate_blocks_until_done():
+    gate = ReadinessGate()
+    gate.add("warmup")
+    assert not gate.ready and gate.pending() == ["warmup"]
+    assert gate.wait(0.01) is False
+    gate.done("warmup", error="boom")
+    assert gate.wait(0) and gate.status()["startup"]["warmup"]["error"] == "boom"
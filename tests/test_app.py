@@ -5,13 +5,17 @@
 
 """Test module"""
 
-__updated__ = "2026-02-07 07:13:29"
+__updated__ = "2026-10-18 21:38:44"
 
 import json
 import pytest
 
+from flask import Flask
+
 from skel_v3.app import create_api_app
 from skel_v3.config import get_config
+from api.health import register_health_routes
+from util.readiness import ReadinessGate
 
 
 @pytest.fixture
@@ -35,6 +39,21 @@ def test_health(client):
     assert data["status"] == "ok"
 
 
+def test_ready_waits_for_startup_tasks(client):
+    assert client.get("/ready").status_code == 200
+
+    gate = ReadinessGate()
+    gate.add("apikey_warmup")
+    app = Flask(__name__)
+    register_health_routes(app, config={}, readiness=gate)
+    resp = app.test_client().get("/ready")
+    assert resp.status_code == 503
+    assert json.loads(resp.data)["pending"] == ["apikey_warmup"]
+
+    gate.done("apikey_warmup")
+    assert app.test_client().get("/ready").status_code == 200
+
+
 def test_get_config_defaults_to_api(monkeypatch):
     """
     Ensure the configuration defaults to APP_TYPE=api when env var is missing.
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 10:05:44"
+
+import asyncio
+import json
+
+import pytest
+
+from api.asgi import ASGI_SERVERS, AsgiApp, JsonResponse, require_apikey_async, serve_asgi
+from db.apikey_cache import ApiKeyCache
+from db.redis_ratelimit import RateLimiter
+from skel_v3.app import create_asgi_app
+from skel_v3.config import get_config
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+async def _request(app, path, method="GET", headers=None, body=b""):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 5000),
+        "server": ("testserver", 80),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    start, body_message = sent
+    return start["status"], dict(start["headers"]), body_message["body"]
+
+
+def _app():
+    config = get_config()
+    config.update(PG_ENABLED=False, REDIS_ENABLED=False, METRICS_MULTIPROC_DIR="")
+    return create_asgi_app(config)
+
+
+def test_async_routes_and_wsgi_bridge():
+    app = _app()
+
+    async def run():
+        await app.startup()
+        try:
+            return [
+                await _request(app, "/health"),
+                await _request(app, "/example"),
+                await _request(app, "/"),
+                await _request(app, "/nope"),
+                await _request(app, "/metrics"),
+            ]
+        finally:
+            await app.shutdown()
+
+    health, example, root, missing, metrics = asyncio.run(run())
+    assert health[0] == 200 and json.loads(health[2])["status"] == "ok"
+    assert json.loads(example[2]) == {"module": "example"}
+    # Served by Flask through the thread pool
+    assert root[0] == 200 and json.loads(root[2])["links"]
+    assert missing[0] == 404
+    assert b'http_requests_total{method="GET",route="/health",status="200"}' in metrics[2]
+
+
+def test_lifespan_protocol():
+    app = _app()
+    events = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+    sent = []
+
+    async def receive():
+        return events.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(app({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert "redis" in app.stores
+
+
+@pytest.fixture
+def redis_clients():
+    server = fakeredis.FakeServer()
+    sync_client = fakeredis.FakeRedis(server=server)
+    sync_client.hset("apikey:k1", mapping={"customer_id": "c001", "rate_limit": "2", "disabled": "0"})
+    return sync_client, fakeredis.FakeAsyncRedis(server=server)
+
+
+def _protected_app(stores):
+    app = AsgiApp(lambda environ, start_response: [], metrics=False)
+
+    @app.route("/secure")
+    @require_apikey_async(stores)
+    async def secure(request):
+        return JsonResponse({"customer": request.customer["customer_id"]})
+
+    return app
+
+
+def test_require_apikey_async_with_cache(redis_clients):
+    sync_client, async_client = redis_clients
+    cache = ApiKeyCache(sync_client)
+    app = _protected_app({"redis": async_client, "apikey_cache": cache})
+
+    async def run():
+        return [
+            await _request(app, "/secure", headers={"X-API-Key": "k1"}),
+            await _request(app, "/secure", headers={"X-API-Key": "k1"}),
+            await _request(app, "/secure", headers={"X-API-Key": "nope"}),
+            await _request(app, "/secure"),
+        ]
+
+    first, second, unknown, missing = asyncio.run(run())
+    assert first[0] == second[0] == 200
+    assert json.loads(first[2]) == {"customer": "c001"}
+    assert unknown[0] == missing[0] == 401
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+
+def test_require_apikey_async_rate_limited(redis_clients):
+    sync_client, async_client = redis_clients
+    app = _protected_app({"redis": async_client, "rate_limiter": RateLimiter(sync_client, local_precheck=False)})
+
+    async def run():
+        return [await _request(app, "/secure", headers={"X-API-Key": "k1"}) for _ in range(3)]
+
+    statuses = [status for status, _, _ in asyncio.run(run())]
+    assert statuses == [200, 200, 429]
+
+
+def test_require_apikey_async_without_redis():
+    app = _protected_app({})
+    status, _, body = asyncio.run(_request(app, "/secure", headers={"X-API-Key": "k1"}))
+    assert status == 500 and json.loads(body)["error"] == "Internal configuration error"
+
+
+def test_serve_asgi_falls_back_to_the_installed_server(monkeypatch):
+    served = []
+
+    def missing():
+        raise ImportError("No module named 'uvicorn'")
+
+    monkeypatch.setitem(ASGI_SERVERS, "uvicorn", missing)
+    monkeypatch.setitem(ASGI_SERVERS, "hypercorn", lambda: lambda app, host, port: served.append((app, port)))
+    serve_asgi("app", {"ASGI_SERVER": "uvicorn"}, port=9001)
+    assert served == [("app", 9001)]
+
+    monkeypatch.setitem(ASGI_SERVERS, "hypercorn", missing)
+    with pytest.raises(RuntimeError, match="uvicorn .*or hypercorn"):
+        serve_asgi("app", {})
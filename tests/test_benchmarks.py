@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 05:53:07"
+
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import pytest
+
+from benchmarks.bench_startup import parse_importtime
+from benchmarks.bench_load import APIKEY, BENCH_ROUTE, _http_sender, build_app, run_load
+from benchmarks.common import load_results, summarize, write_results
+from benchmarks.compare import compare
+
+pytest.importorskip("fakeredis")
+
+
+def test_summarize_and_compare(tmp_path):
+    base = summarize("op", [1000] * 99 + [5000], 1.0)
+    assert base["iterations"] == 100 and base["ops_per_sec"] == 100.0
+    assert base["p50_us"] == 1.0 and base["p99_us"] == 1.0
+    slower = summarize("op", [1000] * 98 + [5000] * 2, 1.25)
+    assert slower["p99_us"] == 5.0
+
+    write_results(tmp_path / "base.json", "micro", [base], {"iterations": 100})
+    write_results(tmp_path / "new.json", "micro", [slower, summarize("new-op", [1], 1.0)])
+    rows = compare(load_results(tmp_path / "base.json"), load_results(tmp_path / "new.json"), threshold=10)
+    assert [row["name"] for row in rows] == ["op"]
+    assert rows[0]["ops_change_pct"] == pytest.approx(-20.0)
+    assert rows[0]["regression"]
+    assert not compare({"results": [base]}, {"results": [base]})[0]["regression"]
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   _io\n"
+        "import time:       300 |       1500 |     db.pg_pool\n"
+        "import time:      2000 |       4000 | app\n"
+        "Traceback lines are ignored\n"
+    )
+    assert parse_importtime(stderr) == [("_io", 120, 120, 1), ("db.pg_pool", 300, 1500, 2), ("app", 2000, 4000, 0)]
+
+
+def test_inprocess_load_run():
+    app = build_app()
+    with app.test_client() as client:
+        assert client.get(BENCH_ROUTE, headers={"X-API-Key": APIKEY}).status_code == 200
+        assert client.get(BENCH_ROUTE).status_code == 401
+
+    def factory():
+        client = app.test_client()
+        return lambda path: client.get(path, headers={"X-API-Key": APIKEY}).status_code
+
+    results = run_load(factory, ["/health", BENCH_ROUTE], concurrency=2, duration=0.2, warmup=0.05)
+    assert [r["name"] for r in results] == ["GET /health", f"GET {BENCH_ROUTE}", "all x2"]
+    assert results[-1]["iterations"] == results[0]["iterations"] + results[1]["iterations"] > 0
+    assert results[-1]["errors"] == 0
+
+
+def test_http_sender_against_server():
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = make_server("127.0.0.1", 0, build_app(), handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        send = _http_sender(f"http://127.0.0.1:{server.server_port}")()
+        assert send("/health") == 200
+        assert send("/nope") == 404
+    finally:
+        server.shutdown()
+    assert _http_sender("http://127.0.0.1:1")()("/health") == 0
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 07:42:18"
+
+import gzip
+import os
+import re
+import zlib
+
+from flask import Flask, Response, jsonify
+
+from skel_v3.app import create_api_app
+from skel_v3.config import get_config
+from api.compression import (
+    GZIP,
+    ResponseCompressor,
+    available_encodings,
+    choose_encoding,
+    install_compression,
+    parse_levels,
+)
+from util.metrics import REGISTRY
+from util.static_response import StaticResponse
+
+ROWS = [{"id": i, "name": f"item-{i}", "tags": ["alpha", "beta"]} for i in range(200)]
+
+
+def _app(**config) -> Flask:
+    app = Flask(__name__)
+    settings = {"COMPRESSION_CACHE_SIZE": 4}
+    settings.update(config)
+    install_compression(app, config=settings)
+    static = StaticResponse.json({"rows": ROWS})
+
+    @app.route("/rows")
+    def rows():
+        return jsonify(ROWS)
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/static")
+    def static_rows():
+        return static.flask_response(None)
+
+    @app.route("/png")
+    def png():
+        return Response(b"\x89PNG" + bytes(4096), mimetype="image/png")
+
+    @app.route("/stream")
+    def stream():
+        return Response((f'{{"id": {i}}}\n' * 50 for i in range(20)), mimetype="application/x-ndjson")
+
+    return app
+
+
+def _bytes_in() -> float:
+    match = re.search(r'^http_compression_input_bytes_total\{encoding="gzip"\} (\S+)$', REGISTRY.render(), re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_negotiation():
+    assert choose_encoding("gzip, deflate, br", ["zstd", "gzip"]) == "gzip"
+    assert choose_encoding("zstd;q=0.5, gzip", ["zstd", "gzip"]) == "zstd"
+    assert choose_encoding("gzip;q=0, *;q=0.1", ["gzip"]) is None
+    assert choose_encoding("*", ["zstd", "gzip"]) == "zstd"
+    assert choose_encoding("identity", ["gzip"]) is None and choose_encoding(None, ["gzip"]) is None
+    assert parse_levels("application/x-ndjson=1:1, text/csv=9") == {
+        "application/x-ndjson": (1, 1),
+        "text/csv": (9, None),
+    }
+
+
+def test_gzip_response_and_skips():
+    client = _app().test_client()
+    gz = {"Accept-Encoding": "gzip"}
+
+    resp = client.get("/rows", headers=gz)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert int(resp.headers["Content-Length"]) < len(client.get("/rows").get_data())
+    plain = client.get("/rows")
+    assert gzip.decompress(resp.get_data()) == plain.get_data()
+    assert "Content-Encoding" not in plain.headers and "Accept-Encoding" in plain.headers["Vary"]
+
+    for path in ("/small", "/png"):
+        assert "Content-Encoding" not in client.get(path, headers=gz).headers
+    assert "Content-Encoding" not in client.head("/rows", headers=gz).headers
+
+
+def test_streamed_response_compressed_per_chunk():
+    app = _app(COMPRESSION_LEVELS="application/x-ndjson=1")
+    assert app.extensions["response_compressor"].level(GZIP, "application/x-ndjson") == 1
+    before = _bytes_in()
+
+    resp = app.test_client().get("/stream", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    assert resp.headers["Content-Encoding"] == "gzip" and "Content-Length" not in resp.headers
+    chunks = list(resp.response)
+    resp.close()
+    assert len(chunks) > 1  # flushed as produced, not buffered
+    decoder = zlib.decompressobj(31)
+    first = decoder.decompress(chunks[0])
+    assert first == b'{"id": 0}\n' * 50  # the first chunk decodes on its own
+    body = first + b"".join(decoder.decompress(c) for c in chunks[1:])
+    assert body == b"".join(f'{{"id": {i}}}\n'.encode() * 50 for i in range(20))
+    assert _bytes_in() - before == len(body)
+
+
+def test_static_response_compressed_once():
+    app = _app()
+    compressor = app.extensions["response_compressor"]
+    client = app.test_client()
+    identity = client.get("/static")
+    etag = identity.headers["ETag"]
+
+    first = client.get("/static", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/static", headers={"Accept-Encoding": "gzip"})
+    assert first.get_data() == second.get_data()
+    assert gzip.decompress(first.get_data()) == identity.get_data()
+    assert first.headers["ETag"] == f"W/{etag}"
+    assert list(compressor._cache) == [(etag.strip('"'), GZIP, 6)]  # pylint: disable=protected-access
+
+
+def test_api_app_compression_and_zstd_when_available():
+    config = get_config()
+    config["PG_ENABLED"] = False
+    config["REDIS_ENABLED"] = False
+    config["COMPRESSION_MIN_SIZE"] = 0
+    client = create_api_app(config).test_client()
+    resp = client.get("/", headers={"Accept-Encoding": "zstd, gzip"})
+    assert resp.headers["Content-Encoding"] == available_encodings()[0]
+    # A weak ETag still revalidates
+    assert client.get("/", headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+
+    config["COMPRESSION_ENABLED"] = False
+    client = create_api_app(config).test_client()
+    assert "Content-Encoding" not in client.get("/", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_incompressible_body_sent_as_is():
+    app = Flask(__name__)
+    app.after_request(ResponseCompressor(min_size=0, encodings=[GZIP]))
+    noise = os.urandom(2048)
+    app.add_url_rule("/noise", "noise", lambda: Response(noise, mimetype="text/plain"))
+    resp = app.test_client().get("/noise", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers and resp.get_data() == noise
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 09:16:55"
+
+import importlib
+import json
+import socket
+import time
+
+import pytest
+from flask import Flask, jsonify
+
+from app import create_api_app, start_datastores, stop_datastores
+from config import get_config
+from db.apikey_cache import ApiKeyCache
+from db.apikey_warmup import ApiKeySnapshot, build_snapshot, start_apikey_warmup
+from db.redis_apikeys import ApiKeyRecord
+from util.decorators import require_apikey
+from util.readiness import ReadinessGate
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def gunicorn_conf(monkeypatch):
+    # Importing the module exports APP_DEFER_DATASTORES; restore it afterwards
+    monkeypatch.setenv("APP_DEFER_DATASTORES", "0")
+    import gunicorn_conf as module  # pylint: disable=import-outside-toplevel
+
+    return module
+
+
+def test_size_workers(gunicorn_conf):
+    assert gunicorn_conf.size_workers("sync", 4) == (9, 1)
+    assert gunicorn_conf.size_workers("gthread", 4) == (5, 4)
+    assert gunicorn_conf.size_workers("gevent", 4) == (4, 1)
+    assert gunicorn_conf.size_workers("uvicorn", 2) == (2, 1)
+    assert gunicorn_conf.size_workers("gthread", 4, workers=3, threads=8) == (3, 8)
+    assert gunicorn_conf.size_workers("sync", 4, threads=8) == (9, 1)
+    assert gunicorn_conf.available_cpus() >= 1
+    assert gunicorn_conf.workers >= 1 and gunicorn_conf.worker_class in gunicorn_conf.WORKER_CLASSES.values()
+
+
+def test_gevent_disables_preload_and_leaves_master_unpatched(gunicorn_conf, monkeypatch):
+    monkeypatch.setenv("GUNICORN_WORKER_CLASS", "gevent")
+    monkeypatch.setenv("GUNICORN_PRELOAD", "true")
+    try:
+        module = importlib.reload(gunicorn_conf)
+        assert module.worker_class == "gevent" and module.preload_app is False
+        assert socket.socket.__module__ == "socket"  # patched in post_fork only
+    finally:
+        monkeypatch.undo()
+        monkeypatch.setenv("APP_DEFER_DATASTORES", "0")
+        importlib.reload(gunicorn_conf)
+
+
+def test_deferred_app_opens_datastores_after_fork():
+    config = get_config()
+    config["PG_ENABLED"] = False
+    config["REDIS_ENABLED"] = False
+    config["HEALTH_CHECK_INTERVAL"] = 0.1
+
+    app = create_api_app(config, defer_datastores=True)
+    assert app.extensions["stores"] == {}
+    monitor = app.extensions["dependency_monitor"]
+    assert monitor._thread is None  # pylint: disable=protected-access
+
+    start_datastores(app)
+    client = app.test_client()
+    assert client.get("/health").status_code == 200
+    resp = client.get("/ready")
+    assert resp.status_code == 200, json.loads(resp.data)
+    stop_datastores(app)
+
+
+def test_require_apikey_resolves_stores_per_call():
+    stores: dict = {}
+    app = Flask(__name__)
+
+    @app.route("/protected")
+    @require_apikey(stores)
+    def protected():
+        return jsonify({"ok": True})
+
+    client = app.test_client()
+    assert client.get("/protected", headers={"X-API-Key": "k1"}).status_code == 500
+
+    # Filled in after the route was registered, as post_fork does
+    r = fakeredis.FakeRedis()
+    r.hset("apikey:k1", mapping={"customer_id": "c1", "disabled": "0"})
+    stores["redis"] = r
+    assert client.get("/protected", headers={"X-API-Key": "k1"}).status_code == 200
+
+
+def test_warmup_uses_preloaded_table():
+    table = ApiKeySnapshot(build_snapshot([("k1", ApiKeyRecord(customer_id="c1"))], created_at=time.time()))
+    cache = ApiKeyCache(fakeredis.FakeRedis(), ttl=30)
+    gate = ReadinessGate()
+    start_apikey_warmup({"APIKEY_WARMUP": "scan"}, cache, gate, table=table).join(5)
+
+    assert gate.status()["startup"]["apikey_warmup"]["source"] == "preload"
+    assert cache.get("k1").customer_id == "c1"  # Redis is empty: served from the table
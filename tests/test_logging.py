@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 09:04:11"
+
+import dataclasses
+import enum
+import io
+import json
+import logging
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from logs.async_handler import AsyncJsonHandler
+from logs import encoder as encoder_module
+from logs.encoder import JsonLogEncoder, register_context_fields
+from logs.formatter import JsonStdoutHandler
+from logs.sampling import SamplingFilter, parse_sample_rates
+
+
+def _logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_async_handler_drains_on_close():
+    stream = io.StringIO()
+    handler = AsyncJsonHandler(service_name="svc", environment="test", stream=stream, batch_size=2)
+    logger = _logger("test.async", handler)
+
+    for i in range(5):
+        logger.info("record %d", i, extra={"request_id": f"r{i}"})
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    handler.close()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [line["message"] for line in lines] == [f"record {i}" for i in range(5)] + ["failed"]
+    assert lines[0]["service"] == "svc"
+    assert lines[4]["request_id"] == "r4"
+    assert lines[5]["exception_type"] == "ValueError"
+    assert "boom" in lines[5]["stacktrace"]
+
+
+def test_async_handler_leaves_record_to_other_handlers():
+    handler = AsyncJsonHandler(stream=io.StringIO())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        exc_info = sys.exc_info()
+    record = logging.LogRecord("test.async", logging.ERROR, __file__, 1, "failed %s", ("job",), exc_info, "fn")
+    handler.handle(record)
+    handler.close()
+    assert record.msg == "failed %s" and record.args == ("job",)
+    assert record.exc_info is exc_info and record.exc_info[2] is not None
+
+
+def test_async_and_sync_lines_match():
+    sync_stream, async_stream = io.StringIO(), io.StringIO()
+    sync_handler = JsonStdoutHandler(service_name="svc", environment="test", stream=sync_stream)
+    async_handler = AsyncJsonHandler(service_name="svc", environment="test", stream=async_stream)
+
+    record = logging.LogRecord("test.match", logging.INFO, __file__, 1, "hello %s", ("world",), None, "fn")
+    record.http_path = "/example"
+    sync_handler.handle(record)
+    async_handler.handle(logging.makeLogRecord(dict(record.__dict__)))
+    async_handler.close()
+
+    assert async_stream.getvalue() == sync_stream.getvalue()
+
+
+class _Tier(enum.Enum):
+    GOLD = "gold"
+
+
+@dataclasses.dataclass
+class _Point:
+    x: int
+    y: int
+
+
+def _sample_records():
+    records = []
+    for msg, args in [
+        ("plain message", None),
+        ("unicode ñ → 日本 %s", ("✓",)),
+        ("\x1b[31mred\x1b[0m and \"quotes\" \\ tabs\t\nnewline", None),
+        ("control \x00\x07 chars \u2028", None),
+    ]:
+        record = logging.LogRecord("test.enc", logging.INFO, "/app/mod.py", 42, msg, args, None, "fn")
+        record.request_id = "rid-1"
+        record.duration_ms = 12.345678
+        record.reason = {"nested": [1, 2.5, None, True, "x", 0.0001]}
+        records.append(record)
+
+    # Values orjson renders natively or differently: each in its own record,
+    # so the others above still go through orjson
+    for value in (
+        [1e20, 1.5e-7, -1e16],
+        [float("nan"), float("inf"), float("-inf")],
+        datetime(2026, 1, 1, tzinfo=timezone.utc),
+        {"tier": _Tier.GOLD},
+        uuid.UUID(int=42),
+        _Point(1, 2),
+        object(),  # non-serializable: rendered with str()
+    ):
+        record = logging.LogRecord("test.enc", logging.INFO, "/app/mod.py", 42, "extra", None, None, "fn")
+        record.reason = value
+        records.append(record)
+
+    try:
+        raise KeyError("missing")
+    except KeyError:
+        records.append(logging.LogRecord("test.enc", logging.ERROR, "/app/mod.py", 7, "boom", None, sys.exc_info(), "fn"))
+
+    werkzeug = logging.LogRecord("werkzeug", logging.INFO, "/w.py", 1, '127.0.0.1 - "GET /health HTTP/1.1" 200', None, None, "log")
+    records.append(werkzeug)
+    return records
+
+
+def test_orjson_and_stdlib_output_is_identical():
+    pytest.importorskip("orjson")
+    fast = JsonLogEncoder("svc", "tést", use_orjson=True)
+    stdlib = JsonLogEncoder("svc", "tést", use_orjson=False)
+    for record in _sample_records():
+        line = stdlib.encode(record)
+        assert fast.encode(record) == line
+        decoded = json.loads(line)
+        assert decoded["service"] == "svc"
+        assert "\x1b" not in decoded["message"]
+
+
+def test_encoder_timestamp_matches_datetime():
+    encoder = JsonLogEncoder()
+    rng = random.Random(1234)
+    for created in [0.0, 1700000000.0, 1700000000.5, 1700000000.9999996] + [
+        rng.uniform(1.6e9, 1.9e9) for _ in range(2000)
+    ]:
+        expected = datetime.fromtimestamp(created, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+        assert encoder.timestamp(created) == expected
+
+
+@pytest.fixture
+def restore_context_fields(monkeypatch):
+    monkeypatch.setattr(encoder_module, "_context_fields", encoder_module.context_fields())
+
+
+def test_registered_context_fields_are_emitted(restore_context_fields):
+    register_context_fields("tenant")
+    record = logging.LogRecord("test.enc", logging.INFO, __file__, 1, "hi", None, None, "fn")
+    record.tenant = "acme"
+    assert json.loads(JsonLogEncoder().encode(record))["tenant"] == "acme"
+
+
+def test_sampling_ratios_and_rate_cap_with_summary():
+    logger_rates, template_rates = parse_sample_rates("noisy=0.5;capped:hello %s=1")
+    assert logger_rates == {"noisy": 0.5}
+    assert template_rates == {("capped", "hello %s"): 1.0}
+
+    now = [100.0]
+    emitted = []
+    sampler = SamplingFilter(logger_rates, template_rates, cap_per_second=2, sink=emitted.append, clock=lambda: now[0])
+
+    def rec(name, msg, level=logging.INFO, exc_info=None):
+        return logging.LogRecord(name, level, __file__, 1, msg, ("x",), exc_info, "fn")
+
+    # Half of "noisy.child" records are kept
+    assert [sampler.filter(rec("noisy.child", "m")) for _ in range(4)] == [False, True, False, True]
+
+    assert [sampler.filter(rec("capped", "hello %s")) for _ in range(5)] == [True, True, False, False, False]
+    # Errors and exceptions are never dropped
+    assert sampler.filter(rec("capped", "hello %s", level=logging.ERROR))
+    assert sampler.filter(rec("capped", "hello %s", exc_info=(ValueError, ValueError("x"), None)))
+
+    now[0] += 1
+    assert sampler.filter(rec("capped", "hello %s"))
+    assert len(emitted) == 1
+    assert emitted[0].getMessage() == "Suppressed 3 similar records: hello %s"
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-18 23:41:26"
+
+import multiprocessing
+
+from skel_v3.app import create_api_app
+from skel_v3.config import get_config
+from util.metrics import GAUGE_ALL, MetricsRegistry
+
+
+def test_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    in_flight = registry.gauge("in_flight", "In flight.")
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+
+    requests.labels("/a").inc()
+    requests.labels(route="/a").inc(2)
+    in_flight.inc()
+    latency.labels("/a").observe(0.05)
+    latency.labels("/a").observe(0.5)
+    latency.labels("/a").observe(5)
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{route="/a"} 3.0' in text
+    assert "in_flight 1.0" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1.0' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2.0' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3.0' in text
+    assert 'latency_seconds_count{route="/a"} 3.0' in text
+    assert 'latency_seconds_sum{route="/a"} 5.55' in text
+
+
+def _child(registry):
+    registry.counter("jobs_total", "Jobs.").inc(5)
+    registry.gauge("busy", "Busy.").set(7)
+    registry.gauge("per_pid", "Per pid.", multiprocess_mode=GAUGE_ALL).set(1)
+
+
+def test_multiprocess_aggregation(tmp_path):
+    registry = MetricsRegistry()
+    registry.configure(str(tmp_path))
+    jobs = registry.counter("jobs_total", "Jobs.")
+    busy = registry.gauge("busy", "Busy.")
+    registry.gauge("per_pid", "Per pid.", multiprocess_mode=GAUGE_ALL)
+    jobs.inc(2)
+    busy.set(3)
+
+    process = multiprocessing.get_context("fork").Process(target=_child, args=(registry,))
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+
+    text = registry.render()
+    assert "jobs_total 7.0" in text  # counters of exited workers still count
+    assert "busy 3.0" in text  # gauges of exited workers do not (livesum)
+    assert f'per_pid{{pid="{process.pid}"}} 1.0' in text
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_metrics_endpoint_records_requests():
+    config = get_config()
+    config.update(PG_ENABLED=False, REDIS_ENABLED=False, METRICS_MULTIPROC_DIR="")
+    app = create_api_app(config)
+    client = app.test_client()
+    client.get("/health")
+    client.get("/health")
+    client.get("/nope")
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain; version=0.0.4")
+    text = resp.get_data(as_text=True)
+    assert 'http_requests_total{method="GET",route="/health",status="200"} 2.0' in text
+    assert 'http_requests_total{method="GET",route="<unmatched>",status="404"} 1.0' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health"} 2.0' in text
+    assert "http_requests_in_flight 1.0" in text  # the /metrics request itself
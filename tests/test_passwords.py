@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 09:40:05"
+
+import asyncio
+import json
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+import bcrypt
+import pytest
+from flask import Flask, jsonify
+
+from api.asgi import AsgiApp
+from api.auth import get_password_verifier, install_password_verifier
+from util.passwords import PasswordVerifier, VerifierBusy, VerifierTimeout, hash_cost
+
+HASH = bcrypt.hashpw(b"s3cret", bcrypt.gensalt(4))
+
+
+class Stalled(Executor):
+    """
+    Accepts work and never runs it.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        return Future()
+
+
+def test_verify_in_process_pool_and_cache():
+    verifier = PasswordVerifier(workers=1, rounds=4)
+    try:
+        assert verifier.verify("alice", "s3cret", HASH)
+        assert not verifier.verify("alice", "wrong", HASH)
+        assert not verifier.verify("alice", "s3cret", b"not-a-hash")
+        assert verifier.verify("alice", "s3cret", HASH.decode())  # cached
+        assert hash_cost(verifier.hash_password("other").encode()) == 4
+    finally:
+        verifier.close()
+    stats = verifier.stats()
+    assert stats["ok"] == 1 and stats["invalid"] == 2 and stats["cache_hit"] == 1
+
+
+def test_full_pool_rejects_with_429():
+    verifier = PasswordVerifier(max_pending=1, timeout=0.05, executor_factory=lambda _: Stalled())
+    with pytest.raises(TimeoutError):
+        verifier.verify("alice", "s3cret", HASH)
+    with pytest.raises(VerifierBusy):
+        verifier.verify("bob", "s3cret", HASH)
+
+    app = Flask(__name__)
+    install_password_verifier(app, config={"AUTH_VERIFY_MAX_PENDING": 1, "AUTH_VERIFY_TIMEOUT": 0.05})
+
+    @app.route("/login", methods=["POST"])
+    def login():
+        return jsonify({"ok": get_password_verifier().verify("alice", "s3cret", HASH)})
+
+    app.extensions["password_verifier"] = verifier
+    resp = app.test_client().post("/login")
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == "1"
+    assert verifier.stats()["rejected"] == 2
+
+
+def test_timed_out_check_answers_503():
+    verifier = PasswordVerifier(max_pending=10, timeout=0.05, executor_factory=lambda _: Stalled())
+    with pytest.raises(TimeoutError):
+        verifier.hash_password("s3cret")
+
+    app = Flask(__name__)
+    install_password_verifier(app, config={})
+    app.extensions["password_verifier"] = verifier
+
+    @app.route("/login", methods=["POST"])
+    def login():
+        return jsonify({"ok": get_password_verifier().verify("alice", "s3cret", HASH)})
+
+    resp = app.test_client().post("/login")
+    assert resp.status_code == 503 and resp.headers["Retry-After"] == "1"
+    assert verifier.stats()["timeout"] == 2
+
+    asgi = AsgiApp(app, metrics=False)
+
+    @asgi.route("/login", methods=("POST",))
+    async def login_async(_request):
+        return await verifier.verify_async("alice", "s3cret", HASH)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/login", "query_string": b"", "headers": []}
+    asyncio.run(asgi(scope, None, send))
+    assert sent[0]["status"] == 503 and (b"retry-after", b"1") in sent[0]["headers"]
+    assert json.loads(sent[1]["body"])["ok"] is False
+
+
+def test_rehash_in_background_when_cost_is_lower():
+    rehashed = {}
+    done = threading.Event()
+
+    def on_rehash(username, new_hash):
+        rehashed[username] = new_hash
+        done.set()
+
+    verifier = PasswordVerifier(rounds=5, cache_ttl=0, on_rehash=on_rehash, executor_factory=ThreadPoolExecutor)
+    assert verifier.verify("alice", "s3cret", HASH)
+    assert done.wait(5)
+    assert hash_cost(rehashed["alice"].encode()) == 5
+    assert bcrypt.checkpw(b"s3cret", rehashed["alice"].encode())
+    verifier.close()
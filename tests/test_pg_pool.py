@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-18 18:04:37"
+
+import threading
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from db.pg_pool import PgPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.conn.pings += 1
+        if self.conn.dead:
+            raise psycopg2.OperationalError("server closed the connection")
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.dead = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pool(**kwargs):
+    opened = []
+
+    def connect():
+        opened.append(FakeConn())
+        return opened[-1]
+
+    return PgPool(connect, **kwargs), opened
+
+
+def test_warm_reuse_and_context_manager():
+    pool, opened = _pool(min_conn=2, max_conn=3)
+    pool.warm()
+    assert len(opened) == 2 and pool.stats()["idle"] == 2
+
+    with pool.connection() as conn:
+        assert conn in opened
+        conn.status = extensions.TRANSACTION_STATUS_INTRANS
+        assert pool.stats()["in_use"] == 1
+    # Open transaction rolled back on return
+    assert conn.rollbacks == 1
+    stats = pool.stats()
+    assert stats["in_use"] == 0 and stats["idle"] == 2 and stats["wait_seconds"]["count"] == 1
+
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("boom")
+    assert pool.stats()["in_use"] == 0
+
+
+def test_exhausted_pool_blocks_then_times_out():
+    pool, _ = _pool(min_conn=0, max_conn=1, acquire_timeout=0.05)
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.timeouts == 1
+
+    # A waiter gets the connection as soon as it is returned
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    assert pool.getconn(timeout=5) is conn
+
+
+def test_validation_and_recycling():
+    clock = Clock()
+    pool, opened = _pool(min_conn=0, max_conn=2, validate_after=5, max_idle=60, max_lifetime=300, clock=clock)
+
+    first = pool.getconn()
+    pool.putconn(first)
+    # Recently used: no ping
+    assert pool.getconn() is first and first.pings == 0
+    pool.putconn(first)
+
+    # Idle past validate_after: pinged; dead connection replaced
+    clock.now += 10
+    first.dead = True
+    second = pool.getconn()
+    assert second is not first and first.closed and first.pings == 1
+    pool.putconn(second)
+
+    # Idle past max_idle: recycled without a ping
+    clock.now += 61
+    third = pool.getconn()
+    assert third is not second and second.closed and second.pings == 0
+    assert pool.stats()["recycled"] == 1
+    pool.putconn(third, close=True)
+    assert third.closed and pool.stats()["idle"] == 0
+
+    pool.closeall()
+    with pytest.raises(psycopg2.pool.PoolError):
+        pool.getconn()
+    assert len(opened) == 3
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-18 18:52:16"
+
+from psycopg2 import extensions
+
+from db.pg_pool import PgPool
+from db.pg_query import CopyStream, PgQuery, to_prepared_sql
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.log.append(query)
+
+    def fetchone(self):
+        return (1,)
+
+
+class FakeConn:
+    def __init__(self, log):
+        self.log = log
+        self.closed = 0
+        self.commits = 0
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def test_placeholders_and_copy_encoding():
+    assert to_prepared_sql("SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %s") == (
+        "SELECT * FROM t WHERE a = $1 AND b LIKE 'x%' AND c = $2"
+    )
+    stream = CopyStream([(1, "a\tb", None), (2, "line\nbreak\\", True)])
+    data = stream.read(5) + stream.read(-1)
+    assert data == "1\ta\\tb\t\\N\n2\tline\\nbreak\\\\\tt\n"
+    assert stream.rows == 2 and stream.read(10) == ""
+
+
+def test_prepare_once_per_connection_with_lru_and_recycling():
+    log = []
+    pool = PgPool(lambda: FakeConn(log), min_conn=0, max_conn=1, max_lifetime=0, max_idle=0)
+    queries = PgQuery(pool, max_prepared=2)
+    queries.register("one", "SELECT %s")
+    queries.register("two", "SELECT %s, %s")
+    queries.register("three", "SELECT 3")
+
+    assert queries.fetchone("one", (1,)) == (1,)
+    assert queries.fetchone("one", (2,)) == (1,)
+    assert log == ["PREPARE s_one AS SELECT $1", "EXECUTE s_one (%s)", "EXECUTE s_one (%s)"]
+
+    log.clear()
+    queries.execute("two", (1, 2))
+    queries.execute("three")
+    # LRU of 2: "one" is evicted
+    assert log == [
+        "PREPARE s_two AS SELECT $1, $2",
+        "EXECUTE s_two (%s, %s)",
+        "PREPARE s_three AS SELECT 3",
+        "DEALLOCATE s_one",
+        "EXECUTE s_three",
+    ]
+
+    # Changed SQL is re-prepared
+    log.clear()
+    queries.register("three", "SELECT 33")
+    queries.execute("three")
+    assert log == ["DEALLOCATE s_three", "PREPARE s_three AS SELECT 33", "EXECUTE s_three"]
+
+    # A recycled connection starts with an empty cache
+    conn = pool.getconn()
+    pool.putconn(conn, close=True)
+    log.clear()
+    queries.execute("three")
+    assert log == ["PREPARE s_three AS SELECT 33", "EXECUTE s_three"]
+    assert queries.stats()["prepares"] == 5
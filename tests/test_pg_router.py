@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-18 20:06:33"
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from db.pg_pool import PgPool
+from db.pg_query import PgQuery
+from db.pg_router import POLICY_ROUND_ROBIN, PgRouter
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.log.append((self.conn.node, query))
+
+    def fetchone(self):
+        return (self.conn.node,)
+
+
+class FakeConn:
+    def __init__(self, node, log):
+        self.node = node
+        self.log = log
+        self.closed = 0
+        self.commits = 0
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _router(replicas=("r1", "r2"), down=(), **kwargs):
+    log = []
+
+    def connect_to(node):
+        def connect():
+            if node in down:
+                raise psycopg2.OperationalError(f"{node} is down")
+            return FakeConn(node, log)
+
+        return connect
+
+    pools = [(name, PgPool(connect_to(name), min_conn=0, max_conn=4)) for name in replicas]
+    router = PgRouter(PgPool(connect_to("primary"), min_conn=0, max_conn=4), pools, **kwargs)
+    return router, log
+
+
+def _node_of(router, readonly=False, **kwargs):
+    with router.connection(readonly, **kwargs) as conn:
+        return conn.node
+
+
+def test_reads_balance_over_replicas_writes_go_to_primary():
+    router, _ = _router(policy=POLICY_ROUND_ROBIN)
+    assert [_node_of(router, True) for _ in range(4)] == ["r1", "r2", "r1", "r2"]
+    assert _node_of(router) == "primary"
+
+    router, _ = _router()
+    # Least outstanding: r1 is busy, so the next read goes to r2 twice
+    with router.connection(readonly=True) as held:
+        assert held.node == "r1"
+        assert [_node_of(router, True) for _ in range(2)] == ["r2", "r2"]
+    assert router.stats()["nodes"]["r1"]["outstanding"] == 0
+
+
+def test_transactions_and_read_your_writes_pin_the_primary():
+    clock = Clock()
+    router, _ = _router(read_your_writes_window=5, clock=clock)
+    with router.transaction() as conn:
+        assert conn.node == "primary"
+        assert _node_of(router, True) == "primary"
+    assert conn.commits == 1
+
+    assert _node_of(router, False, session="user-1") == "primary"
+    assert _node_of(router, True, session="user-1") == "primary"
+    assert _node_of(router, True, session="user-2") != "primary"
+    clock.now += 6
+    assert _node_of(router, True, session="user-1") != "primary"
+
+
+def test_unhealthy_replica_is_ejected_with_backoff():
+    clock = Clock()
+    router, _ = _router(replicas=("r1",), down={"r1"}, eject_base=1, eject_max=4, clock=clock)
+    assert _node_of(router, True) == "primary"
+    assert router.stats()["nodes"]["r1"]["ejected"]
+    # Still ejected: the replica is not even tried
+    assert _node_of(router, True) == "primary" and router.replicas[0].failures == 1
+
+    clock.now += 1.5
+    assert _node_of(router, True) == "primary"
+    assert router.replicas[0].failures == 2 and router.replicas[0].ejected_until == clock.now + 2
+
+    with pytest.raises(psycopg2.OperationalError):
+        with router.connection(readonly=True):
+            raise psycopg2.OperationalError("primary fallback errors are not ejections")
+    assert router.stats()["nodes"]["primary"]["failures"] == 0
+
+
+def test_query_layer_routes_by_statement():
+    router, log = _router(replicas=("r1",))
+    queries = PgQuery(router.primary.pool, router=router)
+    queries.register("read", "SELECT %s")
+    queries.register("lock", "SELECT * FROM t WHERE id = %s FOR UPDATE")
+    queries.register("write", "UPDATE t SET a = %s")
+
+    assert queries.fetchone("read", (1,)) == ("r1",)
+    assert queries.fetchone("lock", (1,)) == ("primary",)
+    queries.execute("write", (1,))
+    assert {node for node, query in log if "write" in query} == {"primary"}
+
+    with router.transaction() as conn:
+        commits = conn.commits
+        assert queries.fetchone("read", (1,)) == ("primary",)
+        assert conn.commits == commits
+    assert conn.commits == commits + 1
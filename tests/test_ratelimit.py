@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 09:47:31"
+
+import pytest
+from flask import Flask, jsonify
+
+from db.redis_ratelimit import STATUS_INVALID, STATUS_OK, STATUS_QUOTA_EXCEEDED, STATUS_RATE_LIMITED, RateLimiter
+from util.decorators import require_apikey
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    r = fakeredis.FakeRedis()
+    r.hset("apikey:k1", mapping={"customer_id": "c001", "rate_limit": "3", "quota_daily": "100", "disabled": "0"})
+    r.hset("apikey:k2", mapping={"customer_id": "c002", "quota_daily": "2", "disabled": "0"})
+    r.hset("apikey:off", mapping={"customer_id": "c003", "disabled": "1"})
+    return r
+
+
+def test_sliding_window_and_quota(redis_client):
+    limiter = RateLimiter(redis_client, local_precheck=False, clock=lambda: 1_000_010.0)
+
+    statuses = [limiter.check("k1").status for _ in range(4)]
+    assert statuses == [STATUS_OK, STATUS_OK, STATUS_OK, STATUS_RATE_LIMITED]
+
+    ok = limiter.check("k2")
+    assert ok.metadata["customer_id"] == "c002"
+    assert ok.quota_remaining == 1
+    limiter.check("k2")
+    assert limiter.check("k2").status == STATUS_QUOTA_EXCEEDED
+
+    assert limiter.check("off").status == STATUS_INVALID
+    assert limiter.check("missing").status == STATUS_INVALID
+
+
+def test_local_precheck_skips_redis(redis_client):
+    limiter = RateLimiter(redis_client, clock=lambda: 1_000_010.0)
+    for _ in range(3):
+        assert limiter.check("k1").status == STATUS_OK
+
+    redis_client.delete("apikey:k1")
+    decision = limiter.check("k1")
+    assert decision.status == STATUS_RATE_LIMITED
+    assert decision.local
+
+
+def test_decorator_sets_ratelimit_headers(redis_client):
+    now = [1_000_010.0]  # 50s into a 60s window
+    limiter = RateLimiter(redis_client, local_precheck=False, clock=lambda: now[0])
+    app = Flask(__name__)
+
+    @app.route("/limited")
+    @require_apikey({"redis": redis_client, "rate_limiter": limiter})
+    def limited():
+        return jsonify({"ok": True})
+
+    client = app.test_client()
+    resp = client.get("/limited", headers={"X-API-Key": "k1"})
+    assert resp.status_code == 200
+    assert resp.headers["RateLimit-Limit"] == "3"
+    assert resp.headers["RateLimit-Remaining"] == "2"
+
+    client.get("/limited", headers={"X-API-Key": "k1"})
+    client.get("/limited", headers={"X-API-Key": "k1"})
+    resp = client.get("/limited", headers={"X-API-Key": "k1"})
+    assert resp.status_code == 429
+    # Not the window end (10s): the 3 hits then still count in full and only
+    # decay below the limit 1ms later
+    assert resp.headers["Retry-After"] == resp.headers["RateLimit-Reset"] == "11"
+    now[0] += 10
+    assert client.get("/limited", headers={"X-API-Key": "k1"}).status_code == 429
+    now[0] += 1
+    assert client.get("/limited", headers={"X-API-Key": "k1"}).status_code == 200
+
+    assert client.get("/limited", headers={"X-API-Key": "nope"}).status_code == 401
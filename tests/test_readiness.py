@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-18 22:21:30"
+
+import json
+import threading
+import time
+
+from flask import Flask
+
+from api.health import register_health_routes
+from db.health_checks import build_datastore_checks
+from util.readiness import CHECK_ERROR, CHECK_OK, CHECK_TIMEOUT, DependencyMonitor, ReadinessGate
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_checks_run_concurrently_with_timeouts():
+    release = threading.Event()
+    calls = {"slow": 0}
+
+    def slow():
+        calls["slow"] += 1
+        release.wait(5)
+
+    def broken():
+        raise ConnectionError("refused")
+
+    monitor = DependencyMonitor(
+        {"fast": lambda: None, "slow": slow, "broken": broken},
+        critical=("fast", "slow"),
+        timeout=0.05,
+    )
+    started = time.perf_counter()
+    results = monitor.refresh()
+    assert time.perf_counter() - started < 0.5
+    assert results["fast"]["status"] == CHECK_OK and results["fast"]["critical"]
+    assert results["slow"]["status"] == CHECK_TIMEOUT
+    assert results["broken"] == {"critical": False, "status": CHECK_ERROR, "error": "refused"}
+    assert not monitor.healthy
+
+    # A hung check is not started again while it is still running
+    monitor.refresh()
+    assert calls["slow"] == 1
+    release.set()
+    time.sleep(0.05)
+    assert monitor.refresh()["slow"]["status"] == CHECK_OK
+    assert monitor.healthy  # "broken" is not critical
+    monitor.stop()
+
+
+def test_stale_results_are_not_healthy():
+    clock = Clock()
+    monitor = DependencyMonitor({"redis": lambda: None}, critical=("redis",), interval=5, timeout=1, clock=clock)
+    assert not monitor.healthy
+    monitor.refresh()
+    assert monitor.healthy
+    clock.now += 20
+    assert not monitor.healthy
+    monitor.stop()
+
+
+def test_probes_use_cached_results():
+    state = {"up": True}
+
+    def redis_check():
+        if not state["up"]:
+            raise ConnectionError("down")
+
+    gate = ReadinessGate()
+    monitor = DependencyMonitor({"redis": redis_check}, critical=("redis",), interval=60)
+    monitor.start(gate)
+    assert gate.wait(2)
+
+    app = Flask(__name__)
+    register_health_routes(app, config={}, readiness=gate, monitor=monitor)
+    client = app.test_client()
+    assert client.get("/startup").status_code == 200
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert json.loads(resp.data)["checks"]["redis"]["status"] == CHECK_OK
+
+    state["up"] = False
+    assert client.get("/ready").status_code == 200  # not re-checked per probe
+    monitor.refresh()
+    resp = client.get("/ready")
+    assert resp.status_code == 503 and json.loads(resp.data)["status"] == "not_ready"
+    assert client.get("/health").status_code == 200
+    monitor.stop()
+
+
+def test_datastore_checks_follow_configuration():
+    assert build_datastore_checks({}, {}) == {}
+    checks = build_datastore_checks({"PG_ENABLED": True, "REDIS_ENABLED": True}, {"pg_pool": None, "redis": None})
+    assert sorted(checks) == ["postgres", "redis"]
+    monitor = DependencyMonitor(checks)
+    assert monitor.refresh()["postgres"]["status"] == CHECK_ERROR
+    monitor.stop()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 08:48:05"
+
+import pickle
+
+import pytest
+
+from db.redis_apikeys import ApiKeyRecord, get_apikey_metadata, get_apikey_metadata_many
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def redis_client():
+    r = fakeredis.FakeRedis()
+    r.hset(
+        "apikey:k1",
+        mapping={
+            "customer_id": "c001",
+            "tier": "pro",
+            "rate_limit": "800",
+            "disabled": "0",
+            "allowed_endpoints": '["/hello"]',
+            "metadata": '{"country": "ES"}',
+            "owner": "ops",
+        },
+    )
+    r.hset("apikey:k2", mapping={"customer_id": "c002", "disabled": "0"})
+    r.hset("apikey:off", mapping={"customer_id": "c003", "disabled": "1"})
+    return r
+
+
+def test_record_is_typed_immutable_mapping(redis_client):
+    record = get_apikey_metadata(redis_client, "k1")
+
+    assert isinstance(record, ApiKeyRecord)
+    assert record.rate_limit == 800 and record["rate_limit"] == 800
+    assert record.allowed_endpoints == ("/hello",)
+    assert record.metadata["country"] == "ES"
+    assert record["owner"] == "ops" and record.quota_daily is None
+    assert "quota_daily" not in record and record.get("quota_daily") is None
+    assert record.as_dict()["allowed_endpoints"] == ["/hello"]
+    assert pickle.loads(pickle.dumps(record)) == record
+    with pytest.raises(AttributeError, match="immutable"):
+        record.tier = "free"
+    with pytest.raises(AttributeError, match="immutable"):
+        del record.tier
+    with pytest.raises(TypeError):
+        record.metadata["country"] = "FR"
+
+
+def test_many_is_aligned_with_input(redis_client):
+    records = get_apikey_metadata_many(redis_client, ["k2", "missing", "off", "k1", ""], chunk_size=2)
+
+    assert [r and r.customer_id for r in records] == ["c002", None, None, "c001", None]
+    assert records[0] == {"customer_id": "c002"}
+
+
+def test_many_projection_fetches_only_requested_fields(redis_client):
+    records = get_apikey_metadata_many(redis_client, ["k1", "off", "missing"], fields=("customer_id", "tier"))
+
+    assert records[0] == {"customer_id": "c001", "tier": "pro"}
+    assert records[1] is None and records[2] is None
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 05:55:41"
+
+import json
+import os
+import subprocess
+import sys
+
+from app import READINESS_DATASTORES, create_api_app
+from config import get_config
+
+
+def test_app_import_skips_disabled_drivers():
+    # Fresh interpreter: this test session has them all imported already
+    env = dict(os.environ, SERVICE_ENV="prod", PYTHONPATH=os.pathsep.join(sys.path))
+    code = (
+        "import sys, app; "
+        "print([m for m in ('redis', 'psycopg2', 'dotenv', 'api.asgi', 'worker') if m in sys.modules])"
+    )
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]"
+
+
+def test_background_datastore_startup():
+    config = get_config()
+    config["PG_ENABLED"] = False
+    config["REDIS_ENABLED"] = False
+    config["DATASTORES_STARTUP"] = "background"
+
+    app = create_api_app(config)
+    readiness = app.extensions["readiness"]
+    assert readiness.wait(5)
+    assert READINESS_DATASTORES in readiness.status()["startup"]
+
+    client = app.test_client()
+    assert client.get("/health").status_code == 200
+    resp = client.get("/ready")
+    assert resp.status_code == 200, json.loads(resp.data)
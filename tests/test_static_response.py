@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 05:14:48"
+
+import asyncio
+import json
+
+from flask import Flask, jsonify, request
+
+from skel_v3.app import create_api_app
+from skel_v3.config import get_config
+from api.asgi import build_asgi_app
+from util.static_response import StaticResponse, cached_response
+
+
+def test_not_modified_matching():
+    response = StaticResponse.json({"status": "ok"})
+    assert response.etag.startswith('"') and len(response.etag) == 34
+    assert response.not_modified(response.etag)
+    assert response.not_modified(f'"other", W/{response.etag}')
+    assert response.not_modified("*")
+    assert not response.not_modified('"other"') and not response.not_modified(None)
+
+
+def test_discovery_and_health_conditional_get():
+    config = get_config()
+    config["PG_ENABLED"] = False
+    config["REDIS_ENABLED"] = False
+    client = create_api_app(config).test_client()
+
+    for path in ("/", "/health"):
+        first = client.get(path)
+        assert first.status_code == 200
+        etag = first.headers["ETag"]
+        assert client.get(path).get_data() == first.get_data()
+
+        resp = client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 304 and resp.get_data() == b""
+        assert resp.headers["ETag"] == etag
+    assert client.get("/").headers["Cache-Control"] == "public, max-age=60"
+    assert json.loads(client.get("/").data)["links"][0]["href"] == "/health"
+
+
+def test_cached_response_key_and_ttl():
+    app = Flask(__name__)
+    calls = []
+
+    @app.route("/greeting")
+    @cached_response(ttl=0, key=lambda: request.args.get("lang", "en"))
+    def greeting():
+        calls.append(request.args.get("lang"))
+        if request.args.get("lang") == "xx":
+            return jsonify({"error": "unknown"}), 404
+        return jsonify({"lang": request.args.get("lang", "en")})
+
+    @app.route("/forever")
+    @cached_response()
+    def forever():
+        calls.append("forever")
+        return jsonify({"ok": True})
+
+    client = app.test_client()
+    client.get("/forever")
+    client.get("/forever")
+    assert calls == ["forever"]
+
+    assert json.loads(client.get("/greeting?lang=fr").data) == {"lang": "fr"}
+    client.get("/greeting?lang=fr")  # ttl=0: recomputed
+    assert client.get("/greeting?lang=xx").status_code == 404
+    assert calls[1:] == ["fr", "fr", "xx"]
+    assert set(greeting.cache_entries) == {"fr"}
+
+
+def test_asgi_health_not_modified():
+    config = get_config()
+    config["PG_ENABLED"] = False
+    config["REDIS_ENABLED"] = False
+    app = build_asgi_app(create_api_app(config), config=config)
+
+    async def call(headers):
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/health", "headers": headers}
+        await app(scope, receive, send)
+        return sent
+
+    first = asyncio.run(call([]))
+    etag = dict(first[0]["headers"])[b"etag"]
+    second = asyncio.run(call([(b"if-none-match", etag)]))
+    assert second[0]["status"] == 304 and second[1]["body"] == b""
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 09:55:02"
+
+import pytest
+
+from worker.runtime import STREAM_CONSUMER, _process_stream_batch
+from worker.streams import StreamConsumer
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def consumer():
+    r = fakeredis.FakeRedis()
+    c = StreamConsumer(r, stream="jobs", group="workers", consumer="c1", batch_size=10, claim_idle_ms=0, max_deliveries=2)
+    c.ensure_group()
+    c.ensure_group()  # idempotent
+    return c
+
+
+def test_read_process_and_batch_ack(consumer):
+    r = consumer.redis
+    for i in range(5):
+        r.xadd("jobs", {"n": i})
+
+    seen = []
+    messages = consumer.read_batch(block_ms=10)
+    assert consumer.process(messages, lambda mid, fields: seen.append(int(fields[b"n"]))) == 5
+    assert seen == [0, 1, 2, 3, 4]
+    assert r.xpending("jobs", "workers")["pending"] == 0
+    assert consumer.read_batch(block_ms=10) == []
+
+
+def test_failed_messages_are_retried_then_dead_lettered(consumer):
+    r = consumer.redis
+    r.xadd("jobs", {"n": 1})
+
+    def fail(_mid, _fields):
+        raise ValueError("poison")
+
+    assert consumer.process(consumer.read_batch(block_ms=10), fail) == 0
+    assert r.xpending("jobs", "workers")["pending"] == 1
+
+    # Second delivery via XAUTOCLAIM, still failing
+    retried = consumer.claim_stale(force=True)
+    assert len(retried) == 1
+    consumer.process(retried, fail)
+
+    # Third delivery exceeds max_deliveries: moved to the dead-letter stream
+    assert consumer.claim_stale(force=True) == []
+    assert r.xpending("jobs", "workers")["pending"] == 0
+    (_, fields), = r.xrange("jobs:dead")
+    assert fields[b"n"] == b"1"
+    assert fields[b"_reason"] == b"max_deliveries"
+
+    consumer.release()
+    assert r.xinfo_consumers("jobs", "workers") == []
+
+
+def test_batches_reuse_the_process_consumer(consumer):
+    r = consumer.redis
+    stores = {"redis": r}
+    config = {"WORKER_STREAM": "jobs", "WORKER_STREAM_GROUP": "workers", "WORKER_STREAM_CONSUMER": "c1"}
+    created = None
+    for i in range(3):
+        r.xadd("jobs", {"n": i})
+        assert _process_stream_batch(consumer.read_batch(block_ms=10), config, stores) == 1
+        created = created or stores[STREAM_CONSUMER]
+        assert stores[STREAM_CONSUMER] is created
+    assert r.xpending("jobs", "workers")["pending"] == 0
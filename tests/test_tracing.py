@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 00:36:48"
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from skel_v3.app import create_api_app
+from skel_v3.config import get_config
+from util.tracing import OtlpExporter, current_trace, parse_traceparent, span, trace_block, traced
+
+
+def test_span_is_noop_without_trace():
+    assert current_trace() is None
+    with span("redis", command="GET") as s:
+        s.set("key", "value")
+    assert current_trace() is None
+
+
+def test_nested_spans_and_server_timing():
+    @traced("db")
+    def query():
+        time.sleep(0.001)
+
+    with trace_block("job") as trace:
+        with span("auth"):
+            with span("redis", command="GET"):
+                pass
+        query()
+        query()
+
+    names = [(name, parent) for name, _, _, parent, _ in trace.spans]
+    assert names == [("auth", -1), ("redis", 0), ("db", -1), ("db", -1)]
+    assert trace.totals["db"][1] == 2
+    header = trace.server_timing()
+    assert header.startswith("redis;dur=")
+    assert 'db;dur=' in header and 'desc="2 calls"' in header
+    assert header.split(", ")[-1].startswith("total;dur=")
+    assert current_trace() is None
+
+
+def test_spans_beyond_limit_still_count():
+    with trace_block("job", max_spans=2) as trace:
+        for _ in range(5):
+            with span("redis"):
+                pass
+    assert len(trace.spans) == 2
+    assert trace.totals["redis"][1] == 5
+
+
+def test_parse_traceparent():
+    trace_id, parent = parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+    assert (trace_id, parent) == ("4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7")
+    assert parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") == (None, None)
+    assert parse_traceparent("garbage") == (None, None)
+    assert parse_traceparent(None) == (None, None)
+
+
+def test_redis_commands_are_spans():
+    fakeredis = pytest.importorskip("fakeredis")
+    from db.redis_pool import InstrumentedRedis  # pylint: disable=import-outside-toplevel
+
+    r = InstrumentedRedis(connection_pool=fakeredis.FakeRedis().connection_pool)
+    with trace_block("job") as trace:
+        r.set("a", 1)
+        with r.pipeline(transaction=False) as pipe:
+            pipe.get("a")
+            pipe.get("b")
+            pipe.execute()
+    assert [(name, attrs) for name, _, _, _, attrs in trace.spans] == [
+        ("redis", {"command": "SET"}),
+        ("redis", {"command": "PIPELINE", "commands": 2}),
+    ]
+
+
+def _app(**overrides):
+    config = get_config()
+    config.update(PG_ENABLED=False, REDIS_ENABLED=False, METRICS_MULTIPROC_DIR="")
+    config.update(overrides)
+    return create_api_app(config)
+
+
+def test_server_timing_header_when_enabled(capsys):
+    app = _app(TRACING_ENABLED=True)
+    capsys.readouterr()
+    resp = app.test_client().get(
+        "/health", headers={"traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"}
+    )
+    assert resp.status_code == 200
+    timing = resp.headers["Server-Timing"]
+    assert timing.startswith("handler;dur=") and "total;dur=" in timing
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines() if line.startswith("{")]
+    summaries = [line for line in lines if line["message"] == "Request trace"]
+    assert len(summaries) == 1
+    assert summaries[0]["trace_id"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert set(summaries[0]["spans"]) == {"handler"}
+
+
+def test_no_server_timing_when_disabled():
+    resp = _app(TRACING_ENABLED=False).test_client().get("/health")
+    assert "Server-Timing" not in resp.headers
+
+
+def test_otlp_exporter_posts_spans():
+    received = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # noqa: N802
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers["Content-Length"])))))
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        exporter = OtlpExporter(f"http://127.0.0.1:{server.server_port}", service_name="test", interval=0.05)
+        with trace_block("GET /x", request_id="req-1") as trace:
+            with span("auth"):
+                pass
+        exporter.export(trace)
+        exporter.shutdown()
+    finally:
+        server.shutdown()
+
+    assert exporter.exported == 1
+    path, payload = received[0]
+    assert path == "/v1/traces"
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root, auth = spans
+    assert root["name"] == "GET /x" and auth["name"] == "auth"
+    assert auth["parentSpanId"] == root["spanId"]
+    assert auth["traceId"] == root["traceId"] == trace.trace_id
+    assert {"key": "request_id", "value": {"stringValue": "req-1"}} in root["attributes"]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 07:08:19"
+
+import json
+
+import pytest
+from flask import Flask, g, jsonify
+from marshmallow import INCLUDE, Schema, ValidationError, fields, post_load, validate
+
+from api.schemas import AuthRequestSchema
+from api.validation import compiled_schema, validate_body
+
+
+class OrderSchema(Schema):
+    class Meta:
+        unknown = INCLUDE
+
+    sku = fields.Str(required=True, validate=[validate.Length(min=3, max=8), validate.Regexp(r"^[A-Z0-9-]+$")])
+    quantity = fields.Int(load_default=1, validate=validate.Range(min=1, max=100))
+    gift = fields.Bool(load_default=False)
+    channel = fields.Str(load_default=None, validate=validate.OneOf(["web", "app"]), data_key="via")
+
+
+class HookedSchema(Schema):
+    name = fields.Str()
+
+    @post_load
+    def upper(self, data, **kwargs):
+        return {"name": data["name"].upper()}
+
+
+CASES = [
+    {"username": "bob"},
+    {"username": "bob_1.x-y", "password": "p", "client_id": "c", "ip": "1.2.3.4"},
+    {"username": ""},
+    {"username": "b" * 65},
+    {"username": "bad name"},
+    {"username": 12},
+    {"username": None},
+    {"username": "bob", "extra": 1},
+    {},
+    [],
+    "bob",
+]
+
+ORDER_CASES = [
+    {"sku": "AB-12"},
+    {"sku": "AB-12", "quantity": 3, "gift": True, "via": "app", "note": "kept"},
+    {"sku": "AB-12", "quantity": "7"},  # cast by marshmallow (slow path)
+    {"sku": "AB-12", "quantity": 7.0},
+    {"sku": "AB-12", "quantity": 0},
+    {"sku": "AB-12", "quantity": True},
+    {"sku": "AB-12", "gift": "yes"},
+    {"sku": "AB-12", "via": "fax"},
+    {"sku": "AB-12", "via": None},
+    {"sku": "ab-12"},
+    {"sku": "AB"},
+]
+
+
+def _outcome(load, data):
+    try:
+        return "ok", load(data)
+    except ValidationError as exc:
+        return "error", exc.messages
+
+
+@pytest.mark.parametrize("schema_cls,cases", [(AuthRequestSchema, CASES), (OrderSchema, ORDER_CASES)])
+def test_compiled_matches_marshmallow(schema_cls, cases):
+    compiled = compiled_schema(schema_cls)
+    assert compiled.compiled
+    assert compiled_schema(schema_cls) is compiled
+    for data in cases:
+        assert _outcome(compiled.load, data) == _outcome(schema_cls().load, data), data
+
+
+def test_uncompilable_schema_uses_marshmallow():
+    compiled = compiled_schema(HookedSchema)
+    assert not compiled.compiled
+    assert compiled.load({"name": "ann"}) == {"name": "ANN"}
+
+
+def test_load_many_collects_errors_per_item():
+    loaded, errors = compiled_schema(AuthRequestSchema).load_many([{"username": "a"}, {"username": "!"}, 5])
+    assert [item["username"] for item in loaded] == ["a"]
+    assert errors == {1: {"username": ["Invalid username"]}, 2: {"_schema": ["Invalid input type."]}}
+    with pytest.raises(ValidationError):
+        compiled_schema(AuthRequestSchema).load_many({"username": "a"})
+
+
+def test_validate_body_decorator():
+    app = Flask(__name__)
+
+    @app.route("/login", methods=["POST"])
+    @validate_body(AuthRequestSchema)
+    def login():
+        return jsonify(g.body)
+
+    @app.route("/batch", methods=["POST"])
+    @validate_body(AuthRequestSchema, many=True)
+    def batch():
+        return jsonify({"loaded": len(g.body), "errors": sorted(g.body_errors)})
+
+    client = app.test_client()
+    resp = client.post("/login", data=json.dumps({"username": "bob"}))
+    assert resp.status_code == 200 and json.loads(resp.data)["password"] == ""
+
+    resp = client.post("/login", data=json.dumps({"username": "b b"}))
+    assert resp.status_code == 400
+    assert json.loads(resp.data)["errors"] == {"username": ["Invalid username"]}
+    assert client.post("/login", data=b"{not json").status_code == 400
+
+    resp = client.post("/batch", data=json.dumps([{"username": "a"}, {}, {"username": "c"}]))
+    assert json.loads(resp.data) == {"loaded": 2, "errors": [1]}
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# pylint: disable=W0102,E0712,C0103,R0903
+
+"""Test module"""
+
+__updated__ = "2026-10-19 09:27:12"
+
+import asyncio
+import threading
+import time
+
+from worker.async_runtime import AsyncEngine
+from worker.engine import ENGINE_PROCESS, ENGINE_THREAD, InlineEngine, PoolEngine, create_engine
+from worker.scheduler import AdaptivePoller
+
+CONFIG = {"PG_ENABLED": False, "REDIS_ENABLED": False, "LOG_LEVEL": "WARNING"}
+
+
+def _noop(config, stores):
+    return None
+
+
+def _hang(config, stores):
+    time.sleep(30)
+
+
+def test_create_engine_defaults_to_inline():
+    assert isinstance(create_engine(dict(CONFIG), {}), InlineEngine)
+    engine = create_engine(dict(CONFIG, WORKER_ENGINE="thread", WORKER_CONCURRENCY=3), {})
+    assert engine.kind == ENGINE_THREAD and engine.concurrency == 3
+    engine.drain(1)
+
+
+def test_thread_pool_backpressure_timeouts_and_drain():
+    release = threading.Event()
+
+    def blocking(config, stores):
+        release.wait(5)
+
+    engine = PoolEngine(dict(CONFIG), {}, kind=ENGINE_THREAD, concurrency=2, task_timeout=0.05)
+    assert engine.submit(blocking, slot_timeout=0.1)
+    assert engine.submit(blocking, slot_timeout=0.1)
+    # Every slot busy: no submission
+    assert not engine.submit(blocking, slot_timeout=0.1)
+    assert engine.in_flight == 2
+
+    time.sleep(0.1)
+    engine.check_timeouts()
+    engine.check_timeouts()
+    assert engine.timed_out == 2 and engine.in_flight == 0
+
+    release.set()
+    assert engine.drain(5)
+    # Abandoned tasks are not counted again when they eventually return
+    assert engine.completed == 0 and engine.failed == 0
+
+
+def test_timed_out_tasks_free_their_slot():
+    results = []
+    release = threading.Event()
+
+    def blocking(config, stores):
+        release.wait(5)
+        return "late"
+
+    engine = PoolEngine(dict(CONFIG), {}, kind=ENGINE_THREAD, concurrency=1, task_timeout=0.05)
+    engine.on_result = results.append
+    assert engine.submit(blocking, slot_timeout=0.1)
+    time.sleep(0.1)
+    engine.check_timeouts()
+    assert engine.submit(lambda config, stores: "next", slot_timeout=0.1)
+    assert engine.drain(5)
+    release.set()
+    assert results == [None, "next"] and engine.completed == 1
+
+    engine = PoolEngine(dict(CONFIG), {}, kind=ENGINE_PROCESS, concurrency=1, task_timeout=0.2)
+    assert engine.submit(_hang, slot_timeout=5)
+    time.sleep(0.5)
+    engine.check_timeouts()
+    assert engine.timed_out == 1
+    assert engine.submit(_noop, slot_timeout=0.1)
+    assert engine.drain(10)
+    assert engine.completed == 1 and engine.failed == 0
+
+
+def test_process_pool_runs_tasks():
+    engine = PoolEngine(dict(CONFIG), {}, kind=ENGINE_PROCESS, concurrency=2)
+    for _ in range(4):
+        assert engine.submit(_noop, slot_timeout=5)
+    assert engine.drain(10)
+    assert engine.completed == 4 and engine.failed == 0
+
+
+def test_poller_backs_off_while_idle_and_resets_on_work():
+    poller = AdaptivePoller(min_interval=0.1, max_interval=1.0, backoff=2.0, jitter=0.0)
+    poller.record(0)
+    assert [poller.next_delay() for _ in range(6)] == [0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+
+    poller.record(3)
+    assert poller.next_delay() == 0.0
+    assert poller.next_delay() == 0.0
+    poller.record(None)
+    assert poller.next_delay() == 0.1
+    assert poller.stats()["productive_polls"] == 1
+
+    jittered = AdaptivePoller(min_interval=1.0, max_interval=10.0, jitter=0.5, rand=lambda: 0.0)
+    assert jittered.next_delay() == 0.5
+    poller.close()
+    jittered.close()
+
+
+def test_failed_task_makes_poller_back_off():
+    poller = AdaptivePoller(min_interval=0.1, max_interval=1.0, backoff=2.0, jitter=0.0)
+
+    def failing(config, stores):
+        raise RuntimeError("redis down")
+
+    for engine in (InlineEngine(dict(CONFIG), {}), PoolEngine(dict(CONFIG), {}, kind=ENGINE_THREAD, concurrency=1)):
+        engine.on_result = poller.record
+        poller.record(2)  # a productive poll first
+        assert poller.next_delay() == 0.0
+        engine.submit(failing)
+        assert engine.drain(5) and engine.failed == 1
+        assert [poller.next_delay() for _ in range(3)] == [0.1, 0.2, 0.4]
+    poller.close()
+
+
+def test_poller_sleep_is_interrupted_by_work_and_stop():
+    poller = AdaptivePoller(min_interval=1.0, max_interval=30.0, jitter=0.0)
+    engine = PoolEngine(dict(CONFIG), {}, kind=ENGINE_THREAD, concurrency=1)
+    engine.on_result = poller.record
+
+    def found_work(config, stores):
+        time.sleep(0.05)
+        return 5
+
+    engine.submit(found_work)
+    started = time.monotonic()
+    assert poller.sleep(30.0)
+    assert time.monotonic() - started < 5
+    assert poller.next_delay() == 0.0
+
+    threading.Timer(0.05, poller.stop).start()
+    assert not poller.sleep(30.0)
+    assert poller.stopping
+    stats = poller.stats()
+    assert 0.0 <= stats["busy_ratio"] <= 1.0 and stats["polls"] == 1
+    engine.drain(5)
+    poller.close()
+
+
+def test_async_engine_overlaps_waits_and_enforces_timeouts():
+    results = []
+
+    async def io_task(config, stores):
+        await asyncio.sleep(0.05)
+        return 1
+
+    async def stuck(config, stores):
+        await asyncio.sleep(30)
+
+    async def scenario():
+        engine = AsyncEngine(dict(CONFIG), {}, concurrency=10, task_timeout=0.5)
+        engine.on_result = results.append
+        started = time.monotonic()
+        for _ in range(20):
+            assert await engine.submit(io_task)
+        assert await engine.drain(5)
+        elapsed = time.monotonic() - started
+        assert engine.completed == 20 and results == [1] * 20
+        # 20 x 50 ms with 10 slots: two waves, not twenty
+        assert elapsed < 0.5
+
+        await engine.submit(stuck)
+        assert await engine.drain(5)
+        assert engine.timed_out == 1
+
+        small = AsyncEngine(dict(CONFIG), {}, concurrency=1)
+        await small.submit(stuck)
+        assert not await small.submit(stuck, slot_timeout=0.05)
+        assert not await small.drain(0.05)
+
+    asyncio.run(scenario())